@@ -1,33 +1,126 @@
+import time
 from botocore.config import Config
+from botocore.exceptions import ClientError
 import boto3
 
 from app.core.config import AppConfig
+from app.utils.cache_utils import TTLCache
 
 s3_client = None
 bucket: str = ""
 seven_days_sec = 604800
+presigned_url_cache: TTLCache | None = None
 
 
 def setup_s3(conf: AppConfig):
-    global s3_client, bucket
+    global s3_client, bucket, presigned_url_cache
     s3_client = boto3.client(
         "s3",
         region_name=conf.aws_region,
         aws_access_key_id=conf.aws_access_key_id,
         aws_secret_access_key=conf.aws_secret_access_key,
-        endpoint_url=f'https://s3.{conf.aws_region}.amazonaws.com'
-
+        # set aws_s3_endpoint_url to point at a local stand-in (MinIO, moto server)
+        endpoint_url=conf.aws_s3_endpoint_url or f'https://s3.{conf.aws_region}.amazonaws.com',
+        # one pooled connection per parallel multipart part upload
+        config=Config(max_pool_connections=max(10, conf.upload_part_concurrency * 2)),
     )
     bucket = conf.aws_s3_bucket_name
+    # a cached url is handed out until `refresh_fraction` of its lifetime passed,
+    # so clients always get one valid for at least the remaining part
+    presigned_url_cache = TTLCache(
+        max_size=conf.s3_presign_cache_size,
+        ttl_sec=seven_days_sec * conf.s3_presign_refresh_fraction,
+    )
 
 
 def upload_file(file, key: str) -> any:
     return s3_client.upload_fileobj(file, bucket, key)
 
 
+def put_object(key: str, body: bytes, content_type: str) -> None:
+    s3_client.put_object(Bucket=bucket, Key=key, Body=body, ContentType=content_type)
+
+
+def create_multipart_upload(key: str, content_type: str) -> str:
+    return s3_client.create_multipart_upload(
+        Bucket=bucket, Key=key, ContentType=content_type
+    )["UploadId"]
+
+
+def upload_part(key: str, upload_id: str, part_number: int, body: bytes) -> dict:
+    response = s3_client.upload_part(
+        Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=part_number, Body=body
+    )
+    return {"PartNumber": part_number, "ETag": response["ETag"]}
+
+
+def complete_multipart_upload(key: str, upload_id: str, parts: list[dict]) -> None:
+    s3_client.complete_multipart_upload(
+        Bucket=bucket,
+        Key=key,
+        UploadId=upload_id,
+        MultipartUpload={"Parts": sorted(parts, key=lambda p: p["PartNumber"])},
+    )
+
+
+def abort_multipart_upload(key: str, upload_id: str) -> None:
+    s3_client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+
+
+def create_presigned_post(
+    key: str, content_type: str, max_size: int, expiration_sec: int
+) -> dict:
+    """Form fields for a browser POST straight to the bucket, S3 enforces the key,
+    content type and size limit written into the signed policy"""
+    return s3_client.generate_presigned_post(
+        Bucket=bucket,
+        Key=key,
+        Fields={"Content-Type": content_type},
+        Conditions=[
+            {"Content-Type": content_type},
+            ["content-length-range", 1, max_size],
+        ],
+        ExpiresIn=expiration_sec,
+    )
+
+
+def head_object(key: str) -> dict | None:
+    """Object metadata, None when there is no such object"""
+    try:
+        return s3_client.head_object(Bucket=bucket, Key=key)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+
+
 def create_presigned_url(key, expiration_sec=seven_days_sec):
     return s3_client.generate_presigned_url(
         "get_object",
         Params={"Bucket": bucket, "Key": key},
         ExpiresIn=expiration_sec,
     )
+
+
+def get_presigned_url(key: str) -> str:
+    """create_presigned_url for the default lifetime, served from the cache when possible"""
+    if presigned_url_cache is None:
+        return create_presigned_url(key)
+    url = presigned_url_cache.get(key)
+    if url is None:
+        url = create_presigned_url(key)
+        presigned_url_cache.set(key, url)
+    return url
+
+
+def presigned_url_cache_stats() -> dict:
+    return presigned_url_cache.stats() if presigned_url_cache else {}
+
+
+def presigned_url_generation() -> int:
+    """Counter that moves on every presigned url cache lifetime. Responses embedding
+    presigned urls put it in their ETag so clients never revalidate onto expired links:
+    a url is at most one lifetime old when a generation starts and revalidates for one
+    more, hence the refresh fraction cap of 0.5."""
+    ttl_sec = presigned_url_cache.ttl_sec if presigned_url_cache else seven_days_sec / 2
+    return int(time.time() // ttl_sec)
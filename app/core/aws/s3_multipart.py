@@ -0,0 +1,85 @@
+import asyncio
+from typing import Optional
+
+from app.core.aws import s3
+
+
+class MultipartWriter:
+    """Streams one object to S3 as a multipart upload, parts go up in parallel threads.
+
+    Data is buffered until a part is full and at most `concurrency` parts are in flight,
+    `write` waits for a free slot, so memory stays around (concurrency + 1) * part_size.
+    Nothing is sent before `key` is set. Objects smaller than one part are sent with a
+    single put_object on `complete`.
+    """
+
+    def __init__(
+        self,
+        content_type: str,
+        part_size: int,
+        concurrency: int,
+        key: Optional[str] = None,
+    ):
+        self.key = key
+        self.content_type = content_type
+        self.size = 0
+        self._part_size = part_size
+        self._buffer = bytearray()
+        self._upload_id: Optional[str] = None
+        self._tasks: list[asyncio.Task] = []
+        self._slots = asyncio.Semaphore(concurrency)
+
+    async def write(self, data: bytes) -> None:
+        self._buffer += data
+        self.size += len(data)
+        await self._flush_full_parts()
+
+    async def complete(self) -> None:
+        await self._flush_full_parts()
+        if self._upload_id is None:
+            await asyncio.to_thread(
+                s3.put_object, self.key, bytes(self._buffer), self.content_type
+            )
+        else:
+            if self._buffer:
+                await self._send_part(bytes(self._buffer))
+            parts = await asyncio.gather(*self._tasks)
+            await asyncio.to_thread(
+                s3.complete_multipart_upload, self.key, self._upload_id, parts
+            )
+        self._buffer.clear()
+
+    async def abort(self) -> None:
+        """Drop the upload and the parts already stored (S3 bills them until aborted)"""
+        self._buffer.clear()
+        # parts still uploading would be stored after the abort, let them finish first
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._upload_id is not None:
+            await asyncio.to_thread(s3.abort_multipart_upload, self.key, self._upload_id)
+            self._upload_id = None
+
+    async def _flush_full_parts(self) -> None:
+        while self.key is not None and len(self._buffer) >= self._part_size:
+            part = bytes(self._buffer[: self._part_size])
+            del self._buffer[: self._part_size]
+            await self._send_part(part)
+
+    async def _send_part(self, body: bytes) -> None:
+        if self._upload_id is None:
+            self._upload_id = await asyncio.to_thread(
+                s3.create_multipart_upload, self.key, self.content_type
+            )
+        await self._slots.acquire()
+        # surface a failed part now instead of streaming the rest of the body first
+        for task in self._tasks:
+            if task.done() and task.exception() is not None:
+                self._slots.release()
+                raise task.exception()
+        number = len(self._tasks) + 1
+        self._tasks.append(asyncio.create_task(self._upload_part(number, body)))
+
+    async def _upload_part(self, number: int, body: bytes) -> dict:
+        try:
+            return await asyncio.to_thread(s3.upload_part, self.key, self._upload_id, number, body)
+        finally:
+            self._slots.release()
@@ -0,0 +1,33 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Optional
+
+from app.core.logger import get_logger
+
+
+async def run_periodic(
+    name: str,
+    fn: Callable[[], Awaitable[Any]],
+    interval_sec: float,
+    wake: Optional[asyncio.Event] = None,
+) -> None:
+    """Background task (started from lifespan) running `fn` every `interval_sec` until
+    cancelled. A failed run is logged and the next one goes ahead on schedule.
+
+    Setting `wake` starts the next run right away instead of after the interval.
+    """
+    log = get_logger()
+    while True:
+        if wake is not None:
+            # set while `fn` runs: run again right after
+            wake.clear()
+        try:
+            await fn()
+        except Exception as e:
+            log.error(f"{name} failed", extra={"error": str(e)})
+        if wake is None:
+            await asyncio.sleep(interval_sec)
+            continue
+        try:
+            await asyncio.wait_for(wake.wait(), interval_sec)
+        except asyncio.TimeoutError:
+            pass
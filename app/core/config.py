@@ -1,5 +1,5 @@
 from typing import Optional
-from pydantic import computed_field
+from pydantic import Field, computed_field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 from app.enums.env_enum import Env
@@ -10,16 +10,67 @@ class AppConfig(BaseSettings):
     app_name: str
     port: int = 8080
     debug: bool = True
+    pretty_json: bool = False  # indent every response, else only with ?pretty=true
     host: str = "localhost"
     db_url: str | None
+    db_pool_size: int = 10
+    db_max_overflow: int = 10
+    db_pool_recycle_sec: int = 1800
+    db_pool_pre_ping: bool = True
+    db_pool_timeout_sec: float = 30
+    db_pool_warmup: int = 5  # connections opened in lifespan before serving
+    db_pgbouncer_mode: bool = False  # disables server side prepared statements
+    db_query_stats: bool = False  # per request query count/time in Server-Timing and the access log
+    db_n_plus_one_threshold: int = 0  # dev/test: warn when a statement shape repeats more often
+    db_n_plus_one_raise: bool = False  # raise NPlusOneError instead of warning
+    log_queue_size: int = 10000  # records beyond it are dropped, requests never wait on stdout
+    log_sample_rates: dict[str, float] = {}  # per logger, e.g. {"http": 0.05}, warnings always pass
+    pagination_count_cache_ttl_sec: int = 30
     access_token_secret: str
+    access_token_expire_minutes: int = 15  # roles in the token are trusted until expiry
+    refresh_token_expire_days: int = 30
+    auth_user_cache_size: int = 10000
+    auth_user_cache_ttl_sec: int = 60
+    ticket_hold_ttl_sec: int = 600  # how long seats stay held while the buyer pays
+    ticket_hold_sweep_interval_sec: int = 15
+    ticket_hold_sweep_batch: int = 500
+    inventory_shard_rollup_interval_sec: int = 5
+    category_catalog_ttl_sec: int = 300  # other workers' new categories show up after this
     aws_region: str
     aws_access_key_id: str
     aws_secret_access_key: str
     aws_s3_bucket_name: str
+    aws_s3_endpoint_url: str | None = None  # e.g. http://localhost:9000 for MinIO
+    s3_presign_cache_size: int = 10000
+    # of the presigned url lifetime, at most half: a 304 may be served one cache lifetime
+    # after the url in the client's copy was signed (see s3.presigned_url_generation)
+    s3_presign_refresh_fraction: float = Field(default=0.5, gt=0, le=0.5)
+    upload_max_size_bytes: int = 20 * 1024 * 1024
+    upload_allowed_content_types: list[str] = [
+        "image/jpeg", "image/png", "image/webp", "image/gif", "application/pdf"
+    ]
+    upload_part_size_bytes: int = 8 * 1024 * 1024  # S3 minimum part size is 5 MiB
+    upload_part_concurrency: int = 4  # parts in flight per upload
+    upload_presign_expire_sec: int = 900  # presigned POST policy and upload token lifetime
 
     smtp_sender_email: str
     smtp_app_password: str
+    smtp_host: str = "smtp.gmail.com"
+    smtp_port: int = 465
+    smtp_use_ssl: bool = True  # false for a local stand-in like aiosmtpd
+    smtp_login: bool = True
+    smtp_timeout_sec: float = 30
+    smtp_pool_size: int = 2  # connections, one send worker each
+    smtp_batch_size: int = 50  # mails sent over one session before the queue is checked again
+    smtp_queue_size: int = 1000  # mails beyond it are dropped (and logged)
+    smtp_health_check_sec: float = 30  # idle connections older than this get a NOOP first
+    smtp_max_attempts: int = 3  # per mail, when the connection drops mid send
+    outbox_relay_interval_sec: float = 2  # polling fallback, commits wake the relay directly
+    outbox_batch: int = 100
+    outbox_lease_sec: int = 120  # a claimed row is retried after this if its relay died
+    outbox_max_attempts: int = 8  # then the row is left for inspection (last_error)
+    outbox_backoff_base_sec: float = 5  # doubled per failed attempt
+    outbox_backoff_max_sec: float = 900
 
     model_config = SettingsConfigDict(env_file=".env")
 
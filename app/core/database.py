@@ -1,19 +1,141 @@
+import asyncio
+from contextlib import AsyncExitStack
+from datetime import datetime, timezone
 from typing import Optional
-from sqlalchemy import create_engine, Engine
+from uuid import uuid4
+from sqlalchemy import create_engine, Engine, event, make_url, text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-engine: Optional[Engine] = None
+from app.core.query_stats import setup_query_stats
 
+engine: Optional[Engine] = None  # sync engine, used by scripts only
+async_engine: Optional[AsyncEngine] = None
 
-def setup_db(db_url: str, echo_query: bool = False) -> None:
-    global engine
+_pool_counters = {"connects": 0, "checkouts": 0, "checkins": 0, "invalidations": 0}
+
+
+def _to_async_url(db_url: str) -> str:
+    """postgresql://... -> postgresql+asyncpg://..."""
+    url = make_url(db_url)
+    return url.set(drivername="postgresql+asyncpg").render_as_string(
+        hide_password=False
+    )
+
+
+def _encode_timestamp(value: datetime) -> str:
+    # columns are TIMESTAMP (without time zone) but models create aware utc datetimes,
+    # asyncpg refuses aware values for naive columns so store them as naive utc
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat()
+
+
+def _decode_timestamp(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+def _setup_asyncpg_codecs(dbapi_connection, connection_record):
+    dbapi_connection.run_async(
+        lambda conn: conn.set_type_codec(
+            "timestamp",
+            schema="pg_catalog",
+            encoder=_encode_timestamp,
+            decoder=_decode_timestamp,
+            format="text",
+        )
+    )
+
+
+def _count(name: str):
+    def listener(*args):
+        _pool_counters[name] += 1
+
+    return listener
+
+
+def _pgbouncer_connect_args() -> dict:
+    # pgbouncer in transaction mode can hand each statement a different server
+    # connection, so no statement cache and no reusable prepared statement names
+    return {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+    }
+
+
+def setup_db(
+    db_url: str,
+    echo_query: bool = False,
+    pool_size: int = 10,
+    max_overflow: int = 10,
+    pool_recycle_sec: int = 1800,
+    pool_pre_ping: bool = True,
+    pool_timeout_sec: float = 30,
+    pgbouncer_mode: bool = False,
+    query_stats: bool = False,
+    n_plus_one_threshold: int = 0,
+    n_plus_one_raise: bool = False,
+) -> None:
+    global engine, async_engine
     engine = create_engine(url=db_url, echo=echo_query)
+    async_engine = create_async_engine(
+        url=_to_async_url(db_url),
+        echo=echo_query,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_recycle=pool_recycle_sec,
+        pool_pre_ping=pool_pre_ping,
+        pool_timeout=pool_timeout_sec,
+        connect_args=_pgbouncer_connect_args() if pgbouncer_mode else {},
+    )
+    sync_engine = async_engine.sync_engine
+    event.listen(sync_engine, "connect", _setup_asyncpg_codecs)
+    event.listen(sync_engine, "connect", _count("connects"))
+    event.listen(sync_engine, "checkout", _count("checkouts"))
+    event.listen(sync_engine, "checkin", _count("checkins"))
+    event.listen(sync_engine, "invalidate", _count("invalidations"))
+    setup_query_stats(sync_engine, query_stats, n_plus_one_threshold, n_plus_one_raise)
+
+
+async def warmup_db(connections: int) -> int:
+    """Open `connections` pooled connections up front so the first requests
+    do not pay the tcp + tls + auth handshake. Returns the number opened."""
+    # connections above pool_size are overflow and get closed on checkin
+    connections = min(connections, async_engine.pool.size())
+    if connections <= 0:
+        return 0
+    async with AsyncExitStack() as stack:
+        conns = await asyncio.gather(
+            *(stack.enter_async_context(async_engine.connect()) for _ in range(connections))
+        )
+        await asyncio.gather(*(conn.execute(text("SELECT 1")) for conn in conns))
+    return connections
 
 
-def close_db():
+def pool_stats() -> dict:
+    pool = async_engine.pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        **_pool_counters,
+    }
+
+
+async def close_db():
+    await async_engine.dispose()
     engine.dispose()
 
+
 def get_session():
     with Session(engine) as session:
         yield session
 
+
+async def get_async_session():
+    # expire_on_commit=False: expired attributes would need a lazy (implicit IO) reload
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
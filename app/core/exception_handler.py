@@ -9,6 +9,10 @@ from app.core.response import error_response
 from app.types.errors import AppError
 
 def setup_exception_handler(app:FastAPI):
+    # AppError gets its own handler so it runs in ExceptionMiddleware, inside the user
+    # middleware (metrics, access log, Server-Timing see the 400). The Exception one runs
+    # in the outermost ServerErrorMiddleware, after every middleware already gave up.
+    app.add_exception_handler(AppError,app_error_handler)
     app.add_exception_handler(Exception,custom_exception_handler) # This will not work if FastApi.debug = true
     app.add_exception_handler(StarletteHTTPException,http_exception_handler)
     app.add_exception_handler(RequestValidationError,validation_exception_handler)
@@ -31,17 +35,11 @@ async def validation_exception_handler(request, exc: RequestValidationError):
     metadata = getattr(exc, "errors", lambda: None)()
     return error_response(message="Validation Error", code=400, data=metadata)
 
-async def custom_exception_handler(request, exc: Exception):
-    http_code = HTTPStatus.INTERNAL_SERVER_ERROR
-    message = "Something went wrong"
+async def app_error_handler(request, exc: AppError):
+    return error_response(message=str(exc), code=HTTPStatus.BAD_REQUEST)
 
-    # if error generated by our app
-    if isinstance(exc, AppError):
-        http_code = HTTPStatus.BAD_REQUEST
-        message = str(exc)
-    
-    if http_code == HTTPStatus.INTERNAL_SERVER_ERROR:
-        tb = traceback.format_exc()
-        get_logger().error(msg=exc, extra={"type": exc.__class__.__name__, "traceback": tb})
-        
-    return error_response(message=message, code=http_code)
\ No newline at end of file
+async def custom_exception_handler(request, exc: Exception):
+    # AppError is answered by app_error_handler, anything reaching here is a bug
+    tb = traceback.format_exc()
+    get_logger().error(msg=exc, extra={"type": exc.__class__.__name__, "traceback": tb})
+    return error_response(message="Something went wrong", code=HTTPStatus.INTERNAL_SERVER_ERROR)
\ No newline at end of file
@@ -1,48 +1,133 @@
+import atexit
 import logging
 import json
+import queue
+import random
 import sys
-from datetime import datetime, timezone
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+# attributes every LogRecord has, anything else on a record came in through `extra`
+_RESERVED_ATTRS = frozenset(
+    logging.LogRecord("", logging.INFO, "", 0, "", None, None).__dict__
+) | {"message", "asctime", "taskName"}
+
 
 class JsonFormatter(logging.Formatter):
     def format(self, record):
+        created = record.created
         log_record = {
-            "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(created))
+            + f".{int(created % 1 * 1_000_000):06d}Z",
             "level": record.levelname,
             "location": f"{record.filename}/{record.funcName}:{record.lineno}",
             "message": record.getMessage()
         }
         # Include any extra fields passed with the record
-        if hasattr(record, "__dict__"):
-            for key, value in record.__dict__.items():
-                # Skip default logging attributes
-                if key not in (
-                    "args", "asctime", "created", "exc_info", "exc_text", "filename",
-                    "funcName", "levelname", "levelno", "lineno", "message", "module",
-                    "msecs", "msg", "name", "pathname", "process", "processName",
-                    "relativeCreated", "stack_info", "thread", "threadName","taskName"
-                ):
-                    log_record[key] = value
-
-        return json.dumps(log_record, ensure_ascii=False)
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS:
+                log_record[key] = value
+        if record.exc_info:
+            log_record["exc_info"] = self.formatException(record.exc_info)
+
+        # default=str, an odd extra value must not cost the whole line
+        return json.dumps(log_record, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps `rate` of the records below WARNING per logger name, e.g. {"http": 0.05}.
+    Warnings and errors always pass."""
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = {_qualified(name): rate for name, rate in rates.items()}
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(record.name)
+        return rate is None or random.random() < rate
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """Never blocks the caller, records are dropped (and counted) when the writer
+    thread falls behind by more than the queue size"""
+
+    dropped = 0
+
+    def prepare(self, record):
+        # only merge msg % args here, the json formatting runs on the writer thread
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
 
+
+_ROOT_NAME = "app_logger"
 _logger = None  # Internal logger instance
+_listener: Optional[QueueListener] = None
 
-def setup_logger(level=logging.INFO):
-    """Setup the global application logger."""
-    global _logger
-    _logger = logging.getLogger("app_logger")
+
+def _qualified(name: str) -> str:
+    return f"{_ROOT_NAME}.{name}"
+
+
+def setup_logger(
+    level=logging.INFO,
+    sample_rates: Optional[dict[str, float]] = None,
+    queue_size: int = 10000,
+):
+    """Setup the global application logger.
+
+    Records go through a bounded queue to a dedicated writer thread, so a slow stdout
+    never stalls a request that logs. `sample_rates` thins out chatty loggers.
+    """
+    global _logger, _listener
+    _logger = logging.getLogger(_ROOT_NAME)
     _logger.setLevel(level)
 
     # Prevent adding multiple handlers
     if not _logger.handlers:
-        handler = logging.StreamHandler(sys.stdout)
-        handler.setFormatter(JsonFormatter())
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(JsonFormatter())
+        handler = _DroppingQueueHandler(queue.Queue(queue_size))
+        if sample_rates:
+            handler.addFilter(SamplingFilter(sample_rates))
         _logger.addHandler(handler)
+        _listener = QueueListener(handler.queue, stream)
+        _listener.start()
+        # flush what is still queued on interpreter exit
+        atexit.register(stop_logger)
 
-def get_logger():
-    """Return the configured logger instance."""
+
+def stop_logger():
+    """Write out the queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name: Optional[str] = None):
+    """Return the configured logger instance, or its `name` child (sampled separately)."""
     global _logger
     if _logger is None:
         # Default setup if setup_logger() was not called
         setup_logger()
+    if name:
+        return _logger.getChild(name)
     return _logger
+
+
+def dropped_records() -> int:
+    """Log records lost because the writer thread fell behind"""
+    if _logger is None:
+        return 0
+    return sum(getattr(h, "dropped", 0) for h in _logger.handlers)
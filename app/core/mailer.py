@@ -0,0 +1,319 @@
+import asyncio
+from dataclasses import dataclass, field
+from email.message import Message
+import smtplib
+import threading
+import time
+from typing import Optional
+
+from app.core.config import AppConfig
+from app.core.logger import get_logger
+
+
+@dataclass
+class _Connection:
+    smtp: smtplib.SMTP
+    last_used: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class _QueuedMail:
+    message: Message
+    from_addr: str
+    to_addrs: list[str]
+    enqueued_at: float = field(default_factory=time.monotonic)
+    attempts: int = 0
+    error: Optional[Exception] = None
+    done: Optional[asyncio.Future] = None  # set by `Mailer.deliver`
+
+
+class _Broken(Exception):
+    """The connection died mid batch, `unsent` must go out on a fresh one"""
+
+    def __init__(self, unsent: list[_QueuedMail]):
+        self.unsent = unsent
+
+
+class SMTPConnectionPool:
+    """Logged in SMTP connections kept open between sends.
+
+    A connection idle for longer than `health_check_sec` is probed with NOOP before it
+    is handed out and replaced when the server already dropped it.
+    """
+
+    def __init__(self, conf: AppConfig):
+        self._conf = conf
+        self._idle: list[_Connection] = []
+        self._slots = asyncio.Semaphore(conf.smtp_pool_size)
+        self.connects = 0
+
+    async def acquire(self) -> _Connection:
+        await self._slots.acquire()
+        try:
+            while self._idle:
+                conn = self._idle.pop()
+                if time.monotonic() - conn.last_used < self._conf.smtp_health_check_sec:
+                    return conn
+                if await asyncio.to_thread(self._is_alive, conn):
+                    return conn
+                await asyncio.to_thread(self._close, conn)
+            return await asyncio.to_thread(self._connect)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn: _Connection, broken: bool = False) -> None:
+        if broken:
+            self._close(conn)
+        else:
+            conn.last_used = time.monotonic()
+            self._idle.append(conn)
+        self._slots.release()
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            await asyncio.to_thread(self._quit, conn)
+
+    def _connect(self) -> _Connection:
+        conf = self._conf
+        smtp_class = smtplib.SMTP_SSL if conf.smtp_use_ssl else smtplib.SMTP
+        smtp = smtp_class(conf.smtp_host, conf.smtp_port, timeout=conf.smtp_timeout_sec)
+        try:
+            if conf.smtp_login:
+                smtp.login(conf.smtp_sender_email, conf.smtp_app_password)
+        except BaseException:
+            smtp.close()
+            raise
+        self.connects += 1
+        return _Connection(smtp)
+
+    @staticmethod
+    def _is_alive(conn: _Connection) -> bool:
+        try:
+            return conn.smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    @staticmethod
+    def _quit(conn: _Connection) -> None:
+        try:
+            conn.smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            conn.smtp.close()
+
+    @staticmethod
+    def _close(conn: _Connection) -> None:
+        conn.smtp.close()
+
+
+class Mailer:
+    """Bounded in-process send queue drained by worker tasks over pooled connections.
+
+    `enqueue` never blocks the request. Each worker takes what is queued (up to
+    `smtp_batch_size` messages) and sends it over one SMTP session, so a burst of
+    verification mails costs one TLS handshake and login instead of one per mail.
+    """
+
+    def __init__(self, conf: AppConfig):
+        self._conf = conf
+        self._queue: asyncio.Queue[_QueuedMail] = asyncio.Queue(conf.smtp_queue_size)
+        self._pool = SMTPConnectionPool(conf)
+        self._workers: list[asyncio.Task] = []
+        # batches are sent from several worker threads
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "sent": 0,
+            "failed": 0,
+            "dropped": 0,
+            "retried": 0,
+            "batches": 0,
+            "timed": 0,
+            "queue_wait_ms_total": 0.0,
+            "queue_wait_ms_max": 0.0,
+            "send_ms_total": 0.0,
+            "send_ms_max": 0.0,
+        }
+
+    def start(self) -> None:
+        self._workers = [
+            asyncio.create_task(self._work()) for _ in range(self._conf.smtp_pool_size)
+        ]
+
+    async def stop(self, timeout_sec: float = 10) -> None:
+        """Give the workers `timeout_sec` to flush the queue, then close the connections"""
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout_sec)
+        except asyncio.TimeoutError:
+            get_logger().error(
+                "Mailer stopped with unsent mails", extra={"queued": self._queue.qsize()}
+            )
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        await self._pool.close()
+
+    def enqueue(self, message: Message, from_addr: str, to_addrs: list[str]) -> bool:
+        """Queue a mail for delivery, False (and logged) when the queue is full"""
+        try:
+            self._queue.put_nowait(_QueuedMail(message, from_addr, to_addrs))
+            return True
+        except asyncio.QueueFull:
+            self._count("dropped", 1)
+            get_logger().error("Mail queue full, mail dropped", extra={"to": to_addrs})
+            return False
+
+    async def deliver(self, message: Message, from_addr: str, to_addrs: list[str]) -> None:
+        """Send a mail through the queue and wait until the server accepted it, raises
+        when it did not. Waits for room in the queue instead of dropping the mail."""
+        mail = _QueuedMail(
+            message, from_addr, to_addrs, done=asyncio.get_running_loop().create_future()
+        )
+        await self._queue.put(mail)
+        await mail.done
+
+    def stats(self) -> dict:
+        s = self._stats
+        done = s["timed"]
+        return {
+            "queued": self._queue.qsize(),
+            "queue_size": self._queue.maxsize,
+            "sent": s["sent"],
+            "failed": s["failed"],
+            "dropped": s["dropped"],
+            "retried": s["retried"],
+            "batches": s["batches"],
+            "connects": self._pool.connects,
+            "queue_wait_ms_avg": round(s["queue_wait_ms_total"] / done, 2) if done else 0.0,
+            "queue_wait_ms_max": round(s["queue_wait_ms_max"], 2),
+            "send_ms_avg": round(s["send_ms_total"] / done, 2) if done else 0.0,
+            "send_ms_max": round(s["send_ms_max"], 2),
+        }
+
+    async def _work(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self._conf.smtp_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._deliver(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                get_logger().error(
+                    "[EMAIL SMTP ERROR] batch failed", extra={"error": str(e), "mails": len(batch)}
+                )
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _deliver(self, batch: list[_QueuedMail]) -> None:
+        self._count("batches", 1)
+        while batch:
+            try:
+                conn = await self._pool.acquire()
+            except Exception as e:
+                self._count("failed", len(batch))
+                self._settle(batch, e)
+                get_logger().error(
+                    "[EMAIL SMTP ERROR] connect failed", extra={"error": str(e), "mails": len(batch)}
+                )
+                return
+            try:
+                await asyncio.to_thread(self._send_batch, conn, batch)
+            except _Broken as e:
+                self._pool.release(conn, broken=True)
+                self._settle(batch[: len(batch) - len(e.unsent)])
+                retry = [mail for mail in e.unsent if mail.attempts < self._conf.smtp_max_attempts]
+                gave_up = [mail for mail in e.unsent if mail.attempts >= self._conf.smtp_max_attempts]
+                self._count("failed", len(gave_up))
+                self._settle(gave_up, ConnectionError("SMTP connection lost"))
+                self._count("retried", len(retry))
+                batch = retry
+                continue
+            except BaseException as e:
+                self._pool.release(conn, broken=True)
+                self._settle(batch, e)
+                raise
+            self._pool.release(conn)
+            self._settle(batch)
+            return
+
+    @staticmethod
+    def _settle(batch: list[_QueuedMail], error: Optional[BaseException] = None) -> None:
+        """Wake the `deliver` callers waiting on `batch`"""
+        for mail in batch:
+            if mail.done is None or mail.done.done():
+                continue
+            err = error or mail.error
+            if isinstance(err, asyncio.CancelledError):
+                mail.done.cancel()
+            elif err is not None:
+                mail.done.set_exception(err)
+            else:
+                mail.done.set_result(None)
+
+    def _send_batch(self, conn: _Connection, batch: list[_QueuedMail]) -> None:
+        """Runs in a worker thread, raises _Broken with the rest of the batch when the
+        connection fails (the mail in flight included)"""
+        log = get_logger()
+        for i, mail in enumerate(batch):
+            mail.attempts += 1
+            started = time.monotonic()
+            try:
+                conn.smtp.send_message(mail.message, mail.from_addr, mail.to_addrs)
+            except smtplib.SMTPServerDisconnected:
+                raise _Broken(batch[i:])
+            except smtplib.SMTPResponseException as e:
+                if e.smtp_code == 421:  # server is closing the session
+                    raise _Broken(batch[i:])
+                mail.error = e
+                self._record(mail, started, ok=False)
+                log.error("[EMAIL SMTP ERROR] mail rejected", extra={"error": str(e), "to": mail.to_addrs})
+            except smtplib.SMTPException as e:
+                # refused recipients etc., the session itself is fine
+                mail.error = e
+                self._record(mail, started, ok=False)
+                log.error("[EMAIL SMTP ERROR] mail rejected", extra={"error": str(e), "to": mail.to_addrs})
+            except OSError:
+                raise _Broken(batch[i:])
+            else:
+                self._record(mail, started, ok=True)
+
+    def _count(self, name: str, n: int) -> None:
+        with self._stats_lock:
+            self._stats[name] += n
+
+    def _record(self, mail: _QueuedMail, started: float, ok: bool) -> None:
+        now = time.monotonic()
+        wait_ms = (started - mail.enqueued_at) * 1000
+        send_ms = (now - started) * 1000
+        with self._stats_lock:
+            s = self._stats
+            s["sent" if ok else "failed"] += 1
+            s["timed"] += 1
+            s["queue_wait_ms_total"] += wait_ms
+            s["queue_wait_ms_max"] = max(s["queue_wait_ms_max"], wait_ms)
+            s["send_ms_total"] += send_ms
+            s["send_ms_max"] = max(s["send_ms_max"], send_ms)
+
+
+_mailer: Optional[Mailer] = None
+
+
+def setup_mailer(conf: AppConfig) -> Mailer:
+    global _mailer
+    _mailer = Mailer(conf)
+    _mailer.start()
+    return _mailer
+
+
+def get_mailer() -> Optional[Mailer]:
+    return _mailer
+
+
+async def close_mailer() -> None:
+    global _mailer
+    if _mailer is not None:
+        await _mailer.stop()
+        _mailer = None
@@ -0,0 +1,99 @@
+from bisect import bisect_left
+from typing import Callable, Dict, Optional
+
+from app.core.logger import get_logger
+
+# Prometheus text exposition (format 0.0.4) of an in-process registry. Everything is
+# recorded from the event loop, so no locking; per worker process, Prometheus sums.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# seconds, upper bounds of the latency histogram buckets (+Inf implied)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        total = 0
+        out = []
+        for bound, n in zip((*self.buckets, "+Inf"), self.counts):
+            total += n
+            out.append((str(bound), total))
+        return out
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.latency: Dict[tuple[str, str], Histogram] = {}
+        self.responses: Dict[tuple[str, str, int], int] = {}
+        self.in_flight = 0
+        self._stats: Dict[str, Callable[[], Optional[dict]]] = {}
+
+    def observe_request(self, method: str, route: str, status: int, duration_sec: float) -> None:
+        key = (method, route)
+        histogram = self.latency.get(key)
+        if histogram is None:
+            histogram = self.latency[key] = Histogram()
+        histogram.observe(duration_sec)
+        status_key = (method, route, status)
+        self.responses[status_key] = self.responses.get(status_key, 0) + 1
+
+    def register_stats(self, name: str, stats: Callable[[], Optional[dict]]) -> None:
+        """Publish the numeric values of `stats()` as `app_<name>_<key>` gauges on every
+        scrape (pool, cache and mailer stats ...)"""
+        self._stats[name] = stats
+
+    def render(self) -> str:
+        lines = [
+            "# HELP http_request_duration_seconds Request latency per route template",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), histogram in self.latency.items():
+            labels = f'method="{_escape(method)}",route="{_escape(route)}"'
+            for bound, count in histogram.cumulative():
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {histogram.sum}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {histogram.count}")
+
+        lines.append("# HELP http_responses_total Responses per route template and status")
+        lines.append("# TYPE http_responses_total counter")
+        for (method, route, status), count in self.responses.items():
+            lines.append(
+                f'http_responses_total{{method="{_escape(method)}",route="{_escape(route)}",'
+                f'status="{status}"}} {count}'
+            )
+
+        lines.append("# HELP http_requests_in_flight Requests being served")
+        lines.append("# TYPE http_requests_in_flight gauge")
+        lines.append(f"http_requests_in_flight {self.in_flight}")
+
+        for name, stats in self._stats.items():
+            try:
+                values = stats() or {}
+            except Exception as e:
+                get_logger().error("Metrics stats failed", extra={"stats": name, "error": str(e)})
+                continue
+            for key, value in values.items():
+                if isinstance(value, (int, float)):
+                    metric = f"app_{name}_{key}"
+                    lines.append(f"# TYPE {metric} gauge")
+                    lines.append(f"{metric} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,172 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+import re
+import time
+from typing import Iterator, Optional
+
+from sqlalchemy import Engine, event
+
+from app.core.logger import get_logger
+
+# Per request SQL accounting (Server-Timing, access log), N+1 detection and query
+# budgets. Cursor hooks are only installed on the engine when one of them is in use.
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\$\d+|%\(\w+\)s|\?|\b\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r"\?(?:\s*,\s*\?)+")
+_SPACES = re.compile(r"\s+")
+
+
+class NPlusOneError(Exception):
+    """The same statement shape ran more often than the threshold in one request"""
+
+
+@lru_cache(maxsize=2048)
+def normalize_sql(statement: str) -> str:
+    """Statement shape: literals and bind parameters become ?, IN lists collapse to one"""
+    shape = _LITERALS.sub("?", _SPACES.sub(" ", statement).strip())
+    return _LISTS.sub("?", shape)
+
+
+class QueryStats:
+    """SQL run on behalf of one request (see `start_query_stats`) or one `capture_queries`"""
+
+    __slots__ = ("label", "queries", "rows", "db_sec", "shapes", "statements")
+
+    def __init__(self, label: str = "", track_shapes: bool = False, keep_statements: bool = False):
+        self.label = label
+        self.queries = 0
+        self.rows = 0
+        self.db_sec = 0.0
+        self.shapes: Optional[dict[str, int]] = {} if track_shapes else None
+        self.statements: Optional[list[str]] = [] if keep_statements else None
+
+    def record(self, statement: str, duration_sec: float, rowcount: int) -> int:
+        """Add one statement, returns how often its shape ran so far (0 when not tracked)"""
+        self.queries += 1
+        self.db_sec += duration_sec
+        # -1 when the driver does not know
+        if rowcount > 0:
+            self.rows += rowcount
+        if self.statements is not None:
+            self.statements.append(statement)
+        if self.shapes is None:
+            return 0
+        shape = normalize_sql(statement)
+        repeats = self.shapes[shape] = self.shapes.get(shape, 0) + 1
+        return repeats
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.db_sec * 1000:.2f};desc="{self.queries} queries"'
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+# `capture_queries` blocks, they see every statement whatever context it runs in
+_captures: list[QueryStats] = []
+_enabled = False
+_n_plus_one_threshold = 0
+_n_plus_one_raise = False
+_engines: list[Engine] = []
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _captures or _current.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_started")
+    # empty when accounting started while the statement was already running
+    if not started:
+        return
+    duration = time.perf_counter() - started.pop()
+    stats = _current.get()
+    for capture in _captures:
+        capture.record(statement, duration, cursor.rowcount)
+    if stats is not None:
+        repeats = stats.record(statement, duration, cursor.rowcount)
+        if repeats == _n_plus_one_threshold + 1 and _n_plus_one_threshold:
+            _report_n_plus_one(stats, statement)
+
+
+def _handle_error(exception_context):
+    # a failed statement never reaches the after hook, do not leave its start time on
+    # the pooled connection
+    conn = exception_context.connection
+    if conn is not None:
+        conn.info.pop("query_started", None)
+
+
+def _report_n_plus_one(stats: QueryStats, statement: str) -> None:
+    message = (
+        f"same statement ran more than {_n_plus_one_threshold} times in {stats.label or 'one request'}"
+    )
+    if _n_plus_one_raise:
+        raise NPlusOneError(f"{message}: {normalize_sql(statement)}")
+    get_logger("db").warning(
+        "Possible N+1 query", extra={"detail": message, "shape": normalize_sql(statement)[:500]}
+    )
+
+
+def install(engine: Engine) -> None:
+    """Add the cursor hooks to `engine` (idempotent)"""
+    if engine not in _engines:
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+        _engines.append(engine)
+
+
+def setup_query_stats(
+    engine: Engine, enabled: bool, n_plus_one_threshold: int = 0, n_plus_one_raise: bool = False
+) -> None:
+    """`enabled` turns on per request accounting, `n_plus_one_threshold` (dev/test) also
+    fingerprints every statement and warns, or raises, past that many repeats"""
+    global _enabled, _n_plus_one_threshold, _n_plus_one_raise
+    _enabled = enabled or n_plus_one_threshold > 0
+    _n_plus_one_threshold = n_plus_one_threshold
+    _n_plus_one_raise = n_plus_one_raise
+    if _enabled:
+        install(engine)
+
+
+def start_query_stats(label: str = "") -> Optional[QueryStats]:
+    """Count the SQL run from the current context on, None when query stats are off.
+    The cursor hooks are only installed when they are on, so off costs nothing."""
+    if not _enabled:
+        return None
+    stats = QueryStats(label, track_shapes=_n_plus_one_threshold > 0)
+    _current.set(stats)
+    return stats
+
+
+@contextmanager
+def capture_queries(engine: Optional[Engine] = None) -> Iterator[QueryStats]:
+    """Record every statement run while the block is active, across tasks and threads
+    (e.g. requests made through a TestClient, background tasks included). Defaults to
+    the app's async engine."""
+    if engine is None:
+        from app.core import database
+
+        engine = database.async_engine.sync_engine
+    install(engine)
+    stats = QueryStats(keep_statements=True)
+    _captures.append(stats)
+    try:
+        yield stats
+    finally:
+        _captures.remove(stats)
+
+
+@contextmanager
+def assert_max_queries(n: int, engine: Optional[Engine] = None) -> Iterator[QueryStats]:
+    """Query budget for tests:
+
+        with assert_max_queries(4):
+            client.get("/event/")
+    """
+    with capture_queries(engine) as stats:
+        yield stats
+    if stats.queries > n:
+        listing = "\n".join(f"  {i + 1}. {normalize_sql(s)}" for i, s in enumerate(stats.statements))
+        raise AssertionError(f"expected at most {n} queries, ran {stats.queries}:\n{listing}")
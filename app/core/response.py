@@ -1,45 +1,104 @@
-from datetime import datetime
-import json
+from contextvars import ContextVar
+import hashlib
 from typing import Any, Optional
-from fastapi import Response
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from fastapi import Query, Request, Response
+from pydantic import TypeAdapter
+from app.core.config import get_config
 from app.dtos.response_dto import AppResponse
 
-def serialize_data(data: Any) -> Any:
-    """Recursively serialize data for JSONResponse."""
-    if isinstance(data, BaseModel):
-        return data.model_dump(by_alias=True)
-    elif isinstance(data, list):
-        return [serialize_data(item) for item in data]
-    elif isinstance(data, dict):
-        return {k: serialize_data(v) for k, v in data.items()}
-    return data
+# set per request by `pretty_json_query`, pretty printing is opt-in
+_pretty_json: ContextVar[bool] = ContextVar("pretty_json", default=False)
+_response_adapter = TypeAdapter(AppResponse)
+
+
+async def pretty_json_query(
+    pretty: bool = Query(default=False, description="indent the json response"),
+):
+    """App level dependency, `?pretty=true` indents the response body"""
+    _pretty_json.set(pretty)
+
+
+def is_pretty() -> bool:
+    """Whether the current request gets indented json"""
+    if _pretty_json.get():
+        return True
+    conf = get_config()
+    return conf is not None and conf.pretty_json
+
+
+def make_etag(*version: Any, weak: bool = False) -> str:
+    """Strong ETag from the version parts of a resource (ids, updated_at, counts ...).
+
+    The representation (pretty or compact json) is part of the tag, byte for byte
+    different bodies must not share a strong ETag. `weak` for bodies that are only
+    equivalent, e.g. presigned urls signed separately by each worker.
+    """
+    raw = "|".join(str(part) for part in (*version, is_pretty()))
+    tag = '"' + hashlib.blake2b(raw.encode(), digest_size=16).hexdigest() + '"'
+    return f"W/{tag}" if weak else tag
+
+
+def not_modified_response(request: Request, etag: str) -> Optional[Response]:
+    """304 when If-None-Match already names `etag`, else None and the caller builds the body"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+    # If-None-Match uses the weak comparison, W/ prefixes are ignored
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if "*" in tags or etag.removeprefix("W/") in tags:
+        return Response(status_code=304, headers=_etag_headers(etag))
+    return None
+
+
+def _etag_headers(etag: str) -> dict:
+    # clients may keep the body but must revalidate before reusing it
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def _dump(success: bool, data: Optional[Any], message: str) -> bytes:
+    # serialized straight to bytes by pydantic-core, no intermediate dicts.
+    # fallback=str keeps non json values (e.g. exceptions in validation errors) printable
+    return _response_adapter.dump_json(
+        AppResponse(success=success, data=data, message=message),
+        by_alias=True,
+        indent=2 if is_pretty() else None,
+        fallback=str,
+    )
+
+
+def success_body(data: Optional[Any] = None, message: str = "OK") -> bytes:
+    """Serialized success envelope for the current request, for callers caching bodies"""
+    return _dump(True, data, message)
+
+
+def bytes_response(content: bytes, code: int = 200, etag: Optional[str] = None) -> Response:
+    """Response for an already serialized json body (see `success_body`)"""
+    return Response(
+        status_code=code,
+        content=content,
+        media_type="application/json",
+        headers=_etag_headers(etag) if etag else None,
+    )
+
 
 def format_response(
     success: bool,
     data: Optional[Any] = None,
     message: str = "",
-    code: int = 200
-) -> JSONResponse:
-    if isinstance(data, BaseModel):
-        data = data.model_dump(by_alias=True)
-    response_dict = {
-        "success": success,
-        "data": serialize_data(data),
-        "message": message,
-    }
-    response_json = json.dumps(response_dict,indent=4, sort_keys=True, default=str)
-    return Response(status_code=code, content=response_json, media_type="application/json")
+    code: int = 200,
+    etag: Optional[str] = None,
+) -> Response:
+    return bytes_response(_dump(success, data, message), code=code, etag=etag)
 
 
 def success_response(
     data: Optional[Any] = None,
     message: str = "OK",
     code: int = 200,
-) -> JSONResponse:
+    etag: Optional[str] = None,
+) -> Response:
     return format_response(
-        success=True, data=data, message=message, code=code
+        success=True, data=data, message=message, code=code, etag=etag
     )
 
 
@@ -47,7 +106,7 @@ def error_response(
     message: str = "Error",
     code: int = 500,
     data: Optional[Any] = None,
-) -> JSONResponse:
+) -> Response:
     return format_response(
         success=False, data=data, message=message, code=code
     )
@@ -1,4 +1,3 @@
-import asyncio
 from http import HTTPStatus
 from typing import Annotated, Callable, List
 from fastapi import Depends, HTTPException
@@ -10,7 +9,8 @@ from fastapi.security import (
 from app.dependencies.session_dep import SessionDep
 from app.enums.role_enum import UserRole
 from app.models.app_user_model import AppUser
-from app.utils.auth_utils import verify_extract_user_id
+from app.types.auth_claims import AuthClaims
+from app.utils.auth_utils import verify_extract_claims, verify_extract_user_id
 
 
 http_bearer_schema = HTTPBearer()
@@ -21,7 +21,7 @@ async def get_current_user(
     session: SessionDep,
 ) -> AppUser:
     from app.services.user_service import (
-        find_by_id,
+        find_by_id_cached,
     )  # Import here to avoid circular import
 
     user_id, is_success, err_str = verify_extract_user_id(token.credentials)
@@ -37,7 +37,7 @@ async def get_current_user(
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    user = await asyncio.to_thread(find_by_id, user_id, session)
+    user = await find_by_id_cached(user_id, session)
     if not user:
         raise HTTPException(
             status_code=HTTPStatus.UNAUTHORIZED,
@@ -48,27 +48,57 @@ async def get_current_user(
     return user
 
 
+async def get_current_claims(
+    token: Annotated[HTTPAuthorizationCredentials, Depends(http_bearer_schema)],
+) -> AuthClaims:
+    """Authenticate from the access token alone, no database read"""
+    claims, is_success, err_str = verify_extract_claims(token.credentials)
+    if not is_success:
+        raise HTTPException(
+            status_code=HTTPStatus.UNAUTHORIZED,
+            detail=err_str,
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return claims
+
+
+def _check_any_role(user_roles: List[str], roles: List[UserRole]) -> None:
+    if roles is not None:
+        has_access = False
+        for r in user_roles:
+            if r in roles:
+                has_access = True
+                break
+        if not has_access:
+            raise HTTPException(
+                status_code=HTTPStatus.FORBIDDEN,
+                detail="Does not have enough access",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+
+
 def auth_with_any_role(roles: List[UserRole]) -> Callable:
-    def checker(user: Annotated[AppUser, Depends(get_current_user)]):
-        if roles is not None:
-            has_access = False
-            user_roles = user.roles.split(",")
-            for r in user_roles:
-                if r in roles:
-                    has_access = True
-                    break
-            if not has_access:
-                raise HTTPException(
-                    status_code=HTTPStatus.FORBIDDEN,
-                    detail="Does not have enough access",
-                    headers={"WWW-Authenticate": "Bearer"},
-                )
+    async def checker(user: Annotated[AppUser, Depends(get_current_user)]):
+        _check_any_role(user.roles.split(","), roles)
         return user
 
     return checker
 
 
+def claims_with_any_role(roles: List[UserRole]) -> Callable:
+    async def checker(claims: Annotated[AuthClaims, Depends(get_current_claims)]):
+        _check_any_role(claims.roles, roles)
+        return claims
+
+    return checker
+
+
 AuthDepsOnly = Depends(get_current_user) # for router which do not support Annotation
 AuthDeps = Annotated[AppUser, Depends(get_current_user)]
 AuthAdminOnlyDeps = Annotated[AppUser, Depends(auth_with_any_role([UserRole.ADMIN]))]
 AuthUserOnlyDeps = Annotated[AppUser, Depends(auth_with_any_role([UserRole.USER]))]
+
+# token only variants, roles come from the access token claims (no DB read)
+ClaimsDepsOnly = Depends(get_current_claims)
+ClaimsDeps = Annotated[AuthClaims, Depends(get_current_claims)]
+ClaimsAdminOnlyDeps = Annotated[AuthClaims, Depends(claims_with_any_role([UserRole.ADMIN]))]
@@ -82,5 +82,10 @@ class LoginRequestDto(BaseDto):
 class LoginResponseDto(BaseDto):
     user :AppUserRead
     access_token :str
+    refresh_token :str
+
+
+class RefreshTokenRequestDto(BaseDto):
+    refresh_token: str = Field(title="Refresh Token")
 
 
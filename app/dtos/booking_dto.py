@@ -0,0 +1,44 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import List
+import uuid
+from pydantic import Field, field_validator
+from app.dtos.base_dto import BaseDto
+
+
+class BookingTicketInputDto(BaseDto):
+    ticket_id: uuid.UUID
+    qty: int = Field(..., gt=0, le=50)
+
+
+class BookingCreateDto(BaseDto):
+    event_id: uuid.UUID
+    tickets: List[BookingTicketInputDto] = Field(..., min_length=1)
+
+    @field_validator("tickets")
+    def unique_ticket_ids(cls, v: List[BookingTicketInputDto]):
+        if len({t.ticket_id for t in v}) != len(v):
+            raise ValueError("ticket_id must be unique")
+        return v
+
+
+class BookedTicketRead(BaseDto):
+    ticket_id: uuid.UUID
+    name: str
+    price: Decimal
+    qty: int
+
+
+class BookingRead(BaseDto):
+    id: uuid.UUID
+    event_id: uuid.UUID
+    total: Decimal
+    date: datetime
+    tickets: List[BookedTicketRead]
+
+
+class TicketHoldRead(BaseDto):
+    id: uuid.UUID
+    event_id: uuid.UUID
+    expires_at: datetime
+    tickets: List[BookedTicketRead]
@@ -103,6 +103,7 @@ class EventUpdateDto(BaseDto):
                 uuid.UUID(item)
             except ValueError:
                 raise ValueError("Each category_id must be a valid UUID string")
+        return v
 
 
 class EventRead(BaseDto):
@@ -120,4 +121,9 @@ class EventRead(BaseDto):
     event_banner_photo: Optional[FileRefDto] = None
     event_photo: Optional[FileRefDto] = None
     tickets: Optional[List[TicketRead]] = None
+    inventory_shards: int = 0
     created_at: Optional[datetime] = None
+
+
+class InventoryShardsDto(BaseDto):
+    shards: int = Field(..., ge=0, le=64, description="0 turns sharded counters off")
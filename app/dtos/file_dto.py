@@ -1,5 +1,6 @@
-from typing import Optional
+from typing import Dict, Optional
 import uuid
+from pydantic import Field
 from app.dtos.base_dto import BaseDto
 
 
@@ -9,3 +10,23 @@ class FileRead(BaseDto):
     type: Optional[str]
     size: Optional[int]
     link: Optional[str]
+
+
+class FileUploadUrlCreateDto(BaseDto):
+    folder: str = Field(..., min_length=1, max_length=255)
+    filename: str = Field(..., min_length=1, max_length=255)
+    content_type: str
+    size: Optional[int] = Field(default=None, gt=0)  # checked early when the client knows it
+
+
+class FileUploadUrlRead(BaseDto):
+    url: str
+    fields: Dict[str, str]  # send as form fields, before the file field
+    key: str
+    max_size: int
+    expires_in: int
+    upload_token: str  # hand back to POST /file/finalize once the upload is done
+
+
+class FileFinalizeDto(BaseDto):
+    upload_token: str
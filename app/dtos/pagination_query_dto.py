@@ -10,8 +10,19 @@ class PaginationQueryDto(BaseDto):
     page: int = Field(default=1, ge=0)
     order_by: str | None = Field(default=None)
     order_direction: Literal["desc", "asc"] = "desc"
+    cursor: str | None = Field(
+        default=None,
+        description="next_cursor of the previous page, switches to keyset pagination and ignores page",
+    )
+    count: Literal["exact", "estimate", "cached", "none"] = Field(
+        default="exact",
+        description="how total is computed, estimate/cached/none are cheaper on big tables",
+    )
 
 
 class EventQueryDto(PaginationQueryDto):
+    order_by: str | None = Field(
+        default=None, description="created_at, name or rank (search relevance)"
+    )
     categoryIds: str | None = Field(default="", description="comma separated")
     statuses: str | None = Field(default="", description="comma separated")
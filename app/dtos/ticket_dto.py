@@ -32,4 +32,5 @@ class TicketRead(BaseDto):
     price: Decimal
     total_qty: int
     total_booked: int
+    total_held: int
     created_at: Optional[datetime]
@@ -4,7 +4,7 @@ from logging import Logger
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.middleware.http_logger import HTTPLoggerMiddleware
+from app.middleware.http_metrics import HTTPMetricsMiddleware
 
 
 
@@ -16,4 +16,4 @@ def setup_middleware(app:FastAPI):
         allow_methods=["*"],
         allow_headers=["*"],
     )
-    app.add_middleware(middleware_class=HTTPLoggerMiddleware)
\ No newline at end of file
+    app.add_middleware(middleware_class=HTTPMetricsMiddleware)
\ No newline at end of file
@@ -0,0 +1,73 @@
+import logging
+import time
+from typing import Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.logger import get_logger
+from app.core.metrics import registry
+from app.core.query_stats import QueryStats, start_query_stats
+
+# requests no route matched are one series, raw paths would explode the label set
+_UNMATCHED = "unmatched"
+
+
+class HTTPMetricsMiddleware:
+    """Records latency, status and in-flight metrics per route template (see
+    app/core/metrics.py) and writes the access log line.
+
+    A plain ASGI middleware: unlike BaseHTTPMiddleware it adds no task and no body
+    stream per request, it only wraps `send` to catch the status code.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500  # when the app fails before starting a response
+        query_stats = start_query_stats(f"{scope['method']} {scope['path']}")
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if query_stats is not None:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", query_stats.server_timing().encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        registry.in_flight += 1
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            registry.in_flight -= 1
+            duration = time.perf_counter() - start
+            # the router stores the matched route in the (shared) scope
+            route = scope.get("route")
+            template = getattr(route, "path", None) or _UNMATCHED
+            registry.observe_request(scope["method"], template, status, duration)
+            _log(scope, status, duration, query_stats)
+
+
+def _log(
+    scope: Scope, status: int, duration: float, query_stats: Optional[QueryStats]
+) -> None:
+    # errors are never sampled out (see log_sample_rates)
+    level = logging.ERROR if status >= 500 else logging.WARNING if status >= 400 else logging.INFO
+    extra = {
+        "method": scope["method"],
+        "path": scope["path"],
+        "status_code": status,
+        "duration_ms": round(duration * 1000, 2),
+    }
+    if query_stats is not None:
+        extra["db_queries"] = query_stats.queries
+        extra["db_rows"] = query_stats.rows
+        extra["db_ms"] = round(query_stats.db_sec * 1000, 2)
+    get_logger("http").log(level, "HTTP Request", extra=extra)
@@ -4,10 +4,13 @@ from .event_model import Event
 from .category_model import Category
 from .event_category_model import EventCategory
 from .event_ticket_model import EventTicket
+from .event_ticket_shard_model import EventTicketShard
 from .booking_model import Booking
 from .booking_ticket_model import BookingTicket
 from .payment_model import Payment
 from .token_model import Token
+from .ticket_hold_model import TicketHold, TicketHoldItem
+from .outbox_model import OutboxMessage
 
 __all__ = [
     "File",
@@ -18,8 +21,12 @@ __all__ = [
     "Category",
     "EventCategory",
     "EventTicket",
+    "EventTicketShard",
     "Booking",
     "BookingTicket",
     "Payment",
-    "Token"
+    "Token",
+    "TicketHold",
+    "TicketHoldItem",
+    "OutboxMessage",
 ]
@@ -15,4 +15,4 @@ class Booking(SQLModel, table=True):
     user_id: Optional[UUID] = Field(default=None, foreign_key="app_user.id")
     event_id: Optional[UUID] = Field(default=None, foreign_key="event.id")
     total: Decimal = Field(default=0)
-    date: datetime = Field(default_factory=datetime.now(timezone.utc))
+    date: datetime = Field(default_factory=lambda : datetime.now(timezone.utc))
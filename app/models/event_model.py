@@ -5,7 +5,7 @@ from decimal import Decimal
 import uuid
 from sqlmodel import Relationship, SQLModel, Field
 from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy import Column
+from sqlalchemy import Column, Enum as SAEnum
 
 from app.enums.event_status import EventStatus
 from app.models.event_category_model import EventCategory
@@ -34,8 +34,11 @@ class Event(SQLModel, table=True):
     event_banner_photo_id: Optional[UUID] = Field(default=None, foreign_key="file.id")
     event_photo_id: Optional[UUID] = Field(default=None, foreign_key="file.id")
     status: Optional[EventStatus] = Field(
-        default=EventStatus.DRAFT, foreign_key="file.id"
+        default=EventStatus.DRAFT,
+        # column is a VARCHAR, asyncpg would otherwise bind it as a native pg enum
+        sa_type=SAEnum(EventStatus, native_enum=False, length=20),
     )
+    inventory_shards: int = Field(default=0)  # > 0 spreads ticket counters over that many rows
 
     event_layout_photo: Optional[File] = Relationship(
         back_populates=None,
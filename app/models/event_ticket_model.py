@@ -19,6 +19,8 @@ class EventTicket(SQLModel, table=True):
     price: Decimal = Field(default=0)
     total_qty: int = Field(default=0)
     total_booked: int = Field(default=0)
+    total_held: int = Field(default=0)  # sum of active ticket holds
+    shard_qty: int = Field(default=0)  # capacity handed to event_ticket_shard rows
 
     event: Optional["Event"] = Relationship(
         back_populates="tickets", sa_relationship_kwargs={"lazy": "noload"}
@@ -0,0 +1,13 @@
+import uuid
+from sqlmodel import Field, SQLModel
+
+
+class EventTicketShard(SQLModel, table=True):
+    """Slice of an event ticket's capacity, see migrations/0007_inventory_shards.sql"""
+    __tablename__ = "event_ticket_shard"
+
+    event_ticket_id: uuid.UUID = Field(foreign_key="event_ticket.id", primary_key=True)
+    shard: int = Field(primary_key=True)
+    total_qty: int = Field(default=0)
+    total_booked: int = Field(default=0)
+    total_held: int = Field(default=0)
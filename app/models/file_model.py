@@ -20,7 +20,7 @@ class File(SQLModel, table=True):
     @property
     def link(self) -> Optional[str]:
         if self.file_path:
-            return s3.create_presigned_url(self.file_path)
+            return s3.get_presigned_url(self.file_path)
         return ""
     
     class Config:
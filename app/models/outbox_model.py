@@ -0,0 +1,22 @@
+from datetime import datetime, timezone
+from typing import Dict, Optional
+import uuid
+from sqlalchemy import Column
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlmodel import Field, SQLModel
+
+
+class OutboxMessage(SQLModel, table=True):
+    __tablename__ = "outbox"
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    created_at: datetime = Field(default_factory=lambda : datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda : datetime.now(timezone.utc))
+
+    kind: str = Field(...)
+    payload: Dict = Field(sa_column=Column(JSONB, nullable=False))
+    idempotency_key: Optional[str] = Field(default=None, unique=True)
+    attempts: int = 0
+    available_at: datetime = Field(default_factory=lambda : datetime.now(timezone.utc))
+    sent_at: Optional[datetime] = None
+    last_error: Optional[str] = None
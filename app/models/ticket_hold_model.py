@@ -0,0 +1,29 @@
+from datetime import datetime, timezone
+from typing import Optional
+import uuid
+from sqlmodel import Field, SQLModel
+
+
+class TicketHold(SQLModel, table=True):
+    __tablename__ = "ticket_hold"
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    created_at: datetime = Field(default_factory=lambda : datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda : datetime.now(timezone.utc))
+
+    user_id: Optional[uuid.UUID] = Field(default=None, foreign_key="app_user.id")
+    event_id: Optional[uuid.UUID] = Field(default=None, foreign_key="event.id")
+    expires_at: datetime = Field(...)
+
+
+class TicketHoldItem(SQLModel, table=True):
+    __tablename__ = "ticket_hold_item"
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    created_at: datetime = Field(default_factory=lambda : datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda : datetime.now(timezone.utc))
+
+    hold_id: uuid.UUID = Field(foreign_key="ticket_hold.id")
+    event_ticket_id: uuid.UUID = Field(foreign_key="event_ticket.id")
+    qty: int = Field(...)
+    shard: Optional[int] = None  # NULL when held on the event_ticket row itself
@@ -2,7 +2,7 @@
 
 from fastapi import FastAPI
 
-from app.routers import file_upload_router, user_router, event_router, category_router, ticket_router
+from app.routers import file_upload_router, user_router, event_router, category_router, ticket_router, booking_router, metrics_router
 
 from . import auth_router
 
@@ -13,4 +13,6 @@ def setup_router(app: FastAPI):
     app.include_router(file_upload_router.router)
     app.include_router(category_router.router)
     app.include_router(event_router.router)
-    app.include_router(ticket_router.router)
\ No newline at end of file
+    app.include_router(ticket_router.router)
+    app.include_router(booking_router.router)
+    app.include_router(metrics_router.router)
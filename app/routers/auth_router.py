@@ -3,7 +3,12 @@ from fastapi import Body
 from fastapi.routing import APIRouter
 from app.dependencies.auth_dep import AuthDeps
 from app.dependencies.session_dep import SessionDep
-from app.dtos.auth_dto import LoginRequestDto, LoginResponseDto, RegisterRequestDto
+from app.dtos.auth_dto import (
+    LoginRequestDto,
+    LoginResponseDto,
+    RefreshTokenRequestDto,
+    RegisterRequestDto,
+)
 from app.core.response import success_response
 from app.dtos.response_dto import AppResponse
 from app.dtos.user_dto import AppUserRead
@@ -18,25 +23,31 @@ router = APIRouter(
 
 
 @router.post("/register", response_model=AppResponse[AppUserRead])
-def register(
+async def register(
     body: Annotated[
         RegisterRequestDto,
         Body(),
     ],
     session: SessionDep,
 ):
-    data = auth_service.register_user(body, session)
+    data = await auth_service.register_user(body, session)
     return success_response(
         data=data, code=200, message="New user created successfully"
     )
 
 
 @router.post("/login", response_model=AppResponse[LoginResponseDto])
-def login(body: Annotated[LoginRequestDto, Body()], session: SessionDep):
-    data = auth_service.login_user(body, session)
+async def login(body: Annotated[LoginRequestDto, Body()], session: SessionDep):
+    data = await auth_service.login_user(body, session)
     return success_response(data=data, message="New user created successfully")
 
 
+@router.post("/refresh", response_model=AppResponse[LoginResponseDto])
+async def refresh(body: Annotated[RefreshTokenRequestDto, Body()], session: SessionDep):
+    data = await auth_service.refresh_tokens(body, session)
+    return success_response(data=data)
+
+
 @router.get("/me", response_model=AppResponse[AppUser])
-def me(user: AuthDeps):
+async def me(user: AuthDeps):
     return success_response(data=AppUserRead.model_validate(user))
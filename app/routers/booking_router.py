@@ -0,0 +1,38 @@
+from http import HTTPStatus
+from typing import Annotated, Any
+from uuid import UUID
+from fastapi import APIRouter, Body, Path
+
+from app.core.response import success_response
+from app.dependencies.session_dep import SessionDep
+from app.dependencies.auth_dep import ClaimsDeps
+from app.dtos.booking_dto import BookingCreateDto, BookingRead, TicketHoldRead
+from app.dtos.response_dto import AppResponse
+from app.services import booking_service, ticket_hold_service
+
+
+router = APIRouter(tags=["Booking"], prefix="/booking")
+
+
+@router.post("/", response_model=AppResponse[BookingRead])
+async def create_booking(session: SessionDep, claims: ClaimsDeps, body: Annotated[BookingCreateDto, Body()]):
+    booking = await booking_service.create_booking(claims.user_id, body, session)
+    return success_response(data=booking, code=HTTPStatus.CREATED)
+
+
+@router.post("/hold", response_model=AppResponse[TicketHoldRead])
+async def hold_tickets(session: SessionDep, claims: ClaimsDeps, body: Annotated[BookingCreateDto, Body()]):
+    hold = await booking_service.hold_tickets(claims.user_id, body, session)
+    return success_response(data=hold, code=HTTPStatus.CREATED)
+
+
+@router.post("/hold/{id}/confirm", response_model=AppResponse[BookingRead])
+async def confirm_hold(session: SessionDep, claims: ClaimsDeps, id: UUID = Path(...)):
+    booking = await booking_service.confirm_hold(claims.user_id, id, session)
+    return success_response(data=booking, code=HTTPStatus.CREATED)
+
+
+@router.delete("/hold/{id}", response_model=AppResponse[Any])
+async def cancel_hold(session: SessionDep, claims: ClaimsDeps, id: UUID = Path(...)):
+    await ticket_hold_service.cancel_hold(id, claims.user_id, session)
+    return success_response(data=True, code=HTTPStatus.OK)
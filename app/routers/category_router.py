@@ -1,10 +1,10 @@
 from http import HTTPStatus
 from typing import Annotated, Any, List
-from fastapi import APIRouter, Body
+from fastapi import APIRouter, Body, Request
 
-from app.core.response import success_response
+from app.core.response import bytes_response, make_etag, not_modified_response, success_response
 from app.dependencies.session_dep import SessionDep
-from app.dependencies.auth_dep import AuthAdminOnlyDeps
+from app.dependencies.auth_dep import ClaimsAdminOnlyDeps
 from app.dtos.category_dto import CategoryCreateDto, CategoryRead
 from app.dtos.response_dto import AppResponse
 from app.services import category_service
@@ -14,12 +14,15 @@ router = APIRouter(tags=["Category"], prefix="/category")
 
 
 @router.get("/", response_model=AppResponse[List[CategoryRead]])
-def list_categories(session: SessionDep):
-    cats = category_service.find_all(session)
-    return success_response(data=[CategoryRead.model_validate(c) for c in cats], code=HTTPStatus.OK)
+async def list_categories(request: Request, session: SessionDep):
+    catalog = await category_service.get_catalog(session)
+    etag = make_etag("categories", *catalog.version)
+    if not_modified := not_modified_response(request, etag):
+        return not_modified
+    return bytes_response(catalog.body(), code=HTTPStatus.OK, etag=etag)
 
 
 @router.post("/", response_model=AppResponse[CategoryRead])
-def create_category(session: SessionDep, admin: AuthAdminOnlyDeps, body: Annotated[CategoryCreateDto, Body()]):
-    new = category_service.create(body, session)
+async def create_category(session: SessionDep, admin: ClaimsAdminOnlyDeps, body: Annotated[CategoryCreateDto, Body()]):
+    new = await category_service.create(body, session)
     return success_response(data=CategoryRead.model_validate(new), code=HTTPStatus.CREATED)
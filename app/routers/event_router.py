@@ -1,15 +1,16 @@
 from http import HTTPStatus
 from typing import Annotated, Any, List
 from uuid import UUID
-from fastapi import APIRouter, Body, Path, Query
+from fastapi import APIRouter, Body, Path, Query, Request
 
-from app.core.response import success_response
+from app.core.aws import s3
+from app.core.response import make_etag, not_modified_response, success_response
 from app.dependencies.session_dep import SessionDep
-from app.dependencies.auth_dep import AuthDeps, AuthAdminOnlyDeps, AuthDepsOnly
+from app.dependencies.auth_dep import ClaimsAdminOnlyDeps
 from app.dtos.pagination_query_dto import EventQueryDto, PaginationQueryDto
 from app.dtos.response_dto import AppResponse
-from app.dtos.event_dto import EventCreateDto, EventRead, EventUpdateDto
-from app.services import event_service
+from app.dtos.event_dto import EventCreateDto, EventRead, EventUpdateDto, InventoryShardsDto
+from app.services import event_service, inventory_shard_service
 from app.utils.pagination_utils import PaginationOption
 from app.types.pagination_data import PaginationData
 
@@ -18,26 +19,28 @@ router = APIRouter(tags=["Event"], prefix="/event")
 
 
 @router.post("/", response_model=AppResponse[EventRead])
-def create_event(
+async def create_event(
     session: SessionDep,
-    admin: AuthAdminOnlyDeps,
+    admin: ClaimsAdminOnlyDeps,
     body: Annotated[EventCreateDto, Body()],
 ):
-    ev = event_service.create_event(str(admin.id), body, session)
+    ev = await event_service.create_event(str(admin.user_id), body, session)
     return success_response(data=EventRead.model_validate(ev), code=HTTPStatus.CREATED)
 
 
 @router.get("/", response_model=AppResponse[PaginationData[EventRead]])
-def list_events(
+async def list_events(
     session: SessionDep,
     query: Annotated[EventQueryDto, Query()],
 ):
-    data = event_service.pagination_find(
+    data = await event_service.pagination_find(
         PaginationOption(
             search=query.search,
             page=query.page,
             sorting=query.order_direction,
             sorting_col=query.order_by,
+            cursor=query.cursor,
+            count_mode=query.count,
             limit=query.limit,
         ),
         session,
@@ -48,27 +51,45 @@ def list_events(
 
 
 @router.get("/{event_id}", response_model=AppResponse[EventRead])
-def get_event(session: SessionDep, event_id: UUID = Path(...)):
-    ev = event_service.find_by_id(str(event_id), session)
-    if not ev:
+async def get_event(request: Request, session: SessionDep, event_id: UUID = Path(...)):
+    version = await event_service.find_version(str(event_id), session)
+    if not version:
         return success_response(data=None, code=HTTPStatus.NOT_FOUND)
-    return success_response(data=EventRead.model_validate(ev), code=HTTPStatus.OK)
+    # photo links are presigned urls, the tag rolls over with the presigned url cache.
+    # Weak: each worker signs its own urls, equivalent but not byte for byte equal bodies
+    etag = make_etag("event", event_id, *version, s3.presigned_url_generation(), weak=True)
+    if not_modified := not_modified_response(request, etag):
+        return not_modified
+    ev = await event_service.find_by_id(str(event_id), session)
+    return success_response(data=EventRead.model_validate(ev), code=HTTPStatus.OK, etag=etag)
 
 
 @router.patch("/{event_id}", response_model=AppResponse[EventRead])
-def update_event(
+async def update_event(
     session: SessionDep,
-    admin: AuthAdminOnlyDeps,
+    admin: ClaimsAdminOnlyDeps,
     body: Annotated[EventUpdateDto, Body()],
     event_id: UUID = Path(...),
 ):
-    ev = event_service.update_event(str(event_id), body, session)
+    ev = await event_service.update_event(str(event_id), body, session)
     return success_response(data=EventRead.model_validate(ev), code=HTTPStatus.OK)
 
 
 @router.delete("/{event_id}", response_model=AppResponse[Any])
-def delete_event(
-    session: SessionDep, admin: AuthAdminOnlyDeps, event_id: UUID = Path(...)
+async def delete_event(
+    session: SessionDep, admin: ClaimsAdminOnlyDeps, event_id: UUID = Path(...)
 ):
-    event_service.delete_event(str(event_id), session)
+    await event_service.delete_event(str(event_id), session)
     return success_response(data=True, code=HTTPStatus.OK)
+
+
+@router.put("/{event_id}/inventory-shards", response_model=AppResponse[EventRead])
+async def set_inventory_shards(
+    session: SessionDep,
+    admin: ClaimsAdminOnlyDeps,
+    body: Annotated[InventoryShardsDto, Body()],
+    event_id: UUID = Path(...),
+):
+    await inventory_shard_service.set_inventory_shards(str(event_id), body.shards, session)
+    ev = await event_service.find_by_id(str(event_id), session)
+    return success_response(data=EventRead.model_validate(ev), code=HTTPStatus.OK)
@@ -4,17 +4,16 @@ from uuid import UUID
 from fastapi import (
     APIRouter,
     Depends,
-    File,
-    Form,
     HTTPException,
     Path,
     Query,
-    UploadFile,
+    Request,
 )
 
 from app.core.response import success_response
-from app.dependencies.auth_dep import auth_with_any_role
+from app.dependencies.auth_dep import ClaimsDeps, claims_with_any_role
 from app.dependencies.session_dep import SessionDep
+from app.dtos.file_dto import FileFinalizeDto, FileUploadUrlCreateDto, FileUploadUrlRead
 from app.dtos.pagination_query_dto import PaginationQueryDto
 from app.dtos.response_dto import AppResponse
 from app.enums.role_enum import UserRole
@@ -27,28 +26,58 @@ from app.utils.pagination_utils import PaginationOption
 router = APIRouter(
     tags=["Files"],
     prefix="/file",
-    dependencies=[Depends(auth_with_any_role([UserRole.USER, UserRole.ADMIN]))],
+    dependencies=[Depends(claims_with_any_role([UserRole.USER, UserRole.ADMIN]))],
 )
 
 @router.get("/", response_model=AppResponse[PaginationData[FileModel]])
-def find(session: SessionDep, query: Annotated[PaginationQueryDto, Query()]):
-    data = file_service.pagination_find(
+async def find(session: SessionDep, query: Annotated[PaginationQueryDto, Query()]):
+    data = await file_service.pagination_find(
         PaginationOption(
             search=query.search,
             page=query.page,
             sorting=query.order_direction,
             sorting_col=query.order_by,
+            cursor=query.cursor,
+            count_mode=query.count,
             limit=query.limit
         ),
         session,
     )
     return success_response(data=data, code=HTTPStatus.OK)
 
-@router.post("/upload", response_model=AppResponse[FileModel])
-def find(
-    session: SessionDep,
-    file: Annotated[UploadFile, File()],
-    folder: Annotated[str, Form()],
-):
-    data = file_service.file_upload(session=session, file=file, folder=folder)
+# the body is read as a stream by the service, the form is only declared for the docs
+_UPLOAD_FORM = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["folder", "file"],
+                    "properties": {
+                        "folder": {"type": "string", "description": "send before the file"},
+                        "file": {"type": "string", "format": "binary"},
+                    },
+                }
+            }
+        },
+    }
+}
+
+
+@router.post("/upload", response_model=AppResponse[FileModel], openapi_extra=_UPLOAD_FORM)
+async def upload(request: Request, session: SessionDep):
+    data = await file_service.stream_upload(request, session)
     return success_response(data=data, code=HTTPStatus.OK)
+
+
+@router.post("/upload-url", response_model=AppResponse[FileUploadUrlRead])
+async def create_upload_url(claims: ClaimsDeps, dto: FileUploadUrlCreateDto):
+    data = file_service.create_upload_url(dto, claims.user_id)
+    return success_response(data=data, code=HTTPStatus.OK)
+
+
+@router.post("/finalize", response_model=AppResponse[FileModel])
+async def finalize_upload(claims: ClaimsDeps, dto: FileFinalizeDto, session: SessionDep):
+    data = await file_service.finalize_upload(dto, claims.user_id, session)
+    return success_response(data=data, code=HTTPStatus.CREATED)
@@ -1,11 +1,11 @@
 from http import HTTPStatus
 from typing import Annotated, Any, List
 from uuid import UUID
-from fastapi import APIRouter, Body, Path
+from fastapi import APIRouter, Body, Path, Request
 
-from app.core.response import success_response
+from app.core.response import make_etag, not_modified_response, success_response
 from app.dependencies.session_dep import SessionDep
-from app.dependencies.auth_dep import AuthAdminOnlyDeps
+from app.dependencies.auth_dep import ClaimsAdminOnlyDeps
 from app.dtos.ticket_dto import TicketCreateDto, TicketRead
 from app.dtos.response_dto import AppResponse
 from app.services import ticket_service
@@ -15,20 +15,26 @@ router = APIRouter(tags=["Ticket"], prefix="/ticket")
 
 
 @router.post("/", response_model=AppResponse[TicketRead])
-def create_ticket(session: SessionDep, admin: AuthAdminOnlyDeps, body: Annotated[TicketCreateDto, Body()]):
-    t = ticket_service.create_ticket(body, session)
+async def create_ticket(session: SessionDep, admin: ClaimsAdminOnlyDeps, body: Annotated[TicketCreateDto, Body()]):
+    t = await ticket_service.create_ticket(body.event_id, body, session)
     return success_response(data=TicketRead.model_validate(t), code=HTTPStatus.CREATED)
 
 
 @router.get("/event/{event_id}", response_model=AppResponse[List[TicketRead]])
-def tickets_by_event(session: SessionDep, event_id: UUID = Path(...)):
-    tickets = ticket_service.find_by_event(str(event_id), session)
-    return success_response(data=[TicketRead.model_validate(t) for t in tickets], code=HTTPStatus.OK)
+async def tickets_by_event(request: Request, session: SessionDep, event_id: UUID = Path(...)):
+    version = await ticket_service.find_version_by_event(str(event_id), session)
+    etag = make_etag("tickets", event_id, *version)
+    if not_modified := not_modified_response(request, etag):
+        return not_modified
+    tickets = await ticket_service.find_by_event(str(event_id), session)
+    return success_response(
+        data=[TicketRead.model_validate(t) for t in tickets], code=HTTPStatus.OK, etag=etag
+    )
 
 
 @router.get("/{id}", response_model=AppResponse[TicketRead])
-def get_ticket(session: SessionDep, id: UUID = Path(...)):
-    t = ticket_service.find_by_id(str(id), session)
+async def get_ticket(session: SessionDep, id: UUID = Path(...)):
+    t = await ticket_service.find_by_id(str(id), session)
     if not t:
         return success_response(data=None, code=HTTPStatus.NOT_FOUND)
     return success_response(data=TicketRead.model_validate(t), code=HTTPStatus.OK)
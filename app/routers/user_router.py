@@ -3,7 +3,6 @@ from typing import Annotated, Any
 from uuid import UUID
 from fastapi import (
     APIRouter,
-    BackgroundTasks,
     Body,
     HTTPException,
     Path,
@@ -11,7 +10,7 @@ from fastapi import (
 )
 
 from app.core.response import success_response
-from app.dependencies.auth_dep import AuthDeps, AuthDepsOnly
+from app.dependencies.auth_dep import AuthDeps, ClaimsDepsOnly
 from app.dependencies.session_dep import SessionDep
 from app.dtos.pagination_query_dto import PaginationQueryDto
 from app.dtos.response_dto import AppResponse
@@ -26,54 +25,54 @@ from app.utils.pagination_utils import PaginationOption
 router = APIRouter(
     tags=["User"],
     prefix="/user",
-    dependencies=[AuthDepsOnly],
+    dependencies=[ClaimsDepsOnly],
 )
 
 
 @router.get("/", response_model=AppResponse[PaginationData[AppUserRead]])
-def find(session: SessionDep, query: Annotated[PaginationQueryDto, Query()]):
-    data = user_service.pagination_find(
+async def find(session: SessionDep, query: Annotated[PaginationQueryDto, Query()]):
+    data = await user_service.pagination_find(
         PaginationOption(
             search=query.search,
             page=query.page,
             sorting=query.order_direction,
             sorting_col=query.order_by,
+            cursor=query.cursor,
+            count_mode=query.count,
             limit=query.limit,
         ),
         session,
     )
     return success_response(data=data, code=HTTPStatus.OK)
 
+
 @router.get("/verify-email", response_model=AppResponse[str])
-def verify_email(
+async def verify_email(
     session: SessionDep,
     user: AuthDeps,
-    background_tasks: BackgroundTasks,
 ):
     if user.email_verified_at != None:
         raise AppError(message="email already verified")
-    user = user_service.send_email_validation_code(
-        user=user, session=session, background_tasks=background_tasks
-    )
+    user = await user_service.send_email_validation_code(user=user, session=session)
     return success_response(data="code will be sent to your email shortly")
 
 
 @router.post("/verify-email", response_model=AppResponse[str])
-def verify_email(
+async def verify_email(
     session: SessionDep,
     user: AuthDeps,
     body: Annotated[VerifyCode, Body()],
 ):
     if user.email_verified_at != None:
         raise AppError(message="email already verified")
-    user_service.verify_email_validation_code(
+    await user_service.verify_email_validation_code(
         user=user, session=session, code=body.code
     )
     return success_response(data="email verified successfully")
 
 @router.get("/{user_id}", response_model=AppResponse[AppUserRead])
-def find(session: SessionDep, user_id: UUID = Path(..., description="User UUID")):
-    user = user_service.find_by_id(user_id, session)
+async def find(session: SessionDep, user_id: UUID = Path(..., description="User UUID")):
+    user = await user_service.find_by_id(user_id, session)
     if not user:
         raise HTTPException(detail="User not found", status_code=HTTPStatus.NOT_FOUND)
     return success_response(
@@ -82,12 +81,12 @@ def find(session: SessionDep, user_id: UUID = Path(..., description="User UUID")
 
 
 @router.patch("/update-profile", response_model=AppResponse[AppUserRead])
-def update_profile(
+async def update_profile(
     session: SessionDep,
     user: AuthDeps,
     body: Annotated[ProfileUpdateRequestDto, Body()],
 ):
-    user = user_service.update_profile(user, body, session)
+    user = await user_service.update_profile(user, body, session)
     return success_response(
         data=AppUserRead.model_validate(user), code=HTTPStatus.FOUND
     )
@@ -1,27 +1,39 @@
-from sqlmodel import Session
+import asyncio
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.core.config import get_config
-from app.dtos.auth_dto import LoginRequestDto, LoginResponseDto, RegisterRequestDto
+from app.dtos.auth_dto import (
+    LoginRequestDto,
+    LoginResponseDto,
+    RefreshTokenRequestDto,
+    RegisterRequestDto,
+)
 from app.dtos.user_dto import AppUserRead
 from app.enums.role_enum import UserRole
 from app.models.app_user_model import AppUser
 from app.services import user_service
 from app.types.errors import AppError
-from app.utils.auth_utils import create_access_token
+from app.utils.auth_utils import (
+    REFRESH_TOKEN,
+    create_access_token,
+    create_refresh_token,
+    verify_extract_user_id,
+)
 from app.utils.password_utils import hash_password, verify_password
 from app.models import AppUser
 
 
-def register_user(dto: RegisterRequestDto, session: Session) -> AppUserRead:
-    user_found = user_service.find_by_email(dto.email, session)
+async def register_user(dto: RegisterRequestDto, session: AsyncSession) -> AppUserRead:
+    user_found = await user_service.find_by_email(dto.email, session)
     if user_found:
         raise AppError(message="Email already used")
 
     if dto.phone_number is not None:
-        user_found = user_service.find_by_phone_number(dto.phone_number, session)
+        user_found = await user_service.find_by_phone_number(dto.phone_number, session)
         if user_found:
             raise AppError(message="Phone number already used")
 
-    hp = hash_password(dto.password)
+    # bcrypt is cpu bound, keep it off the event loop
+    hp = await asyncio.to_thread(hash_password, dto.password)
     new_user = AppUser(
         full_name=dto.full_name,
         dob=dto.dob,
@@ -31,31 +43,56 @@ def register_user(dto: RegisterRequestDto, session: Session) -> AppUserRead:
         phone_number=dto.phone_number,
     )
     user_service.create(new_user, session)
-    session.commit()
+    await session.commit()
     return AppUserRead.model_validate(new_user)
 
 
-def login_user(dto: LoginRequestDto, session: Session):
+async def login_user(dto: LoginRequestDto, session: AsyncSession):
     user = None
     if dto.email:
-        user = user_service.find_by_email(dto.email, session)
+        user = await user_service.find_by_email(dto.email, session)
     elif dto.phone_number:
-        user = user_service.find_by_phone_number(dto.phone_number, session)
+        user = await user_service.find_by_phone_number(dto.phone_number, session)
     else:
         raise AppError(message="Phone number or email is required")
 
     if not user:
         raise AppError(message="Invalid credentials")
 
-    if not verify_password(plain_password=dto.password, hashed_password=user.password):
+    if not await asyncio.to_thread(
+        verify_password, plain_password=dto.password, hashed_password=user.password
+    ):
         raise AppError(message="Invalid credentials")
 
+    return _token_response(await user_service.find_by_id(user.id, session))
+
+
+async def refresh_tokens(dto: RefreshTokenRequestDto, session: AsyncSession):
+    user_id, is_success, err_str = verify_extract_user_id(dto.refresh_token, REFRESH_TOKEN)
+    if not is_success:
+        raise AppError(message=err_str)
+    # roles are re-read here, so role changes reach the token on the next refresh
+    user = await user_service.find_by_id(user_id, session)
+    if not user:
+        raise AppError(message="Invalid credentials")
+    return _token_response(user)
+
+
+def _token_response(user: AppUser) -> LoginResponseDto:
     config = get_config()
     access_token = create_access_token(
-        expires_in_minutes=24 * 60,
+        expires_in_minutes=config.access_token_expire_minutes,
+        user_id=user.id,
+        secret_key=config.access_token_secret,
+        roles=user.roles.split(",") if user.roles else [],
+        email_verified=user.email_verified_at is not None,
+        phone_verified=user.phone_verified_at is not None,
+    )
+    refresh_token = create_refresh_token(
+        expires_in_days=config.refresh_token_expire_days,
         user_id=user.id,
         secret_key=config.access_token_secret,
     )
     return LoginResponseDto(
-        user=user_service.find_by_id(user.id, session), access_token=access_token
+        user=user, access_token=access_token, refresh_token=refresh_token
     )
@@ -0,0 +1,88 @@
+from decimal import Decimal
+from typing import Dict, List
+import uuid
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.config import get_config
+from app.dtos.booking_dto import BookedTicketRead, BookingCreateDto, BookingRead, TicketHoldRead
+from app.models.booking_model import Booking
+from app.models.booking_ticket_model import BookingTicket
+from app.services import ticket_hold_service, ticket_service
+
+
+async def create_booking(
+    user_id: uuid.UUID, dto: BookingCreateDto, session: AsyncSession
+) -> BookingRead:
+    """Claim the tickets first (own short transaction), then record the booking.
+
+    Inventory rows are never locked while the booking rows are written; if writing the
+    booking fails the claimed units are released again.
+    """
+    quantities = {t.ticket_id: t.qty for t in dto.tickets}
+    claimed = await ticket_service.reserve_tickets(str(dto.event_id), quantities, session)
+    return await _record_booking(user_id, dto.event_id, claimed, quantities, session)
+
+
+async def hold_tickets(
+    user_id: uuid.UUID, dto: BookingCreateDto, session: AsyncSession
+) -> TicketHoldRead:
+    quantities = {t.ticket_id: t.qty for t in dto.tickets}
+    hold, held = await ticket_hold_service.create_hold(
+        user_id, str(dto.event_id), quantities, get_config().ticket_hold_ttl_sec, session
+    )
+    return TicketHoldRead(
+        id=hold.id,
+        event_id=dto.event_id,
+        expires_at=hold.expires_at,
+        tickets=_booked_tickets(held, quantities),
+    )
+
+
+async def confirm_hold(
+    user_id: uuid.UUID, hold_id: uuid.UUID, session: AsyncSession
+) -> BookingRead:
+    """Book the held tickets, the held units move to booked without an availability check"""
+    confirmed = await ticket_hold_service.confirm_hold(hold_id, user_id, session)
+    quantities = {row.id: row.qty for row in confirmed}
+    return await _record_booking(user_id, confirmed[0].event_id, confirmed, quantities, session)
+
+
+async def _record_booking(
+    user_id: uuid.UUID,
+    event_id: uuid.UUID,
+    claimed: List,
+    quantities: Dict[uuid.UUID, int],
+    session: AsyncSession,
+) -> BookingRead:
+    try:
+        booking = Booking(
+            user_id=user_id,
+            event_id=event_id,
+            total=sum((row.price * quantities[row.id] for row in claimed), Decimal(0)),
+        )
+        session.add(booking)
+        # one booking_ticket row per unit
+        session.add_all(
+            BookingTicket(booking_id=booking.id, event_ticket_id=row.id)
+            for row in claimed
+            for _ in range(quantities[row.id])
+        )
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        await ticket_service.release_tickets(str(event_id), quantities, session)
+        raise
+
+    return BookingRead(
+        id=booking.id,
+        event_id=booking.event_id,
+        total=booking.total,
+        date=booking.date,
+        tickets=_booked_tickets(claimed, quantities),
+    )
+
+
+def _booked_tickets(rows: List, quantities: Dict[uuid.UUID, int]) -> List[BookedTicketRead]:
+    return [
+        BookedTicketRead(ticket_id=row.id, name=row.name, price=row.price, qty=quantities[row.id])
+        for row in rows
+    ]
@@ -1,23 +1,93 @@
-import math
-from sqlmodel import select, Session
-from sqlalchemy import func
+import time
+from typing import List, Optional
+import uuid
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core import database
+from app.core.config import get_config
+from app.core.response import is_pretty, success_body
 from app.models.category_model import Category
-from app.types.pagination_data import PaginationData
-from app.utils.pagination_utils import PaginationOption
+from app.types.errors import AppError
 from app.dtos.category_dto import CategoryCreateDto, CategoryRead
 
 
-def create(dto: CategoryCreateDto, session: Session) -> Category:
+class CategoryCatalog:
+    """Snapshot of the (small, rarely changing) category table, kept in memory.
+
+    Serves GET /category/ with a pre-serialized body and category id validation on event
+    writes. Reloaded on `create` (write-through) and when older than the catalog ttl.
+    """
+
+    def __init__(self, categories: List[Category], ttl_sec: float):
+        self.items = [CategoryRead.model_validate(c) for c in categories]
+        self.ids = {c.id for c in categories}
+        self.version = (len(categories), max((c.updated_at for c in categories), default=None))
+        self.expires_at = time.monotonic() + ttl_sec
+        self._bodies: dict[bool, bytes] = {}
+
+    def body(self) -> bytes:
+        """Response body of the list endpoint, serialized once per representation"""
+        pretty = is_pretty()
+        if pretty not in self._bodies:
+            self._bodies[pretty] = success_body(self.items)
+        return self._bodies[pretty]
+
+
+_catalog: Optional[CategoryCatalog] = None
+
+
+async def load_catalog(session: AsyncSession) -> CategoryCatalog:
+    global _catalog
+    _catalog = CategoryCatalog(await find_all(session), get_config().category_catalog_ttl_sec)
+    return _catalog
+
+
+async def get_catalog(session: AsyncSession) -> CategoryCatalog:
+    if _catalog is None or _catalog.expires_at <= time.monotonic():
+        return await load_catalog(session)
+    return _catalog
+
+
+async def warm_catalog() -> None:
+    """Load the catalog at startup so the first requests do not pay for it"""
+    async with AsyncSession(database.async_engine) as session:
+        await load_catalog(session)
+
+
+async def create(dto: CategoryCreateDto, session: AsyncSession) -> Category:
     new = Category(name=dto.name, description=dto.description)
     session.add(new)
-    session.commit()
-    session.refresh(new)
+    await session.commit()
+    await session.refresh(new)
+    await load_catalog(session)
     return new
 
 
-def find_all(session: Session):
-    return session.exec(select(Category).order_by(Category.created_at.desc())).all()
+async def find_all(session: AsyncSession):
+    return (
+        await session.exec(select(Category).order_by(Category.created_at.desc()))
+    ).all()
+
+
+async def find_by_id(id: str, session: AsyncSession):
+    return (await session.exec(select(Category).where(Category.id == id))).first()
 
 
-def find_by_id(id: str, session: Session):
-    return session.exec(select(Category).where(Category.id == id)).first()
+async def validate_ids(ids: list[str], session: AsyncSession) -> list[uuid.UUID]:
+    """Check that all category ids exist against the catalog, returns them as UUIDs"""
+    parsed = []
+    for cid in ids:
+        try:
+            parsed.append(uuid.UUID(cid))
+        except Exception:
+            raise AppError(message=f"invalid category id: {cid}")
+    if not parsed:
+        return parsed
+    catalog = await get_catalog(session)
+    if not catalog.ids.issuperset(parsed):
+        # may have been created through another worker since the catalog was loaded
+        catalog = await load_catalog(session)
+    for cid in parsed:
+        if cid not in catalog.ids:
+            raise AppError(message=f"category {cid} not found")
+    return list(dict.fromkeys(parsed))
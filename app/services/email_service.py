@@ -1,5 +1,3 @@
-from math import log
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
@@ -9,27 +7,28 @@ import os
 
 from app.core.config import get_config
 from app.core.logger import get_logger
+from app.core.mailer import get_mailer
 
 
-def send_email(
+def build_message(
     to_emails: list[str],
     subject: str,
     body_text: str = "",
     body_html: str = None,
     attachments: list[str] = None,
-):
+    message_id: str = None,
+) -> MIMEMultipart:
     conf = get_config()
-    logger = get_logger()
     sender_email = conf.smtp_sender_email
-    app_password = conf.smtp_app_password
 
     # Create the email message
     msg = MIMEMultipart("alternative")
-    msg["From"] = sender_email
     msg["To"] = ", ".join(to_emails)
     msg["Subject"] = subject
     msg["From"] = formataddr(("Event Booker", sender_email))
-
+    if message_id:
+        # stable across redeliveries, mail clients drop the duplicates
+        msg["Message-ID"] = message_id
 
     # Add plain text
     if body_text:
@@ -55,12 +54,37 @@ def send_email(
             else:
                 print(f"⚠️ Warning: File not found - {file_path}")
 
-    # Send the email
-    try:
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-            server.login(sender_email, app_password)
-            server.sendmail(sender_email, to_emails, msg.as_string())
-        logger.info("email sent successfully")
-    except Exception as e:
-        logger.error(msg=f"[EMAIL SMTP ERROR] error : {str(e)}")
+    return msg
 
+
+def send_email(
+    to_emails: list[str],
+    subject: str,
+    body_text: str = "",
+    body_html: str = None,
+    attachments: list[str] = None,
+) -> bool:
+    """Queue the mail on the mailer and return right away, delivery happens on the
+    mailer workers over pooled SMTP connections. False when it could not be queued.
+    Not durable, mails that must survive a restart go through `outbox_service.add_email`."""
+    msg = build_message(to_emails, subject, body_text, body_html, attachments)
+    mailer = get_mailer()
+    if mailer is None:
+        get_logger().error(msg="[EMAIL SMTP ERROR] error : mailer is not running")
+        return False
+    return mailer.enqueue(msg, get_config().smtp_sender_email, to_emails)
+
+
+async def deliver_email(
+    to_emails: list[str],
+    subject: str,
+    body_text: str = "",
+    body_html: str = None,
+    message_id: str = None,
+) -> None:
+    """Send through the mailer and wait for the SMTP server to accept, raises otherwise"""
+    mailer = get_mailer()
+    if mailer is None:
+        raise RuntimeError("mailer is not running")
+    msg = build_message(to_emails, subject, body_text, body_html, message_id=message_id)
+    await mailer.deliver(msg, get_config().smtp_sender_email, to_emails)
@@ -1,14 +1,22 @@
-import math
+from datetime import datetime, timezone
 from typing import List, Optional
 import uuid
-from sqlalchemy import func, text, and_
-from sqlmodel import Session, select, update
+from sqlalchemy import bindparam, func, literal_column, text, and_
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import delete, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.enums.event_status import EventStatus
 from app.models.event_model import Event
 from app.models.event_category_model import EventCategory
-from app.models.category_model import Category
-from app.services import file_service
+from app.models.event_ticket_model import EventTicket
+from app.services import category_service, file_service
 from app.types.pagination_data import PaginationData
-from app.utils.pagination_utils import PaginationOption
+from app.utils.pagination_utils import (
+    PaginationOption,
+    count_total,
+    keyset_paginate,
+    split_page,
+)
 from app.dtos.event_dto import (
     EventCreateDto,
     EventRead,
@@ -24,24 +32,60 @@ def _slugify(name: str) -> str:
     return name.strip().lower().replace(" ", "-")
 
 
-def create_event(admin_id: str, dto: EventCreateDto, session: Session) -> Event:
-    # Validate files
-    for file_field in [
-        dto.event_layout_photo_id,
-        dto.event_banner_photo_id,
-        dto.event_photo_id,
-    ]:
-        if file_field:
-            f = file_service.find_by_id(file_field, session)
-            if not f:
-                raise AppError(message="file not found")
+def _search_rank():
+    """ts_rank of event.search_vector (generated column, see migrations/0004) against :search"""
+    return func.ts_rank(
+        literal_column("event.search_vector"),
+        func.websearch_to_tsquery(literal_column("'english'"), bindparam("search")),
+    )
+
+
+async def _sync_categories(
+    event_id: uuid.UUID, category_ids: List[uuid.UUID], session: AsyncSession
+) -> None:
+    """Make the event's categories exactly `category_ids`: delete removed, insert missing"""
+    await session.exec(
+        delete(EventCategory).where(
+            EventCategory.event_id == event_id,
+            EventCategory.category_id.not_in(category_ids),
+        )
+    )
+    if category_ids:
+        await session.exec(
+            insert(EventCategory)
+            .values(
+                [
+                    {"id": uuid.uuid4(), "event_id": event_id, "category_id": cid}
+                    for cid in category_ids
+                ]
+            )
+            .on_conflict_do_nothing(
+                index_elements=[EventCategory.event_id, EventCategory.category_id]
+            )
+        )
+
+
+async def create_event(admin_id: str, dto: EventCreateDto, session: AsyncSession) -> Event:
+    # Validate files and categories, one IN query each
+    await file_service.validate_ids(
+        [
+            fid
+            for fid in (
+                dto.event_layout_photo_id,
+                dto.event_banner_photo_id,
+                dto.event_photo_id,
+            )
+            if fid
+        ],
+        session,
+    )
+    category_ids = await category_service.validate_ids(dto.category_ids or [], session)
 
     slug = _slugify(dto.name)
     # ensure unique slug
-    exists = session.exec(select(Event).where(Event.slug == slug)).first()
+    exists = (await session.exec(select(Event.id).where(Event.slug == slug))).first()
     if exists:
-        # make slug unique using timestamp-ish fallback
-        slug = f"{slug}-{str(func.now())}"
+        slug = f"{slug}-{uuid.uuid4().hex[:8]}"
 
     ev = Event(
         admin_id=admin_id,
@@ -57,115 +101,114 @@ def create_event(admin_id: str, dto: EventCreateDto, session: Session) -> Event:
         event_banner_photo_id=dto.event_banner_photo_id,
         event_photo_id=dto.event_photo_id,
     )
-    session.add(ev)
-
-    # categories
-    if dto.category_ids:
-        for cid in dto.category_ids:
-            try:
-                cid_uuid = uuid.UUID(cid)
-            except Exception:
-                raise AppError(message=f"invalid category id: {cid}")
-            cat = session.exec(select(Category).where(Category.id == cid_uuid)).first()
-            if not cat:
-                raise AppError(message=f"category {cid} not found")
-            ec = EventCategory(event_id=ev.id, category_id=cat.id)
-            session.add(ec)
-
-    # create tickets if provided
-    if getattr(dto, "tickets", None):
-        try:
-            ticket_service.upsert_tickets_for_event(str(ev.id), dto.tickets, session)
-        except Exception as e:
-            # rollback created event on ticket failures to keep consistency
-            session.exec(
-                text("DELETE FROM event_category WHERE event_id = :event_id"),
-                params={"event_id": str(ev.id)},
-            )
-            session.exec(
-                text("DELETE FROM event WHERE id = :id"), params={"id": str(ev.id)}
-            )
-            raise AppError(e=str(e))
-    session.commit()
-    session.refresh(ev)
+    # event, categories and tickets go in one transaction
+    try:
+        session.add(ev)
+        await session.flush()
+        if category_ids:
+            await _sync_categories(ev.id, category_ids, session)
+        if dto.tickets:
+            await ticket_service.upsert_tickets_for_event(str(ev.id), dto.tickets, session)
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+    await session.refresh(ev)
     return ev
 
 
-def update_event(event_id: str, dto: EventUpdateDto, session: Session) -> Event:
-    ev = session.exec(select(Event).where(Event.id == event_id)).first()
+async def update_event(event_id: str, dto: EventUpdateDto, session: AsyncSession) -> Event:
+    ev = (await session.exec(select(Event).where(Event.id == event_id))).first()
     if not ev:
         raise AppError(message="Event not found")
 
-    update_data = dto.model_dump(exclude_unset=True)
-    # validate files
-    for fkey in ("event_layout_photo_id", "event_banner_photo_id", "event_photo_id"):
-        if fkey in update_data and update_data[fkey] is not None:
-            f = file_service.find_by_id(update_data[fkey], session)
-            if not f:
-                raise AppError(message="file not found")
-
-    # update scalar fields
-    session.exec(update(Event).where(Event.id == ev.id).values(update_data))
-
-    # update categories if provided
-    if "category_ids" in update_data:
-        # delete existing event categories
-        session.exec(
-            "DELETE FROM event_category WHERE event_id = :event_id",
-            params={"event_id": str(ev.id)},
-        )
-        if update_data["category_ids"]:
-            for cid in update_data["category_ids"]:
-                try:
-                    cid_uuid = uuid.UUID(cid)
-                except Exception:
-                    raise AppError(message=f"invalid category id: {cid}")
-                cat = session.exec(
-                    select(Category).where(Category.id == cid_uuid)
-                ).first()
-                if not cat:
-                    raise AppError(message=f"category {cid} not found")
-                ec = EventCategory(event_id=ev.id, category_id=cid_uuid)
-                session.add(ec)
-
-    # handle tickets upsert if provided
-    if "tickets" in update_data and update_data["tickets"] is not None:
-        # use ticket_service to create/update tickets for this event
-        ticket_service.upsert_tickets_for_event(
-            str(ev.id), update_data["tickets"], session
-        )
+    # nested collections are synced separately, only scalar fields go to the event row
+    update_data = dto.model_dump(exclude_unset=True, exclude={"category_ids", "tickets"})
+    # validate files and categories, one IN query each
+    await file_service.validate_ids(
+        [
+            update_data[fkey]
+            for fkey in ("event_layout_photo_id", "event_banner_photo_id", "event_photo_id")
+            if update_data.get(fkey) is not None
+        ],
+        session,
+    )
+    category_ids = None
+    if "category_ids" in dto.model_fields_set:
+        category_ids = await category_service.validate_ids(dto.category_ids or [], session)
 
-    session.commit(ev)
-    session.refresh(ev)
+    try:
+        await session.exec(
+            update(Event)
+            .where(Event.id == ev.id)
+            .values(**update_data, updated_at=datetime.now(timezone.utc))
+        )
+        if category_ids is not None:
+            await _sync_categories(ev.id, category_ids, session)
+        if dto.tickets is not None:
+            await ticket_service.upsert_tickets_for_event(str(ev.id), dto.tickets, session)
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+    await session.refresh(ev)
     return ev
 
 
-def delete_event(event_id: str, session: Session) -> None:
-    ev = session.exec(select(Event).where(Event.id == event_id)).first()
+async def delete_event(event_id: str, session: AsyncSession) -> None:
+    ev = (await session.exec(select(Event).where(Event.id == event_id))).first()
     if not ev:
         raise AppError(message="Event not found")
-    ev.status = "inactive"
-    session.add(ev)
-    session.commit()
-
-
-def find_by_id(event_id: str, session: Session) -> Optional[Event]:
-    return session.exec(
-        select(Event)
-        .options(
-            joinedload(Event.event_banner_photo),
-            joinedload(Event.event_layout_photo),
-            joinedload(Event.event_photo),
-            selectinload(Event.categories),
-            selectinload(Event.tickets),
+    # through updated_at, like update_event, so the event ETag moves on
+    await session.exec(
+        update(Event)
+        .where(Event.id == ev.id)
+        .values(status=EventStatus.INACTIVE, updated_at=datetime.now(timezone.utc))
+    )
+    await session.commit()
+
+
+async def find_version(event_id: str, session: AsyncSession) -> Optional[tuple]:
+    """Version of an event for ETags: its updated_at plus count and latest change of its
+    tickets and categories, and the booked/held sums of its tickets (see
+    ticket_service.find_version_by_event). None of the find_by_id relationship graph.
+    None when the event does not exist."""
+    tickets = select(EventTicket).where(EventTicket.event_id == Event.id)
+    categories = select(EventCategory).where(EventCategory.event_id == Event.id)
+    return (
+        await session.exec(
+            select(
+                Event.updated_at,
+                tickets.with_only_columns(func.count()).scalar_subquery(),
+                tickets.with_only_columns(func.max(EventTicket.updated_at)).scalar_subquery(),
+                tickets.with_only_columns(func.sum(EventTicket.total_booked)).scalar_subquery(),
+                tickets.with_only_columns(func.sum(EventTicket.total_held)).scalar_subquery(),
+                categories.with_only_columns(func.count()).scalar_subquery(),
+                categories.with_only_columns(func.max(EventCategory.created_at)).scalar_subquery(),
+            ).where(Event.id == event_id)
+        )
+    ).first()
+
+
+async def find_by_id(event_id: str, session: AsyncSession) -> Optional[Event]:
+    return (
+        await session.exec(
+            select(Event)
+            .options(
+                joinedload(Event.event_banner_photo),
+                joinedload(Event.event_layout_photo),
+                joinedload(Event.event_photo),
+                selectinload(Event.categories),
+                selectinload(Event.tickets),
+            )
+            .where(Event.id == event_id)
         )
-        .where(Event.id == event_id)
     ).first()
 
 
-def pagination_find(
+async def pagination_find(
     pagination_options: PaginationOption,
-    session: Session,
+    session: AsyncSession,
     category_ids: Optional[List[str]] = None,
     status_in: Optional[List[str]] = None,
 ) -> PaginationData[EventRead]:
@@ -173,9 +216,10 @@ def pagination_find(
     params = {}
 
     if pagination_options.search:
-        params["search"] = f"%{pagination_options.search}%"
+        # full text search on the GIN indexed search_vector (name > venue > description)
+        params["search"] = pagination_options.search
         where_conditions.append(
-            text("(event.name ILIKE :search OR event.description ILIKE :search)")
+            text("event.search_vector @@ websearch_to_tsquery('english', :search)")
         )
 
     if status_in:
@@ -206,36 +250,48 @@ def pagination_find(
     if where_conditions:
         sq = sq.where(and_(*where_conditions))
 
-    # Sorting
-    sort_col = pagination_options.sorting_col or "created_at"
-    sort_asc = pagination_options.sorting == "asc"
-    order_expr = (
-        Event.name.asc()
-        if sort_col == "name" and sort_asc
-        else (
-            Event.name.desc()
-            if sort_col == "name"
-            else Event.created_at.asc() if sort_asc else Event.created_at.desc()
+    if pagination_options.sorting_col == "rank" and pagination_options.search:
+        # relevance is computed per row, no index to seek on so this stays on offset pages
+        if pagination_options.cursor:
+            raise AppError(message="cursor pagination is not supported for rank sorting")
+        rank = _search_rank()
+        sq = sq.order_by(
+            *(
+                (rank.asc(), Event.id.asc())
+                if pagination_options.sorting == "asc"
+                else (rank.desc(), Event.id.desc())
+            )
         )
-    )
-    sq = sq.order_by(order_expr)
+        data_list = (
+            await session.exec(
+                sq.limit(pagination_options.limit).offset(pagination_options.get_offset()),
+                params=params,
+            )
+        ).all()
+        next_cursor = None
+    else:
+        # Sorting, keyset on (sort column, id) so cursor pages are an index range scan
+        sort_col = "name" if pagination_options.sorting_col == "name" else "created_at"
+        sort_expr = Event.name if sort_col == "name" else Event.created_at
+        sq = keyset_paginate(sq, pagination_options, sort_col, sort_expr, Event.id)
 
-    # Execute main query
-    data_list = session.exec(
-        sq.limit(pagination_options.limit).offset(pagination_options.get_offset()),
-        params=params,
-    ).all()
+        # Execute main query
+        data_list, next_cursor = split_page(
+            (await session.exec(sq, params=params)).all(),
+            pagination_options,
+            sort_col,
+            lambda ev: getattr(ev, sort_col),
+        )
 
     # Count total
-    total = session.exec(
-        select(func.count(Event.id)).where(*where_conditions), params=params
-    ).one()
-    total_page = (
-        math.ceil(total / pagination_options.limit) if pagination_options.limit else 0
+    total, total_page, total_kind = await count_total(
+        session, select(Event.id).where(*where_conditions), params, pagination_options
     )
 
     return PaginationData(
         list=[EventRead.model_validate(data) for data in data_list],
         total=total,
         total_page=total_page,
+        total_kind=total_kind,
+        next_cursor=next_cursor,
     )
@@ -1,33 +1,176 @@
-import math
-from typing import Any
+from typing import Optional
+import asyncio
 from uuid import uuid4
 import uuid
-from fastapi import UploadFile
-from sqlalchemy import func, text
-from sqlmodel import Session, and_, select
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import and_, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core.aws import s3
+from app.core.aws.s3_multipart import MultipartWriter
+from app.core.config import AppConfig, get_config
+from app.dtos.file_dto import FileFinalizeDto, FileUploadUrlCreateDto, FileUploadUrlRead
 from app.models.file_model import File
 from app.types.errors import AppError
 from app.types.pagination_data import PaginationData
-from app.utils.pagination_utils import PaginationOption
+from app.utils.auth_utils import create_upload_token, verify_extract_upload
+from app.utils.multipart_utils import FormPart, stream_form
+from app.utils.pagination_utils import (
+    PaginationOption,
+    count_total,
+    keyset_paginate,
+    split_page,
+)
 
 
-def file_upload(session: Session, file: UploadFile, folder: str)->File:
-    key = f"{folder}/{uuid4()}.{file.filename.split('.')[-1]}"
-    s3.upload_file(file.file, key)
-    newFile = File(
-        file_path=key,
-        size=file.size,
-        type=file.content_type,
+_MAX_FOLDER_LEN = 255
+
+
+def _object_key(folder: str, filename: Optional[str]) -> str:
+    return f"{folder}/{uuid4()}.{(filename or '').split('.')[-1]}"
+
+
+def _check_content_type(content_type: str, conf: AppConfig) -> None:
+    if content_type not in conf.upload_allowed_content_types:
+        raise AppError(message=f"content type {content_type} is not allowed")
+
+
+async def stream_upload(request: Request, session: AsyncSession) -> File:
+    """Store the `file` field of a multipart form (with a `folder` field) on S3.
+
+    The body is forwarded as it is received (see `MultipartWriter`), nothing is spooled
+    to disk and the event loop is never blocked. The session is only used, and a pooled
+    connection only checked out, for the final insert.
+    """
+    conf = get_config()
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > conf.upload_max_size_bytes + 64 * 1024:
+        raise AppError(message=f"file larger than {conf.upload_max_size_bytes} bytes")
+
+    writer: Optional[MultipartWriter] = None
+    part: Optional[FormPart] = None
+    folder: Optional[str] = None
+    folder_value = bytearray()
+    filename: Optional[str] = None
+    try:
+        async for event in stream_form(request):
+            if isinstance(event, FormPart):
+                part = event
+                if part.filename is None:
+                    continue
+                if part.name != "file" or writer is not None:
+                    raise AppError(message="expected a single file in the `file` field")
+                content_type = part.content_type or "application/octet-stream"
+                _check_content_type(content_type, conf)
+                filename = part.filename
+                # parts are only sent once the key is known, i.e. after the folder field
+                writer = MultipartWriter(
+                    content_type,
+                    conf.upload_part_size_bytes,
+                    conf.upload_part_concurrency,
+                    key=_object_key(folder, filename) if folder is not None else None,
+                )
+            elif event is None:
+                if part.filename is None and part.name == "folder":
+                    folder = folder_value.decode().strip()
+                    if writer is not None and writer.key is None:
+                        writer.key = _object_key(folder, filename)
+            elif part.filename is not None:
+                if writer.size + len(event) > conf.upload_max_size_bytes:
+                    raise AppError(
+                        message=f"file larger than {conf.upload_max_size_bytes} bytes"
+                    )
+                await writer.write(event)
+            elif part.name == "folder":
+                folder_value += event
+                if len(folder_value) > _MAX_FOLDER_LEN:
+                    raise AppError(message="folder name too long")
+
+        if writer is None:
+            raise AppError(message="file is required")
+        if not folder:
+            raise AppError(message="folder is required")
+        await writer.complete()
+    except BaseException:
+        if writer is not None:
+            await writer.abort()
+        raise
+
+    new_file = File(file_path=writer.key, size=writer.size, type=writer.content_type)
+    session.add(new_file)
+    await session.commit()
+    await session.refresh(new_file)
+    return new_file
+
+def create_upload_url(dto: FileUploadUrlCreateDto, user_id: uuid.UUID) -> FileUploadUrlRead:
+    """Presigned POST policy for a direct browser to S3 upload, the bytes never pass
+    through the API. Signed locally, no call to S3."""
+    conf = get_config()
+    _check_content_type(dto.content_type, conf)
+    if dto.size is not None and dto.size > conf.upload_max_size_bytes:
+        raise AppError(message=f"file larger than {conf.upload_max_size_bytes} bytes")
+    key = _object_key(dto.folder.strip(), dto.filename)
+    post = s3.create_presigned_post(
+        key, dto.content_type, conf.upload_max_size_bytes, conf.upload_presign_expire_sec
+    )
+    return FileUploadUrlRead(
+        url=post["url"],
+        fields=post["fields"],
+        key=key,
+        max_size=conf.upload_max_size_bytes,
+        expires_in=conf.upload_presign_expire_sec,
+        upload_token=create_upload_token(
+            user_id=str(user_id),
+            key=key,
+            content_type=dto.content_type,
+            expires_in_sec=conf.upload_presign_expire_sec,
+            secret_key=conf.access_token_secret,
+        ),
     )
-    session.add(newFile)
-    session.commit()
-    session.refresh(newFile)
-    return newFile
 
-def pagination_find(
-    pagination_options: PaginationOption, session: Session
+
+async def finalize_upload(
+    dto: FileFinalizeDto, user_id: uuid.UUID, session: AsyncSession
+) -> File:
+    """Record the File row of an object uploaded with `create_upload_url`.
+
+    The upload token proves the key was issued to this user, the HEAD proves the object
+    arrived. Finalizing twice returns the same row, so clients can retry safely.
+    """
+    payload, ok, err = verify_extract_upload(dto.upload_token)
+    if not ok:
+        raise AppError(message=err)
+    if payload["sub"] != str(user_id):
+        raise AppError(message="upload token was issued to another user")
+    key = payload["key"]
+
+    # before touching the session, no pooled connection is held during the S3 round trip
+    head = await asyncio.to_thread(s3.head_object, key)
+    if head is None:
+        raise AppError(message="file has not been uploaded yet")
+    if head.get("ContentType") != payload["content_type"]:
+        raise AppError(message="uploaded content type does not match")
+
+    # uq_file_file_path (migrations/0010), concurrent finalizes insert one row
+    row = (
+        await session.exec(
+            insert(File)
+            .values(file_path=key, size=head["ContentLength"], type=head["ContentType"])
+            .on_conflict_do_nothing(index_elements=[File.file_path])
+            .returning(*File.__table__.columns)
+        )
+    ).first()
+    await session.commit()
+    if row is None:
+        # finalized before
+        return (await session.exec(select(File).where(File.file_path == key))).one()
+    return File(**row._mapping)
+
+
+async def pagination_find(
+    pagination_options: PaginationOption, session: AsyncSession
 ) -> PaginationData:
     where_conditions = []
     params = {}
@@ -35,7 +178,7 @@ def pagination_find(
     if pagination_options.search:
         params["search"] = f"%{pagination_options.search}%"
         raw_where = text(
-            "(file.file_path ILIKE :search "
+            "(file.file_path ILIKE :search)"
         )
         where_conditions.append(raw_where)   
 
@@ -44,29 +187,31 @@ def pagination_find(
     
     # Filters
     if where_conditions:
-        sq.where(and_(*where_conditions))
-
-    # Sorting
-    sort_col = pagination_options.sorting_col or "created_at"
-    sort_asc = pagination_options.sorting == "asc"
+        sq = sq.where(and_(*where_conditions))
 
-    order_expr = File.created_at.asc() if sort_asc else File.created_at.desc()
+    # Sorting, keyset on (created_at, id) so cursor pages are an index range scan
+    sq = keyset_paginate(sq, pagination_options, "created_at", File.created_at, File.id)
 
-    sq = sq.order_by(order_expr)
-
-    data_list = session.exec(
-        sq
-        .limit(pagination_options.limit)
-        .offset(pagination_options.get_offset()),
-        params=params
-    ).all()
+    data_list, next_cursor = split_page(
+        (await session.exec(sq, params=params)).all(),
+        pagination_options,
+        "created_at",
+        lambda f: f.created_at,
+    )
 
-    total = session.exec(select(func.count(File.id)).where(*where_conditions),params=params).one()
-    total_page = math.ceil(total / pagination_options.limit)
+    total, total_page, total_kind = await count_total(
+        session, select(File.id).where(*where_conditions), params, pagination_options
+    )
 
-    return PaginationData(list=data_list, total=total, total_page=total_page)
+    return PaginationData(
+        list=data_list,
+        total=total,
+        total_page=total_page,
+        total_kind=total_kind,
+        next_cursor=next_cursor,
+    )
 
-def find_by_id(id: str | uuid.UUID, session: Session) -> File | None:
+async def find_by_id(id: str | uuid.UUID, session: AsyncSession) -> File | None:
     # Accept either a uuid.UUID or a string. If it's a string, validate/parse it
     if id is None:
         return None
@@ -76,6 +221,18 @@ def find_by_id(id: str | uuid.UUID, session: Session) -> File | None:
         # Provide a service-level error instead of raw ValueError from uuid
         raise AppError(message=f"invalid file id: {id}")
 
-    data = session.exec(select(File).where(File.id == id_uuid)).first()
+    data = (await session.exec(select(File).where(File.id == id_uuid))).first()
     return data
 
+
+async def validate_ids(ids: list[str | uuid.UUID], session: AsyncSession) -> None:
+    """Check that all file ids exist with a single IN query"""
+    if not ids:
+        return
+    try:
+        wanted = {id if isinstance(id, uuid.UUID) else uuid.UUID(str(id)) for id in ids}
+    except Exception:
+        raise AppError(message="invalid file id")
+    found = set((await session.exec(select(File.id).where(File.id.in_(wanted)))).all())
+    if wanted - found:
+        raise AppError(message="file not found")
@@ -0,0 +1,380 @@
+import random
+from typing import Dict, List, Optional
+import uuid
+from sqlalchemy import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core import database
+from app.models.ticket_hold_model import TicketHold
+from app.types.errors import AppError
+
+# Sharded inventory (see migrations/0007_inventory_shards.sql): the unsold capacity of a
+# ticket type is split over K event_ticket_shard rows and every buyer claims from a random
+# shard, so concurrent buyers of one hot ticket type no longer queue on a single row lock.
+
+_CLAIM_ATTEMPTS = 3
+
+# Same shape as ticket_service's claim: lock (in key order), check all, update all or none.
+# An allocation may take one ticket type from several shards.
+_CLAIM_SQL = """
+    WITH req AS (
+        SELECT * FROM unnest(
+            CAST(:ticket_ids AS UUID[]), CAST(:shards AS INT[]), CAST(:qtys AS INT[])
+        ) AS r(ticket_id, shard, qty)
+    ),
+    locked AS (
+        SELECT s.event_ticket_id, s.shard, s.total_qty, s.total_booked, s.total_held, req.qty
+        FROM event_ticket_shard s
+        JOIN req ON req.ticket_id = s.event_ticket_id AND req.shard = s.shard
+        JOIN event_ticket t ON t.id = s.event_ticket_id
+        WHERE t.event_id = :event_id
+        ORDER BY s.event_ticket_id, s.shard
+        FOR UPDATE OF s
+    ),
+    ok AS (
+        SELECT count(*) = :n AS all_ok
+        FROM locked WHERE total_booked + total_held + qty <= total_qty
+    ),
+    claimed AS (
+        UPDATE event_ticket_shard s
+        SET {counter} = s.{counter} + locked.qty
+        FROM locked, ok
+        WHERE s.event_ticket_id = locked.event_ticket_id AND s.shard = locked.shard
+            AND ok.all_ok AND s.total_booked + s.total_held + locked.qty <= s.total_qty
+        RETURNING s.event_ticket_id, s.shard, locked.qty
+    ){hold_items}
+    SELECT t.id, t.name, t.price, sum(claimed.qty)::INT AS qty, count(*) AS allocations
+    FROM claimed JOIN event_ticket t ON t.id = claimed.event_ticket_id
+    GROUP BY t.id
+"""
+_HOLD_ITEMS_SQL = """,
+    hold AS (
+        INSERT INTO ticket_hold (id, user_id, event_id, expires_at)
+        SELECT CAST(:hold_id AS UUID), CAST(:user_id AS UUID), CAST(:event_id AS UUID), :expires_at
+        WHERE EXISTS (SELECT 1 FROM claimed)
+    ),
+    hold_items AS (
+        INSERT INTO ticket_hold_item (hold_id, event_ticket_id, shard, qty)
+        SELECT CAST(:hold_id AS UUID), event_ticket_id, shard, qty FROM claimed
+    )"""
+_CLAIM = {
+    counter: text(_CLAIM_SQL.format(counter=counter, hold_items=""))
+    for counter in ("total_booked", "total_held")
+}
+_CLAIM_FOR_HOLD = text(_CLAIM_SQL.format(counter="total_held", hold_items=_HOLD_ITEMS_SQL))
+
+_FREE_SQL = text(
+    """
+    SELECT event_ticket_id, shard, total_qty - total_booked - total_held AS free
+    FROM event_ticket_shard
+    WHERE event_ticket_id = ANY(CAST(:ticket_ids AS UUID[]))
+    ORDER BY free DESC
+    """
+)
+
+# Moves booked units out of the shards into event_ticket.total_booked. Busy shards are
+# skipped and picked up by the next run, buyers are never blocked by the roll-up.
+_ROLL_UP_SQL = text(
+    """
+    WITH locked AS (
+        SELECT event_ticket_id, shard, total_booked
+        FROM event_ticket_shard
+        WHERE total_booked > 0
+        ORDER BY event_ticket_id, shard
+        LIMIT :batch
+        FOR UPDATE SKIP LOCKED
+    ),
+    moved AS (
+        UPDATE event_ticket_shard s
+        SET total_qty = s.total_qty - l.total_booked, total_booked = s.total_booked - l.total_booked
+        FROM locked l
+        WHERE s.event_ticket_id = l.event_ticket_id AND s.shard = l.shard
+        RETURNING s.event_ticket_id, l.total_booked AS qty
+    ),
+    sums AS (
+        SELECT event_ticket_id, sum(qty)::INT AS qty FROM moved GROUP BY event_ticket_id
+    )
+    UPDATE event_ticket t
+    SET total_booked = t.total_booked + sums.qty, shard_qty = t.shard_qty - sums.qty,
+        updated_at = now()
+    FROM sums
+    WHERE t.id = sums.event_ticket_id
+    RETURNING t.id
+    """
+)
+
+# Hands everything held by the shards back to the event_ticket rows and drops them
+_FOLD_SQL = text(
+    """
+    WITH locked AS (
+        SELECT s.event_ticket_id, s.shard, s.total_booked, s.total_held
+        FROM event_ticket_shard s JOIN event_ticket t ON t.id = s.event_ticket_id
+        WHERE t.event_id = :event_id
+        ORDER BY s.event_ticket_id, s.shard
+        FOR UPDATE OF s
+    ),
+    dropped AS (
+        DELETE FROM event_ticket_shard s USING locked l
+        WHERE s.event_ticket_id = l.event_ticket_id AND s.shard = l.shard
+    ),
+    sums AS (
+        SELECT event_ticket_id, sum(total_booked)::INT AS booked, sum(total_held)::INT AS held
+        FROM locked GROUP BY event_ticket_id
+    )
+    UPDATE event_ticket t
+    SET total_booked = t.total_booked + sums.booked, total_held = t.total_held + sums.held,
+        shard_qty = 0, updated_at = now()
+    FROM sums
+    WHERE t.id = sums.event_ticket_id
+    """
+)
+
+# Locks the shards of every ticket type of the event. Writers touching both tables lock
+# the shards before the event_ticket rows, the same order as the roll-up, or the two
+# deadlock.
+_LOCK_SHARDS_SQL = """
+    SELECT s.event_ticket_id, s.shard
+    FROM event_ticket_shard s JOIN event_ticket t ON t.id = s.event_ticket_id
+    WHERE t.event_id = :event_id
+    ORDER BY s.event_ticket_id, s.shard
+    FOR UPDATE OF s
+"""
+
+# Splits the unsold capacity of every ticket type of the event evenly over :k shards.
+# Shards that already exist are topped up, so capacity added later (a new ticket type, a
+# raised total_qty) is sellable through the shards as well. The uncorrelated subquery on
+# shard_locks runs once before the first event_ticket row is locked.
+_SPLIT_SQL = text(
+    f"""
+    WITH shard_locks AS ({_LOCK_SHARDS_SQL}),
+    locked AS (
+        SELECT id, greatest(total_qty - shard_qty - total_booked - total_held, 0) AS free
+        FROM event_ticket
+        WHERE event_id = :event_id AND (SELECT count(*) FROM shard_locks) >= 0
+        ORDER BY id
+        FOR UPDATE
+    ),
+    shards AS (
+        INSERT INTO event_ticket_shard (event_ticket_id, shard, total_qty)
+        SELECT locked.id, g.shard,
+            locked.free / :k + CASE WHEN g.shard < locked.free % :k THEN 1 ELSE 0 END
+        FROM locked CROSS JOIN generate_series(0, :k - 1) AS g(shard)
+        ON CONFLICT (event_ticket_id, shard)
+            DO UPDATE SET total_qty = event_ticket_shard.total_qty + EXCLUDED.total_qty
+    )
+    UPDATE event_ticket t
+    SET shard_qty = t.shard_qty + locked.free, updated_at = now()
+    FROM locked
+    WHERE t.id = locked.id AND locked.free > 0
+    """
+)
+
+# Gives back booked units that were already rolled up into event_ticket.total_booked and
+# hands their capacity to the first shard, on the row alone sharded claims never see it.
+# The shard is locked first, the same order as the roll-up.
+_RETURN_ROLLED_UP_SQL = text(
+    """
+    WITH target AS (
+        SELECT event_ticket_id, shard FROM event_ticket_shard
+        WHERE event_ticket_id = :ticket_id
+        ORDER BY shard
+        LIMIT 1
+        FOR UPDATE
+    ),
+    released AS (
+        UPDATE event_ticket t
+        SET total_booked = t.total_booked - :qty, shard_qty = t.shard_qty + :qty,
+            updated_at = now()
+        FROM target
+        WHERE t.id = target.event_ticket_id AND t.total_booked >= :qty
+        RETURNING t.id
+    )
+    UPDATE event_ticket_shard s SET total_qty = s.total_qty + :qty
+    FROM target, released
+    WHERE s.event_ticket_id = released.id AND s.shard = target.shard
+    RETURNING s.shard
+    """
+)
+
+
+async def claim(
+    event_id: str,
+    quantities: Dict[uuid.UUID, int],
+    shards: int,
+    session: AsyncSession,
+    counter: str,
+    hold: Optional[TicketHold] = None,
+) -> Optional[List]:
+    """Sharded counterpart of `ticket_service.claim_tickets`, same contract.
+
+    Each ticket type first tries one random shard. If that shard is short the free units
+    per shard are read and the claim is spread over the fullest ones, so the last units of
+    a ticket type stay sellable. A failed attempt is rolled back before the next one, so
+    no shard stays locked while others are tried. Returns None when the tickets have no
+    shards (sharding was just switched off), ticket types added later get theirs from
+    `top_up`.
+    """
+    allocation = {(ticket_id, random.randrange(shards)): qty for ticket_id, qty in quantities.items()}
+    for _ in range(_CLAIM_ATTEMPTS):
+        params = {
+            "event_id": event_id,
+            "ticket_ids": [ticket_id for ticket_id, _ in allocation],
+            "shards": [shard for _, shard in allocation],
+            "qtys": list(allocation.values()),
+            "n": len(allocation),
+        }
+        if hold is not None:
+            params.update(
+                hold_id=hold.id, user_id=hold.user_id, expires_at=hold.expires_at
+            )
+        rows = (
+            await session.exec(
+                _CLAIM_FOR_HOLD if hold is not None else _CLAIM[counter], params=params
+            )
+        ).all()
+        claimed = sum(row.allocations for row in rows)
+        if claimed == len(allocation):
+            return rows
+        await session.rollback()
+        if claimed:
+            raise AppError(message="Not enough tickets available")
+
+        allocation = await _allocate(quantities, session)
+        if allocation is None:
+            return None
+    raise AppError(message="Not enough tickets available")
+
+
+async def _allocate(
+    quantities: Dict[uuid.UUID, int], session: AsyncSession
+) -> Optional[Dict[tuple[uuid.UUID, int], int]]:
+    """Spread each quantity over the shards with the most free units (unlocked read)"""
+    free: Dict[uuid.UUID, list] = {ticket_id: [] for ticket_id in quantities}
+    for row in (
+        await session.exec(_FREE_SQL, params={"ticket_ids": list(quantities.keys())})
+    ).all():
+        free[row.event_ticket_id].append(row)
+    if any(not shards for shards in free.values()):
+        return None
+
+    allocation = {}
+    for ticket_id, qty in quantities.items():
+        for row in free[ticket_id]:
+            if qty == 0 or row.free <= 0:
+                break
+            take = min(qty, row.free)
+            allocation[(ticket_id, row.shard)] = take
+            qty -= take
+        if qty:
+            raise AppError(message="Not enough tickets available")
+    return allocation
+
+
+async def release_booked(ticket_id: uuid.UUID, qty: int, session: AsyncSession) -> int:
+    """Give back up to `qty` booked units still counted on the shards (not committed),
+    returns the units released"""
+    released = 0
+    rows = (
+        await session.exec(
+            text(
+                """
+                SELECT shard, total_booked FROM event_ticket_shard
+                WHERE event_ticket_id = :ticket_id AND total_booked > 0
+                ORDER BY shard
+                """
+            ),
+            params={"ticket_id": ticket_id},
+        )
+    ).all()
+    for row in rows:
+        if released == qty:
+            break
+        take = min(qty - released, row.total_booked)
+        result = await session.exec(
+            text(
+                """
+                UPDATE event_ticket_shard SET total_booked = total_booked - :take
+                WHERE event_ticket_id = :ticket_id AND shard = :shard AND total_booked >= :take
+                """
+            ),
+            params={"ticket_id": ticket_id, "shard": row.shard, "take": take},
+        )
+        if result.rowcount:
+            released += take
+    return released
+
+
+async def release_rolled_up(ticket_id: uuid.UUID, qty: int, session: AsyncSession) -> bool:
+    """Give back `qty` booked units already rolled up into the event_ticket row, their
+    capacity goes back to a shard (not committed). False when the type has no shards."""
+    return (
+        await session.exec(_RETURN_ROLLED_UP_SQL, params={"ticket_id": ticket_id, "qty": qty})
+    ).first() is not None
+
+
+async def lock_shards(event_id: str, session: AsyncSession) -> None:
+    """Lock the shards of the event (none when it is unsharded) ahead of event_ticket
+    writes that may be followed by `top_up` in the same transaction"""
+    await session.exec(text(_LOCK_SHARDS_SQL), params={"event_id": event_id})
+
+
+async def top_up(event_id: str, session: AsyncSession) -> None:
+    """Hand capacity the shards of a sharded event do not have yet (new ticket types,
+    raised total_qty) to its shards, a no-op for unsharded events. Does not commit."""
+    shards = (
+        await session.exec(
+            text("SELECT inventory_shards FROM event WHERE id = :event_id"),
+            params={"event_id": event_id},
+        )
+    ).scalar()
+    if shards:
+        await session.exec(_SPLIT_SQL, params={"event_id": event_id, "k": shards})
+
+
+async def set_inventory_shards(event_id: str, shards: int, session: AsyncSession) -> None:
+    """Switch an event to `shards` counter rows per ticket type (0 switches sharding off).
+
+    Existing shards are folded back into the event_ticket rows first, held units included,
+    then the unsold capacity is split again. Runs in one transaction.
+    """
+    updated = (
+        await session.exec(
+            text(
+                "UPDATE event SET inventory_shards = :shards, updated_at = now() "
+                "WHERE id = :event_id RETURNING id"
+            ),
+            params={"shards": shards, "event_id": event_id},
+        )
+    ).first()
+    if updated is None:
+        await session.rollback()
+        raise AppError(message="Event not found")
+
+    # holds taken from a shard are released against the event_ticket row from now on
+    await session.exec(
+        text(
+            """
+            UPDATE ticket_hold_item SET shard = NULL
+            WHERE shard IS NOT NULL
+                AND event_ticket_id IN (SELECT id FROM event_ticket WHERE event_id = :event_id)
+            """
+        ),
+        params={"event_id": event_id},
+    )
+    await session.exec(_FOLD_SQL, params={"event_id": event_id})
+    if shards:
+        await session.exec(_SPLIT_SQL, params={"event_id": event_id, "k": shards})
+    await session.commit()
+
+
+async def roll_up(session: AsyncSession, batch: int = 1000) -> int:
+    """Move booked units from the shards into event_ticket.total_booked, returns the
+    number of ticket types updated"""
+    rows = (await session.exec(_ROLL_UP_SQL, params={"batch": batch})).all()
+    await session.commit()
+    return len(rows)
+
+
+async def roll_up_shards() -> None:
+    """`roll_up` in its own session (run periodically from lifespan)"""
+    async with AsyncSession(database.async_engine) as session:
+        await roll_up(session)
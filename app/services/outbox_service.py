@@ -0,0 +1,198 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import random
+from typing import Awaitable, Callable, Dict, Optional
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core import database
+from app.core.config import get_config
+from app.core.logger import get_logger
+from app.models.outbox_model import OutboxMessage
+from app.services import email_service
+
+# Transactional outbox (see migrations/0009_outbox.sql). Side effects are written with
+# `add` in the caller's transaction, so they exist exactly when the business change
+# committed, and are delivered by `relay_due` at least once.
+
+EMAIL = "email"
+
+# Claims due rows and leases them (available_at pushed to :lease_until) in one short
+# transaction, so no row lock nor pooled connection is held while delivering.
+# SKIP LOCKED lets several relays (workers, instances) run side by side.
+_CLAIM_SQL = text(
+    """
+    WITH due AS (
+        SELECT id FROM outbox
+        WHERE sent_at IS NULL AND available_at <= :now AND attempts < :max_attempts
+        ORDER BY available_at
+        LIMIT :batch
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE outbox o
+    SET attempts = o.attempts + 1, available_at = :lease_until, updated_at = :now
+    FROM due
+    WHERE o.id = due.id
+    RETURNING o.id, o.kind, o.payload, o.attempts
+    """
+)
+_SENT_SQL = text(
+    """
+    UPDATE outbox SET sent_at = :now, last_error = NULL, updated_at = :now
+    WHERE id = ANY(CAST(:ids AS UUID[])) AND sent_at IS NULL
+    """
+)
+_RETRY_SQL = text(
+    """
+    UPDATE outbox o
+    SET available_at = CAST(:now AS TIMESTAMP) + f.delay_sec * INTERVAL '1 second',
+        last_error = f.error, updated_at = :now
+    FROM unnest(CAST(:ids AS UUID[]), CAST(:delays AS FLOAT8[]), CAST(:errors AS TEXT[]))
+        AS f(id, delay_sec, error)
+    WHERE o.id = f.id AND o.sent_at IS NULL
+    """
+)
+
+_wake: Optional[asyncio.Event] = None
+
+
+async def add(
+    session: AsyncSession, kind: str, payload: dict, idempotency_key: Optional[str] = None
+) -> None:
+    """Write a message in the session's transaction, nothing is sent before it commits.
+    A second message with the same `idempotency_key` is ignored."""
+    await session.exec(
+        insert(OutboxMessage)
+        .values(
+            kind=kind,
+            payload=payload,
+            idempotency_key=idempotency_key,
+            available_at=datetime.now(timezone.utc),
+        )
+        .on_conflict_do_nothing(index_elements=["idempotency_key"])
+    )
+
+
+async def add_email(
+    session: AsyncSession,
+    to_emails: list[str],
+    subject: str,
+    body_text: str = "",
+    body_html: Optional[str] = None,
+    idempotency_key: Optional[str] = None,
+) -> None:
+    await add(
+        session,
+        EMAIL,
+        {"to_emails": to_emails, "subject": subject, "body_text": body_text, "body_html": body_html},
+        idempotency_key,
+    )
+
+
+def wake_relay() -> None:
+    """Call after committing messages, the relay picks them up without waiting for its
+    next poll"""
+    if _wake is not None:
+        _wake.set()
+
+
+async def _send_email(message_id: str, payload: dict) -> None:
+    await email_service.deliver_email(
+        to_emails=payload["to_emails"],
+        subject=payload["subject"],
+        body_text=payload.get("body_text") or "",
+        body_html=payload.get("body_html"),
+        # the outbox id, a redelivery after a crash is recognisable as the same mail
+        message_id=f"<{message_id}@event-booker>",
+    )
+
+
+_HANDLERS: Dict[str, Callable[[str, dict], Awaitable[None]]] = {
+    EMAIL: _send_email,
+}
+
+
+async def _deliver(row) -> None:
+    handler = _HANDLERS.get(row.kind)
+    if handler is None:
+        raise ValueError(f"no outbox handler for {row.kind}")
+    await handler(str(row.id), row.payload)
+
+
+def _backoff_sec(attempts: int) -> float:
+    conf = get_config()
+    delay = min(conf.outbox_backoff_base_sec * 2 ** (attempts - 1), conf.outbox_backoff_max_sec)
+    # jitter, rows that failed together do not all come back together
+    return delay * random.uniform(0.5, 1)
+
+
+async def relay_batch(batch: int = 100) -> int:
+    """Claim and deliver up to `batch` due messages, returns the number claimed.
+
+    Deliveries of one batch run concurrently (the mailer sends them over shared SMTP
+    sessions). Successes are marked sent, failures are rescheduled with exponential
+    backoff until `outbox_max_attempts`.
+    """
+    conf = get_config()
+    now = datetime.now(timezone.utc)
+    async with AsyncSession(database.async_engine) as session:
+        rows = (
+            await session.exec(
+                _CLAIM_SQL,
+                params={
+                    "now": now,
+                    "lease_until": now + timedelta(seconds=conf.outbox_lease_sec),
+                    "max_attempts": conf.outbox_max_attempts,
+                    "batch": batch,
+                },
+            )
+        ).all()
+        await session.commit()
+    if not rows:
+        return 0
+
+    results = await asyncio.gather(*(_deliver(row) for row in rows), return_exceptions=True)
+    sent, failed = [], []
+    for row, result in zip(rows, results):
+        if isinstance(result, BaseException):
+            failed.append((row, result))
+        else:
+            sent.append(row.id)
+
+    log = get_logger()
+    now = datetime.now(timezone.utc)
+    async with AsyncSession(database.async_engine) as session:
+        if sent:
+            await session.exec(_SENT_SQL, params={"now": now, "ids": sent})
+        if failed:
+            await session.exec(
+                _RETRY_SQL,
+                params={
+                    "now": now,
+                    "ids": [row.id for row, _ in failed],
+                    "delays": [_backoff_sec(row.attempts) for row, _ in failed],
+                    "errors": [f"{type(e).__name__}: {e}"[:1000] for _, e in failed],
+                },
+            )
+        await session.commit()
+    for row, e in failed:
+        give_up = row.attempts >= conf.outbox_max_attempts
+        log.error(
+            "Outbox message failed, giving up" if give_up else "Outbox message failed",
+            extra={"id": str(row.id), "kind": row.kind, "attempts": row.attempts, "error": str(e)},
+        )
+    return len(rows)
+
+
+async def relay_due(batch: int) -> None:
+    """Deliver everything due, batch by batch (run periodically from lifespan, woken
+    early by `wake_relay`)"""
+    while await relay_batch(batch) == batch:
+        pass
+
+
+def new_relay_wake() -> asyncio.Event:
+    """Event `wake_relay` sets, for the relay task of the running loop"""
+    global _wake
+    _wake = asyncio.Event()
+    return _wake
@@ -0,0 +1,165 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+import uuid
+from sqlalchemy import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core import database
+from app.core.logger import get_logger
+from app.models.ticket_hold_model import TicketHold
+from app.services import ticket_service
+from app.types.errors import AppError
+
+# Deletes the holds selected by `target` with their items and gives the held units back
+# in one statement, to the event_ticket row or to the inventory shard they were taken from.
+# Rows are locked in key order like `ticket_service.claim_tickets`.
+# `{booked}` turns the release into a confirmation (held -> booked).
+_RELEASE_HOLDS_SQL = """
+    WITH target AS ({target}),
+    items AS (
+        DELETE FROM ticket_hold_item i USING target WHERE i.hold_id = target.id
+        RETURNING i.event_ticket_id, i.shard, i.qty
+    ),
+    holds AS (
+        DELETE FROM ticket_hold h USING target WHERE h.id = target.id RETURNING h.id
+    ),
+    released AS (
+        SELECT event_ticket_id, shard, sum(qty)::INT AS qty
+        FROM items GROUP BY event_ticket_id, shard
+    ),
+    locked AS (
+        SELECT t.id, released.qty
+        FROM event_ticket t
+        JOIN released ON released.event_ticket_id = t.id AND released.shard IS NULL
+        ORDER BY t.id
+        FOR UPDATE OF t
+    ),
+    locked_shards AS (
+        SELECT s.event_ticket_id, s.shard, released.qty
+        FROM event_ticket_shard s
+        JOIN released ON released.event_ticket_id = s.event_ticket_id AND released.shard = s.shard
+        ORDER BY s.event_ticket_id, s.shard
+        FOR UPDATE OF s
+    ),
+    from_tickets AS (
+        UPDATE event_ticket t
+        SET total_held = t.total_held - locked.qty{booked}, updated_at = now()
+        FROM locked
+        WHERE t.id = locked.id
+        RETURNING t.id, locked.qty
+    ),
+    from_shards AS (
+        UPDATE event_ticket_shard t
+        SET total_held = t.total_held - locked_shards.qty{booked}
+        FROM locked_shards
+        WHERE t.event_ticket_id = locked_shards.event_ticket_id AND t.shard = locked_shards.shard
+        RETURNING t.event_ticket_id AS id, locked_shards.qty
+    )
+    SELECT t.id, t.event_id, t.name, t.price, sum(r.qty)::INT AS qty,
+        (SELECT count(*) FROM holds) AS holds
+    FROM (SELECT * FROM from_tickets UNION ALL SELECT * FROM from_shards) r
+    JOIN event_ticket t ON t.id = r.id
+    GROUP BY t.id
+"""
+
+_SWEEP_SQL = text(
+    _RELEASE_HOLDS_SQL.format(
+        target="""
+        SELECT id FROM ticket_hold WHERE expires_at <= :now
+        ORDER BY expires_at LIMIT :batch
+        FOR UPDATE SKIP LOCKED
+        """,
+        booked="",
+    )
+)
+_CANCEL_SQL = text(
+    _RELEASE_HOLDS_SQL.format(
+        target="SELECT id FROM ticket_hold WHERE id = :hold_id AND user_id = :user_id FOR UPDATE",
+        booked="",
+    )
+)
+_CONFIRM_SQL = text(
+    _RELEASE_HOLDS_SQL.format(
+        target="""
+        SELECT id FROM ticket_hold
+        WHERE id = :hold_id AND user_id = :user_id AND expires_at > :now
+        FOR UPDATE
+        """,
+        booked=", total_booked = t.total_booked + qty",
+    )
+)
+
+
+async def create_hold(
+    user_id: uuid.UUID,
+    event_id: str,
+    quantities: Dict[uuid.UUID, int],
+    ttl_sec: int,
+    session: AsyncSession,
+) -> tuple[TicketHold, List]:
+    """Hold `quantities` ({ticket_id: qty}) for `ttl_sec`, all or nothing.
+
+    The hold and its items are written by the conditional counter update itself, so the
+    ticket rows stay locked for that one statement and a failed claim leaves nothing behind.
+    """
+    hold = TicketHold(
+        user_id=user_id,
+        event_id=event_id,
+        expires_at=datetime.now(timezone.utc) + timedelta(seconds=ttl_sec),
+    )
+    rows = await ticket_service.claim_tickets(
+        event_id, quantities, session, ticket_service.HELD, hold=hold
+    )
+    await session.commit()
+    return hold, rows
+
+
+async def confirm_hold(hold_id: uuid.UUID, user_id: uuid.UUID, session: AsyncSession) -> List:
+    """Turn an active hold into booked units. Returns rows of (id, event_id, name, price, qty)"""
+    rows = (
+        await session.exec(
+            _CONFIRM_SQL,
+            params={"hold_id": hold_id, "user_id": user_id, "now": datetime.now(timezone.utc)},
+        )
+    ).all()
+    if not rows:
+        await session.rollback()
+        raise AppError(message="Hold not found or expired")
+    await session.commit()
+    return rows
+
+
+async def cancel_hold(hold_id: uuid.UUID, user_id: uuid.UUID, session: AsyncSession) -> None:
+    rows = (
+        await session.exec(_CANCEL_SQL, params={"hold_id": hold_id, "user_id": user_id})
+    ).all()
+    if not rows:
+        await session.rollback()
+        raise AppError(message="Hold not found or expired")
+    await session.commit()
+
+
+async def release_expired_holds(session: AsyncSession, batch: int = 500) -> int:
+    """Release up to `batch` expired holds in one statement, returns the number released.
+
+    SKIP LOCKED lets several workers sweep side by side and never blocks on a hold that
+    is being confirmed or cancelled at the same moment.
+    """
+    rows = (
+        await session.exec(
+            _SWEEP_SQL, params={"now": datetime.now(timezone.utc), "batch": batch}
+        )
+    ).all()
+    await session.commit()
+    return rows[0].holds if rows else 0
+
+
+async def sweep_expired_holds(batch: int) -> None:
+    """Release every expired hold, batch by batch (run periodically from lifespan)"""
+    released = batch
+    total = 0
+    while released == batch:
+        async with AsyncSession(database.async_engine) as session:
+            released = await release_expired_holds(session, batch)
+        total += released
+    if total:
+        get_logger().info("Released expired ticket holds", extra={"holds": total})
@@ -1,10 +1,68 @@
-from sqlmodel import Session, select, update
+from datetime import datetime, timezone
+from sqlalchemy import Integer, and_, func, literal, literal_column, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.models.event_model import Event
 from app.models.event_ticket_model import EventTicket
+from app.models.ticket_hold_model import TicketHold
+from app.services import inventory_shard_service
 from app.types.errors import AppError
-from typing import List, Optional
+from typing import Dict, List, Optional
+import uuid
 
+BOOKED = "total_booked"
+HELD = "total_held"
 
-def create_ticket(event_id: str, dto, session: Session) -> EventTicket:
+# Claims every requested ticket type in one statement, all or nothing.
+# `locked` takes the row locks in id order (no deadlocks between overlapping multi type
+# claims) and reads the latest committed counts, `ok` checks that every type has room,
+# and the update only applies when all of them do. Held units and the capacity handed to
+# inventory shards count against availability.
+# `{counter}` is either BOOKED or HELD, `{hold_items}` records the claim for a hold.
+_CLAIM_MANY_SQL = """
+    WITH req AS (
+        SELECT * FROM unnest(CAST(:ticket_ids AS UUID[]), CAST(:qtys AS INT[])) AS r(id, qty)
+    ),
+    locked AS (
+        SELECT t.id, t.total_qty, t.shard_qty, t.total_booked, t.total_held, req.qty
+        FROM event_ticket t JOIN req ON req.id = t.id
+        WHERE t.event_id = :event_id
+        ORDER BY t.id
+        FOR UPDATE OF t
+    ),
+    ok AS (
+        SELECT count(*) = :n AS all_ok
+        FROM locked WHERE shard_qty + total_booked + total_held + qty <= total_qty
+    ),
+    claimed AS (
+        UPDATE event_ticket t
+        SET {counter} = t.{counter} + locked.qty, updated_at = now()
+        FROM locked, ok
+        WHERE t.id = locked.id AND ok.all_ok
+            AND t.shard_qty + t.total_booked + t.total_held + locked.qty <= t.total_qty
+        RETURNING t.id, t.name, t.price, locked.qty
+    ){hold_items}
+    SELECT id, name, price, qty FROM claimed
+"""
+_HOLD_ITEMS_SQL = """,
+    hold AS (
+        INSERT INTO ticket_hold (id, user_id, event_id, expires_at)
+        SELECT CAST(:hold_id AS UUID), CAST(:user_id AS UUID), CAST(:event_id AS UUID), :expires_at
+        WHERE EXISTS (SELECT 1 FROM claimed)
+    ),
+    hold_items AS (
+        INSERT INTO ticket_hold_item (hold_id, event_ticket_id, qty)
+        SELECT CAST(:hold_id AS UUID), id, qty FROM claimed
+    )"""
+_CLAIM_MANY = {
+    counter: text(_CLAIM_MANY_SQL.format(counter=counter, hold_items=""))
+    for counter in (BOOKED, HELD)
+}
+_CLAIM_MANY_FOR_HOLD = text(_CLAIM_MANY_SQL.format(counter=HELD, hold_items=_HOLD_ITEMS_SQL))
+
+
+async def create_ticket(event_id: str, dto, session: AsyncSession) -> EventTicket:
     """Create a single ticket for given event_id. dto has name, price, total_qty."""
     ticket = EventTicket(
         event_id=event_id,
@@ -13,42 +71,225 @@ def create_ticket(event_id: str, dto, session: Session) -> EventTicket:
         total_qty=dto.total_qty,
     )
     session.add(ticket)
-    session.commit()
-    session.refresh(ticket)
+    await session.flush()
+    await inventory_shard_service.top_up(str(event_id), session)
+    await session.commit()
+    await session.refresh(ticket)
     return ticket
 
 
-def update_ticket(ticket_id: str, dto, session: Session) -> EventTicket:
-    t = session.exec(select(EventTicket).where(EventTicket.id == ticket_id)).first()
+async def update_ticket(ticket_id: str, dto, session: AsyncSession) -> EventTicket:
+    t = (
+        await session.exec(select(EventTicket).where(EventTicket.id == ticket_id))
+    ).first()
     if not t:
         raise AppError(message="Ticket not found")
     update_data = dto.model_dump(exclude_unset=True)
-    session.exec(update(EventTicket).where(EventTicket.id == ticket_id).values(update_data))
+    await session.exec(
+        update(EventTicket).where(EventTicket.id == ticket_id).values(update_data)
+    )
     return t
 
 
-def upsert_tickets_for_event(event_id: str, tickets: List, session: Session) -> List[EventTicket]:
-    """Given a list of TicketInputDto-like objects, create or update tickets for an event.
+async def upsert_tickets_for_event(
+    event_id: str, tickets: List, session: AsyncSession
+) -> List[uuid.UUID]:
+    """Given a list of TicketInputDto-like objects, create or update tickets for an event
+    with one multi-row INSERT ... ON CONFLICT (id) DO UPDATE. Does not commit.
 
     Behavior:
-    - If an item has `id`, attempt to update that ticket.
-    - If no `id`, create a new ticket linked to event_id.
+    - If an item has `id`, that ticket of the event is updated; its total_qty may not drop
+      below the units already booked, held or handed to inventory shards.
+    - If no `id`, a new ticket linked to event_id is created.
     - Tickets not referenced are left untouched.
+    - On a sharded event the added capacity is split over the shards.
     """
-    result = []
+    if not tickets:
+        return []
+    now = datetime.now(timezone.utc)
+    values = []
     for item in tickets:
-        if getattr(item, "id", None):
-            t = update_ticket(item.id, item, session)
-            result.append(t)
-        else:
-            t = create_ticket(event_id, item, session)
-            result.append(t)
-    return result
+        try:
+            ticket_id = uuid.UUID(item.id) if item.id else uuid.uuid4()
+        except ValueError:
+            raise AppError(message=f"invalid ticket id: {item.id}")
+        values.append(
+            {
+                "id": ticket_id,
+                "event_id": event_id,
+                "name": item.name,
+                "price": item.price,
+                "total_qty": item.total_qty,
+                "created_at": now,
+                "updated_at": now,
+            }
+        )
+
+    # shards before event_ticket rows, see inventory_shard_service._LOCK_SHARDS_SQL
+    await inventory_shard_service.lock_shards(event_id, session)
+    stmt = insert(EventTicket).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[EventTicket.id],
+        set_={
+            "name": stmt.excluded.name,
+            "price": stmt.excluded.price,
+            "total_qty": stmt.excluded.total_qty,
+            "updated_at": stmt.excluded.updated_at,
+        },
+        where=and_(
+            EventTicket.event_id == stmt.excluded.event_id,
+            stmt.excluded.total_qty
+            >= EventTicket.shard_qty + EventTicket.total_booked + EventTicket.total_held,
+        ),
+    ).returning(EventTicket.id, literal_column("xmax = 0").label("inserted"))
+    rows = (await session.exec(stmt)).all()
+
+    # a skipped conflict returns no row, an unknown id would have been inserted
+    updated_ids = {value["id"] for value, item in zip(values, tickets) if item.id}
+    if len(rows) != len(values) or any(row.inserted and row.id in updated_ids for row in rows):
+        raise AppError(message="Ticket not found or total_qty below the tickets already sold")
+    # a sharded event sells through its shards only, new capacity has to go there too
+    await inventory_shard_service.top_up(event_id, session)
+    return [row.id for row in rows]
+
+
+async def find_by_event(event_id: str, session: AsyncSession):
+    return (
+        await session.exec(select(EventTicket).where(EventTicket.event_id == event_id))
+    ).all()
+
+
+async def find_version_by_event(event_id: str, session: AsyncSession) -> tuple:
+    """(count, latest updated_at, booked, held) of an event's tickets, for ETags.
+
+    updated_at is the transaction start, two claims can commit in the other order and
+    leave max(updated_at) unchanged, the counter sums always move with availability.
+    """
+    return (
+        await session.exec(
+            select(
+                func.count(),
+                func.max(EventTicket.updated_at),
+                func.sum(EventTicket.total_booked),
+                func.sum(EventTicket.total_held),
+            ).where(EventTicket.event_id == event_id)
+        )
+    ).one()
+
+
+async def find_by_id(id: str, session: AsyncSession):
+    return (await session.exec(select(EventTicket).where(EventTicket.id == id))).first()
+
+
+async def claim_tickets(
+    event_id: str,
+    quantities: Dict[uuid.UUID, int],
+    session: AsyncSession,
+    counter: str = BOOKED,
+    hold: Optional[TicketHold] = None,
+) -> List:
+    """Atomically add `quantities` ({ticket_id: qty}) to the `counter` of an event's tickets.
+
+    No read-then-write: availability (total_qty - total_booked - total_held) is checked by
+    the conditional UPDATE itself, so concurrent buyers can never oversell. Raises AppError
+    when any type lacks room; nothing is committed, the caller commits (or rolls back) right
+    after so the row locks live for this single statement only.
+    With `hold` (a not yet saved TicketHold) the same statement also writes the hold and
+    its ticket_hold_item rows.
+    Events with inventory shards claim from the shard rows instead.
+    Returns rows of (id, name, price, qty), one per ticket type.
+    """
+    if not quantities or any(qty <= 0 for qty in quantities.values()):
+        raise AppError(message="Ticket quantity must be greater than 0")
+
+    shards = (
+        await session.exec(select(Event.inventory_shards).where(Event.id == event_id))
+    ).first()
+    if shards:
+        rows = await inventory_shard_service.claim(
+            event_id, quantities, shards, session, counter, hold
+        )
+        if rows is not None:
+            return rows
+        # shards were just switched off, fall through to the event_ticket rows
+
+    if len(quantities) == 1 and hold is None:
+        # single type: plain conditional update
+        [(ticket_id, qty)] = quantities.items()
+        column = getattr(EventTicket, counter)
+        stmt = (
+            update(EventTicket)
+            .where(
+                EventTicket.id == ticket_id,
+                EventTicket.event_id == event_id,
+                EventTicket.shard_qty
+                + EventTicket.total_booked
+                + EventTicket.total_held
+                + qty
+                <= EventTicket.total_qty,
+            )
+            .values({counter: column + qty, "updated_at": func.now()})
+            .returning(
+                EventTicket.id,
+                EventTicket.name,
+                EventTicket.price,
+                literal(qty, Integer).label("qty"),
+            )
+        )
+        rows = (await session.exec(stmt)).all()
+    else:
+        params = {
+            "event_id": event_id,
+            "ticket_ids": list(quantities.keys()),
+            "qtys": list(quantities.values()),
+            "n": len(quantities),
+        }
+        if hold is not None:
+            params.update(hold_id=hold.id, user_id=hold.user_id, expires_at=hold.expires_at)
+        rows = (
+            await session.exec(
+                _CLAIM_MANY_FOR_HOLD if hold is not None else _CLAIM_MANY[counter],
+                params=params,
+            )
+        ).all()
+
+    if len(rows) != len(quantities):
+        await session.rollback()
+        raise AppError(message="Not enough tickets available")
+    return rows
 
 
-def find_by_event(event_id: str, session: Session):
-    return session.exec(select(EventTicket).where(EventTicket.event_id == event_id)).all()
+async def reserve_tickets(
+    event_id: str, quantities: Dict[uuid.UUID, int], session: AsyncSession
+) -> List:
+    """Claim and commit `quantities` as booked, all or nothing (see `claim_tickets`)"""
+    rows = await claim_tickets(event_id, quantities, session, BOOKED)
+    await session.commit()
+    return rows
 
 
-def find_by_id(id: str, session: Session):
-    return session.exec(select(EventTicket).where(EventTicket.id == id)).first()
+async def release_tickets(
+    event_id: str, quantities: Dict[uuid.UUID, int], session: AsyncSession
+) -> None:
+    """Give back booked units (e.g. when the booking could not be saved)"""
+    shards = (
+        await session.exec(select(Event.inventory_shards).where(Event.id == event_id))
+    ).first()
+    for ticket_id, qty in sorted(quantities.items()):
+        if shards:
+            # units not rolled up yet are still booked on the shards, the rest went to
+            # the row and is handed back to a shard (a later roll-up would re-add shard
+            # units released from the row, row capacity is never seen by sharded claims)
+            qty -= await inventory_shard_service.release_booked(ticket_id, qty, session)
+            if qty == 0 or await inventory_shard_service.release_rolled_up(ticket_id, qty, session):
+                continue
+        await session.exec(
+            update(EventTicket)
+            .where(
+                EventTicket.id == ticket_id,
+                EventTicket.event_id == event_id,
+                EventTicket.total_booked >= qty,
+            )
+            .values(total_booked=EventTicket.total_booked - qty, updated_at=func.now())
+        )
+    await session.commit()
@@ -1,7 +1,8 @@
 from datetime import datetime, timezone, timedelta
 import secrets
 
-from sqlmodel import Session, select, text
+from sqlmodel import select, text
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.models import Token
 
@@ -11,14 +12,14 @@ def generate_6_digit_code() -> int:
     return secrets.randbelow(900000) + 100000
 
 
-def create_token(
-    session: Session,
+async def create_token(
+    session: AsyncSession,
     resource_type: str,
     resource_id: str,
     expiry_seconds: int = 300,  # 5 minute
 ) -> int:
 
-    session.exec(
+    await session.exec(
         statement=text(
             """
         DELETE FROM token
@@ -46,8 +47,8 @@ def create_token(
     return code
 
 
-def verify_token(
-    session: Session,
+async def verify_token(
+    session: AsyncSession,
     code: int,
     resource_type: str,
     resource_id: str,
@@ -62,13 +63,13 @@ def verify_token(
         Token.expires_at > now,
     )
 
-    token = session.exec(statement).first()
+    token = (await session.exec(statement)).first()
 
     if not token:
         return False
 
     if consume:
-        session.delete(token)
-        session.commit()
+        await session.delete(token)
+        await session.commit()
 
     return True
@@ -1,67 +1,135 @@
 from datetime import datetime, timezone
-import math
-from fastapi import BackgroundTasks
-from sqlalchemy import func, text
-from sqlmodel import Session, and_, select, update
+from sqlalchemy import bindparam, func, inspect, text
+from sqlmodel import and_, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.config import get_config
 from app.dtos.user_dto import AppUserRead, ProfileUpdateRequestDto
 from app.models.app_user_model import AppUser
-from app.services import file_service, token_service
-from app.services.email_service import send_email
+from app.models.file_model import File
+from app.services import file_service, outbox_service, token_service
 from app.types.errors import AppError
 from app.types.pagination_data import PaginationData
-from app.utils.pagination_utils import PaginationOption
-from sqlalchemy.orm import joinedload
+from app.utils.pagination_utils import (
+    PaginationOption,
+    count_total,
+    keyset_paginate,
+    split_page,
+)
+from app.utils.cache_utils import TTLCache
+from sqlalchemy.orm import joinedload, make_transient_to_detached
 
+_user_cache: TTLCache | None = None
 
-def create(user: AppUser, session: Session):
+
+def create(user: AppUser, session: AsyncSession):
     session.add(user)
 
 
-def find_by_email(email: str, session: Session) -> AppUser | None:
-    return session.exec(select(AppUser).where(AppUser.email == email)).first()
+async def find_by_email(email: str, session: AsyncSession) -> AppUser | None:
+    return (await session.exec(select(AppUser).where(AppUser.email == email))).first()
 
 
-def find_by_id(id: str, session: Session) -> AppUser | None:
-    data = session.exec(
-        select(AppUser).options(joinedload(AppUser.profile)).where(AppUser.id == id)
+async def find_by_id(id: str, session: AsyncSession) -> AppUser | None:
+    data = (
+        await session.exec(
+            select(AppUser).options(joinedload(AppUser.profile)).where(AppUser.id == id)
+        )
     ).first()
     return data
 
 
-def find_by_phone_number(phone_number: str, session: Session) -> AppUser | None:
-    return session.exec(
-        select(AppUser).where(AppUser.phone_number == phone_number)
+async def find_by_id_cached(id: str, session: AsyncSession) -> AppUser | None:
+    """find_by_id served from a per process ttl cache, used to resolve the authenticated user.
+
+    The cache holds plain column snapshots. A hit is rebuilt as a detached instance and merged
+    into `session` without a query, so callers get a normal session bound AppUser.
+    """
+    cache = _get_user_cache()
+    snapshot = cache.get(str(id))
+    if snapshot is not None:
+        return await session.merge(_from_snapshot(snapshot), load=False)
+    user = await find_by_id(id, session)
+    if user:
+        cache.set(str(id), _to_snapshot(user))
+    return user
+
+
+def invalidate_cached_user(id) -> None:
+    """Call after any change to the user row (profile, verification, roles)"""
+    _get_user_cache().delete(str(id))
+
+
+def user_cache_stats() -> dict:
+    return _get_user_cache().stats()
+
+
+def _get_user_cache() -> TTLCache:
+    global _user_cache
+    if _user_cache is None:
+        conf = get_config()
+        _user_cache = TTLCache(
+            max_size=conf.auth_user_cache_size, ttl_sec=conf.auth_user_cache_ttl_sec
+        )
+    return _user_cache
+
+
+def _columns(obj) -> dict:
+    return {attr.key: getattr(obj, attr.key) for attr in inspect(type(obj)).column_attrs}
+
+
+def _to_snapshot(user: AppUser) -> tuple[dict, dict | None]:
+    return _columns(user), _columns(user.profile) if user.profile else None
+
+
+def _from_snapshot(snapshot: tuple[dict, dict | None]) -> AppUser:
+    user_columns, profile_columns = snapshot
+    user = AppUser(**user_columns)
+    user.profile = File(**profile_columns) if profile_columns else None
+    # detached (not transient) so session.merge(load=False) accepts it
+    make_transient_to_detached(user)
+    if user.profile:
+        make_transient_to_detached(user.profile)
+    return user
+
+
+async def find_by_phone_number(phone_number: str, session: AsyncSession) -> AppUser | None:
+    return (
+        await session.exec(select(AppUser).where(AppUser.phone_number == phone_number))
     ).first()
 
 
-def update_profile(
-    user: AppUser, updateDto: ProfileUpdateRequestDto, session: Session
+async def update_profile(
+    user: AppUser, updateDto: ProfileUpdateRequestDto, session: AsyncSession
 ) -> AppUser:
     update_dict = updateDto.model_dump(exclude_unset=True)
     if "phone_number" in update_dict:
         update_dict["phone_verified_at"] = None
     if "profile_id" in update_dict and update_dict["profile_id"] is not None:
-        profile = file_service.find_by_id(update_dict["profile_id"], session)
+        profile = await file_service.find_by_id(update_dict["profile_id"], session)
         if not profile:
             raise AppError(message="profile photo not found")
-    session.exec(update(AppUser).where(AppUser.id == user.id).values(update_dict))
-    session.commit()
-    session.refresh(user)
+    await session.exec(update(AppUser).where(AppUser.id == user.id).values(update_dict))
+    await session.commit()
+    invalidate_cached_user(user.id)
+    await session.refresh(user)
     return user
 
 
-def pagination_find(
-    pagination_options: PaginationOption, session: Session
+async def pagination_find(
+    pagination_options: PaginationOption, session: AsyncSession
 ) -> PaginationData[AppUserRead]:
     where_conditions = []
     params = {}
 
     if pagination_options.search:
+        # served by the pg_trgm GIN indexes (migrations/0005), <% also matches typos in names
         params["search"] = f"%{pagination_options.search}%"
+        params["term"] = pagination_options.search
         raw_where = text(
             "(app_user.full_name ILIKE :search "
             "OR app_user.email ILIKE :search "
-            "OR app_user.phone_number ILIKE :search)"
+            "OR app_user.phone_number ILIKE :search "
+            "OR :term <% app_user.full_name)"
         )
         where_conditions.append(raw_where)
 
@@ -69,49 +137,89 @@ def pagination_find(
     sq = select(AppUser)
 
     # Joins
-    sq.options(joinedload(AppUser.profile))
+    sq = sq.options(joinedload(AppUser.profile))
 
     # Filters
     if where_conditions:
-        sq.where(and_(*where_conditions))
-
-    # Sorting
-    sort_col = pagination_options.sorting_col or "created_at"
-    sort_asc = pagination_options.sorting == "asc"
-
-    if sort_col == "full_name":
-        order_expr = AppUser.full_name.asc() if sort_asc else AppUser.full_name.desc()
-    elif sort_col == "email":
-        order_expr = AppUser.email.asc() if sort_asc else AppUser.email.desc()
+        sq = sq.where(and_(*where_conditions))
+
+    sort_col = pagination_options.sorting_col
+    if pagination_options.search and sort_col in (None, "similarity"):
+        # best match first, computed per row so this stays on offset pages
+        if pagination_options.cursor:
+            raise AppError(message="cursor pagination is not supported for similarity sorting")
+        similarity = _search_similarity()
+        sq = sq.order_by(
+            *(
+                (similarity.asc(), AppUser.id.asc())
+                if pagination_options.sorting == "asc"
+                else (similarity.desc(), AppUser.id.desc())
+            )
+        )
+        data_list = (
+            await session.exec(
+                sq.limit(pagination_options.limit).offset(pagination_options.get_offset()),
+                params=params,
+            )
+        ).all()
+        next_cursor = None
     else:
-        order_expr = AppUser.created_at.asc() if sort_asc else AppUser.created_at.desc()
-
-    sq = sq.order_by(order_expr)
-
-    data_list = session.exec(
-        sq.limit(pagination_options.limit).offset(pagination_options.get_offset()),
-        params=params,
-    ).all()
+        data_list, next_cursor = await _keyset_page(sq, pagination_options, params, session)
 
-    total = session.exec(
-        select(func.count(AppUser.id)).where(*where_conditions), params=params
-    ).one()
-    total_page = math.ceil(total / pagination_options.limit)
+    total, total_page, total_kind = await count_total(
+        session, select(AppUser.id).where(*where_conditions), params, pagination_options
+    )
 
     return PaginationData(
         list=[AppUserRead.model_validate(data) for data in data_list],
         total=total,
         total_page=total_page,
+        total_kind=total_kind,
+        next_cursor=next_cursor,
+    )
+
+
+def _search_similarity():
+    """pg_trgm similarity of :term to the best matching searchable column"""
+    term = bindparam("term")
+    return func.greatest(
+        func.word_similarity(term, func.coalesce(AppUser.full_name, "")),
+        func.similarity(term, AppUser.email),
+        func.similarity(term, func.coalesce(AppUser.phone_number, "")),
     )
 
 
-def send_email_validation_code(
-    user: AppUser, session: Session, background_tasks: BackgroundTasks
+async def _keyset_page(
+    sq, pagination_options: PaginationOption, params: dict, session: AsyncSession
 ):
-    code = token_service.create_token(
+    # Sorting, keyset on (sort column, id) so cursor pages are an index range scan
+    sort_col = pagination_options.sorting_col
+    if sort_col == "full_name":
+        # nullable, a NULL would drop out of the (full_name, id) row comparison
+        sort_expr = func.coalesce(AppUser.full_name, "")
+        sort_value = lambda u: u.full_name or ""
+    elif sort_col == "email":
+        sort_expr = AppUser.email
+        sort_value = lambda u: u.email
+    else:
+        sort_col = "created_at"
+        sort_expr = AppUser.created_at
+        sort_value = lambda u: u.created_at
+
+    sq = keyset_paginate(sq, pagination_options, sort_col, sort_expr, AppUser.id)
+
+    return split_page(
+        (await session.exec(sq, params=params)).all(),
+        pagination_options,
+        sort_col,
+        sort_value,
+    )
+
+
+async def send_email_validation_code(user: AppUser, session: AsyncSession):
+    code = await token_service.create_token(
         session=session, resource_id=str(user.id), resource_type="user_email_verification"
     )
-    session.commit()
     subject = "Your Email Verification Code"
     html_body = f"""
     <html>
@@ -125,16 +233,20 @@ def send_email_validation_code(
       </body>
     </html>
     """
-    background_tasks.add_task(
-        send_email, to_emails=[user.email], subject=subject, body_html=html_body
+    # committed with the token, the outbox relay sends it (the request never waits for SMTP)
+    await outbox_service.add_email(
+        session, to_emails=[user.email], subject=subject, body_html=html_body
     )
+    await session.commit()
+    outbox_service.wake_relay()
 
-def verify_email_validation_code(user: AppUser, session: Session, code:int):
-    valid = token_service.verify_token(session, code, "user_email_verification", str(user.id))
+async def verify_email_validation_code(user: AppUser, session: AsyncSession, code:int):
+    valid = await token_service.verify_token(session, code, "user_email_verification", str(user.id))
     if not valid:
         raise AppError("Invalid token")
     user.email_verified_at = datetime.now(timezone.utc)
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    invalidate_cached_user(user.id)
+    await session.refresh(user)
 
@@ -0,0 +1,11 @@
+import uuid
+from typing import List
+from pydantic import BaseModel
+
+
+class AuthClaims(BaseModel):
+    """Identity carried by an access token, enough to authorize without a DB read"""
+    user_id: uuid.UUID
+    roles: List[str]
+    email_verified: bool = False
+    phone_verified: bool = False
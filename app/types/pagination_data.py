@@ -1,9 +1,13 @@
-from typing import Any, Generic, List, TypeVar
+from typing import Any, Generic, List, Literal, Optional, TypeVar
 from pydantic import BaseModel
 
 T = TypeVar("T")
 
 class PaginationData(BaseModel, Generic[T]):
     list: List[T]
-    total_page: int
-    total: int
+    total_page: Optional[int]
+    total: Optional[int]
+    # exact | estimate (planner) | cached (short lived exact count) | none (not counted)
+    total_kind: Literal["exact", "estimate", "cached", "none"] = "exact"
+    # pass back as `cursor` to fetch the next page by keyset, None on the last page
+    next_cursor: Optional[str] = None
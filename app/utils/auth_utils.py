@@ -3,18 +3,33 @@ from datetime import datetime, timedelta, timezone
 
 from app.core.config import get_config
 from app.types import ErrStr
+from app.types.auth_claims import AuthClaims
 from app.utils import is_valid_uuid
 
 ALGORITHM = "HS256"
+ACCESS_TOKEN = "access"
+REFRESH_TOKEN = "refresh"
+UPLOAD_TOKEN = "upload"
 
 
-def create_access_token(user_id: str, expires_in_minutes: int = 30, secret_key=str) -> str:
+def create_access_token(
+    user_id: str,
+    expires_in_minutes: int = 30,
+    secret_key=str,
+    roles: list[str] | None = None,
+    email_verified: bool = False,
+    phone_verified: bool = False,
+) -> str:
     """
-    Create a JWT token containing user_id and expiry.
+    Create a JWT token containing user_id, roles, verification flags and expiry.
     """
     expire = datetime.now(timezone.utc) + timedelta(minutes=expires_in_minutes)
     payload = {
         "sub": str(user_id),
+        "typ": ACCESS_TOKEN,
+        "roles": roles or [],
+        "email_verified": email_verified,
+        "phone_verified": phone_verified,
         "exp": expire,
         "iat": datetime.now(timezone.utc),
     }
@@ -22,6 +37,38 @@ def create_access_token(user_id: str, expires_in_minutes: int = 30, secret_key=s
     return token
 
 
+def create_refresh_token(user_id: str, expires_in_days: int = 30, secret_key=str) -> str:
+    """
+    Create a long lived JWT token, only accepted by the refresh flow.
+    """
+    expire = datetime.now(timezone.utc) + timedelta(days=expires_in_days)
+    payload = {
+        "sub": str(user_id),
+        "typ": REFRESH_TOKEN,
+        "exp": expire,
+        "iat": datetime.now(timezone.utc),
+    }
+    return jwt.encode(payload, secret_key, algorithm=ALGORITHM)
+
+
+def create_upload_token(
+    user_id: str, key: str, content_type: str, expires_in_sec: int, secret_key=str
+) -> str:
+    """
+    Create a short lived JWT token naming the object a user was allowed to upload,
+    only accepted by the upload finalize flow.
+    """
+    payload = {
+        "sub": str(user_id),
+        "typ": UPLOAD_TOKEN,
+        "key": key,
+        "content_type": content_type,
+        "exp": datetime.now(timezone.utc) + timedelta(seconds=expires_in_sec),
+        "iat": datetime.now(timezone.utc),
+    }
+    return jwt.encode(payload, secret_key, algorithm=ALGORITHM)
+
+
 def verify_token(token: str, secret_key:str) -> dict:
     """
     Verify a JWT token and return the decoded payload.
@@ -29,23 +76,60 @@ def verify_token(token: str, secret_key:str) -> dict:
     """
     try:
         payload = jwt.decode(token, secret_key, algorithms=[ALGORITHM])
-        return payload  # payload contains 'sub' (user_id), 'exp', 'iat'
+        return payload  # payload contains 'sub' (user_id), 'typ', 'exp', 'iat' and access claims
     except jwt.ExpiredSignatureError:
         raise Exception("Token has expired")
     except jwt.InvalidTokenError:
         raise Exception("Invalid token")
 
 
-def verify_extract_user_id(token: str) -> tuple[str,bool,ErrStr]:
+def _verify_payload(token: str, token_type: str) -> dict:
+    payload = verify_token(token, get_config().access_token_secret)
+    # tokens issued before "typ" existed are access tokens
+    if payload.get("typ", ACCESS_TOKEN) != token_type:
+        raise Exception("Invalid token type")
+    if not is_valid_uuid(payload.get("sub")):
+        raise Exception("invalid user id in token")
+    return payload
+
+
+def verify_extract_user_id(token: str, token_type: str = ACCESS_TOKEN) -> tuple[str,bool,ErrStr]:
     """
     Extract user_id ('sub' claim) from the token after verification.
     """
     try:
-        payload = verify_token(token, get_config().access_token_secret)
-        user_id = payload.get("sub")
-        if not is_valid_uuid(user_id):
-            raise Exception("invalid user id in token")
-        return user_id, True, ""
+        payload = _verify_payload(token, token_type)
+        return payload.get("sub"), True, ""
         
     except Exception as e:
         return "", False, str(e)
+
+
+def verify_extract_upload(token: str) -> tuple[dict | None, bool, ErrStr]:
+    """
+    Extract the upload token payload ('sub', 'key', 'content_type') after verification.
+    """
+    try:
+        return _verify_payload(token, UPLOAD_TOKEN), True, ""
+    except Exception as e:
+        return None, False, str(e)
+
+
+def verify_extract_claims(token: str) -> tuple[AuthClaims | None, bool, ErrStr]:
+    """
+    Extract AuthClaims from an access token after verification.
+    """
+    try:
+        payload = _verify_payload(token, ACCESS_TOKEN)
+        if "roles" not in payload:
+            raise Exception("Token has no roles, please login again")
+        claims = AuthClaims(
+            user_id=payload["sub"],
+            roles=payload["roles"],
+            email_verified=payload.get("email_verified", False),
+            phone_verified=payload.get("phone_verified", False),
+        )
+        return claims, True, ""
+
+    except Exception as e:
+        return None, False, str(e)
@@ -0,0 +1,92 @@
+from typing import AsyncIterator, NamedTuple, Optional, Union
+
+from fastapi import Request
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from app.types.errors import AppError
+
+
+class FormPart(NamedTuple):
+    name: str
+    filename: Optional[str]
+    content_type: Optional[str]
+
+
+# FormPart when a part starts, bytes for its data, None when it ends
+FormEvent = Union[FormPart, bytes, None]
+
+
+async def stream_form(request: Request) -> AsyncIterator[FormEvent]:
+    """Parse a multipart/form-data body while it is received, nothing is spooled to disk.
+
+    Unlike `Request.form()` the caller sees the parts in wire order and the file data
+    chunk by chunk, as soon as it arrives.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise AppError(message="expected a multipart/form-data body")
+
+    events: list[FormEvent] = []
+    headers: dict[bytes, bytes] = {}
+    header_field = bytearray()
+    header_value = bytearray()
+
+    def on_part_begin():
+        headers.clear()
+
+    def on_header_field(data: bytes, start: int, end: int):
+        header_field.extend(data[start:end])
+
+    def on_header_value(data: bytes, start: int, end: int):
+        header_value.extend(data[start:end])
+
+    def on_header_end():
+        headers[bytes(header_field).lower()] = bytes(header_value)
+        header_field.clear()
+        header_value.clear()
+
+    def on_headers_finished():
+        _, options = parse_options_header(headers.get(b"content-disposition", b""))
+        if b"name" not in options:
+            raise AppError(message="form part without a name")
+        filename = options.get(b"filename")
+        part_type = headers.get(b"content-type")
+        events.append(
+            FormPart(
+                name=options[b"name"].decode(),
+                filename=filename.decode() if filename is not None else None,
+                content_type=part_type.decode().strip() if part_type else None,
+            )
+        )
+
+    def on_part_data(data: bytes, start: int, end: int):
+        events.append(data[start:end])
+
+    def on_part_end():
+        events.append(None)
+
+    parser = MultipartParser(
+        boundary,
+        {
+            "on_part_begin": on_part_begin,
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+        },
+    )
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for event in events:
+                yield event
+            events.clear()
+        parser.finalize()
+    except MultipartParseError:
+        raise AppError(message="malformed multipart body")
+    for event in events:
+        yield event
@@ -1,8 +1,22 @@
+import base64
+from datetime import datetime
+import json
+import math
+from typing import Any, Callable, List, Literal, Optional, Sequence
+import uuid
 
+from sqlalchemy import DateTime, func, select, text, tuple_
+from sqlalchemy.sql.elements import ColumnElement
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import SelectOfScalar
 
-from typing import List
+from app.core.config import get_config
+from app.types.errors import AppError
+from app.utils.cache_utils import TTLCache
 
-from sqlmodel import Session
+CountMode = Literal["exact", "estimate", "cached", "none"]
+
+_count_cache: Optional[TTLCache] = None
 
 
 class PaginationOption:
@@ -13,13 +27,167 @@ class PaginationOption:
         search: str = "",
         sorting: str = "desc",
         sorting_col: str = "created_at",
+        cursor: Optional[str] = None,
+        count_mode: CountMode = "exact",
     ):
         self.page = page
         self.limit = limit
         self.search = search
         self.sorting = sorting
         self.sorting_col = sorting_col
+        self.cursor = cursor
+        self.count_mode = count_mode
 
     def get_offset(self) -> int:
+        # in cursor (keyset) mode the cursor already points past the previous page
+        if self.cursor:
+            return 0
         return (self.page - 1) * self.limit
-    
+
+
+def encode_cursor(sort_col: str, sorting: str, sort_value: Any, id: Any) -> str:
+    """Opaque cursor for the row after which the next page starts"""
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_col, sorting, sort_value, str(id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_col: str, sorting: str) -> tuple[Any, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_col, cursor_sorting, sort_value, id = json.loads(raw)
+        id = uuid.UUID(id)
+    except Exception:
+        raise AppError(message="invalid cursor")
+    if cursor_col != sort_col or cursor_sorting != sorting:
+        raise AppError(message="cursor does not match the requested sorting")
+    return sort_value, id
+
+
+def keyset_paginate(
+    sq: SelectOfScalar,
+    pagination_options: PaginationOption,
+    sort_col: str,
+    sort_expr: ColumnElement,
+    id_col: ColumnElement,
+) -> SelectOfScalar:
+    """Order by (sort_expr, id_col) and, when a cursor is given, seek right after it.
+
+    The id tie breaker makes the order total, so offset pages and cursor pages line up.
+    Fetches one extra row which `split_page` uses to tell whether a next page exists.
+    """
+    sort_asc = pagination_options.sorting == "asc"
+    if pagination_options.cursor:
+        sort_value, last_id = decode_cursor(
+            pagination_options.cursor, sort_col, pagination_options.sorting
+        )
+        if isinstance(sort_expr.type, DateTime) and sort_value is not None:
+            sort_value = datetime.fromisoformat(sort_value)
+        key = tuple_(sort_expr, id_col)
+        sq = sq.where(
+            key > tuple_(sort_value, last_id)
+            if sort_asc
+            else key < tuple_(sort_value, last_id)
+        )
+    if sort_asc:
+        sq = sq.order_by(sort_expr.asc(), id_col.asc())
+    else:
+        sq = sq.order_by(sort_expr.desc(), id_col.desc())
+    return sq.limit(pagination_options.limit + 1).offset(pagination_options.get_offset())
+
+
+def split_page(
+    rows: Sequence,
+    pagination_options: PaginationOption,
+    sort_col: str,
+    sort_value: Callable[[Any], Any],
+) -> tuple[List, Optional[str]]:
+    """Trim the look-ahead row from a `keyset_paginate` result and build the next cursor"""
+    rows = list(rows)
+    if len(rows) <= pagination_options.limit:
+        return rows, None
+    rows = rows[: pagination_options.limit]
+    last = rows[-1]
+    return rows, encode_cursor(
+        sort_col, pagination_options.sorting, sort_value(last), last.id
+    )
+
+
+def _get_count_cache() -> TTLCache:
+    global _count_cache
+    if _count_cache is None:
+        _count_cache = TTLCache(max_size=1024, ttl_sec=get_config().pagination_count_cache_ttl_sec)
+    return _count_cache
+
+
+async def _estimate_count(session: AsyncSession, sq: SelectOfScalar, params: dict) -> int:
+    """Row estimate of the planner for `sq`, pg_class.reltuples when there is no filter"""
+    if sq.whereclause is None:
+        table = sq.get_final_froms()[0].name
+        reltuples = (
+            await session.exec(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)"),
+                params={"table": table},
+            )
+        ).scalar()
+        if reltuples is not None and reltuples >= 0:  # -1 until the table is analyzed
+            return reltuples
+        return (await session.exec(select(func.count()).select_from(sq.subquery()))).scalar_one()
+
+    conn = await session.connection()
+    compiled = sq.params(**params).compile(
+        dialect=conn.dialect, compile_kwargs={"render_postcompile": True}
+    )
+    plan = (
+        await conn.exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {compiled}",
+            tuple(compiled.params[name] for name in compiled.positiontup),
+        )
+    ).scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def count_total(
+    session: AsyncSession,
+    sq: SelectOfScalar,
+    params: dict,
+    pagination_options: PaginationOption,
+) -> tuple[Optional[int], Optional[int], CountMode]:
+    """Total rows matched by `sq` (a filtered select of the id column) per the count mode.
+
+    Returns (total, total_page, count mode actually used)
+    - exact: select count(*)
+    - estimate: planner estimate, no scan
+    - cached: exact count memoized for a short ttl, keyed by the statement and its params
+    - none: skipped, total and total_page are None
+    """
+    mode = pagination_options.count_mode
+    if mode == "none":
+        return None, None, mode
+
+    if mode == "estimate":
+        total = await _estimate_count(session, sq, params)
+    else:
+        cache_key = None
+        total = None
+        if mode == "cached":
+            compiled = sq.compile()  # carries the values of literal binds such as IN lists
+            cache_key = (
+                str(compiled),
+                json.dumps({**compiled.params, **params}, sort_keys=True, default=str),
+            )
+            total = _get_count_cache().get(cache_key)
+        if total is None:
+            total = (
+                await session.exec(
+                    select(func.count()).select_from(sq.subquery()), params=params
+                )
+            ).scalar_one()
+            if cache_key is not None:
+                _get_count_cache().set(cache_key, total)
+
+    total_page = math.ceil(total / pagination_options.limit) if pagination_options.limit else 0
+    return total, total_page, mode
@@ -1,19 +1,29 @@
+import asyncio
 from contextlib import asynccontextmanager
 import uvicorn
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from app.core import config, logger
-from app.core.aws.s3 import setup_s3
-from app.core.database import close_db, setup_db
+from app.core.aws.s3 import presigned_url_cache_stats, setup_s3
+from app.core.background import run_periodic
+from app.core.database import close_db, pool_stats, setup_db, warmup_db
 from app.core.exception_handler import setup_exception_handler
+from app.core.mailer import close_mailer, get_mailer, setup_mailer
+from app.core.metrics import registry as metrics_registry
+from app.core.response import pretty_json_query
 from app.enums.env_enum import Env
 from app.middleware import setup_middleware
 import app.routers as router
+from app.services.category_service import warm_catalog
+from app.services.user_service import user_cache_stats
+from app.services.inventory_shard_service import roll_up_shards
+from app.services.outbox_service import new_relay_wake, relay_due
+from app.services.ticket_hold_service import sweep_expired_holds
 
 
 # setup config
 config.setup_config()
 conf = config.get_config()
-logger.setup_logger()
+logger.setup_logger(sample_rates=conf.log_sample_rates, queue_size=conf.log_queue_size)
 log = logger.get_logger()
 
 
@@ -22,15 +32,65 @@ async def lifespan(app: FastAPI):
     log.info(f"Application started at port {conf.port}")
 
     # initialize DB
-    setup_db(db_url=conf.db_url, echo_query=conf.echo_query)
-    log.info("Database setup completed")
+    setup_db(
+        db_url=conf.db_url,
+        echo_query=conf.echo_query,
+        pool_size=conf.db_pool_size,
+        max_overflow=conf.db_max_overflow,
+        pool_recycle_sec=conf.db_pool_recycle_sec,
+        pool_pre_ping=conf.db_pool_pre_ping,
+        pool_timeout_sec=conf.db_pool_timeout_sec,
+        pgbouncer_mode=conf.db_pgbouncer_mode,
+        query_stats=conf.db_query_stats,
+        n_plus_one_threshold=conf.db_n_plus_one_threshold,
+        n_plus_one_raise=conf.db_n_plus_one_raise,
+    )
+    warmed = await warmup_db(conf.db_pool_warmup)
+    log.info("Database setup completed", extra={"pool": pool_stats(), "warmed": warmed})
+    await warm_catalog()
 
     setup_s3(conf=conf)
+    setup_mailer(conf)
+
+    # published on /metrics next to the request metrics
+    metrics_registry.register_stats("db_pool", pool_stats)
+    metrics_registry.register_stats("user_cache", user_cache_stats)
+    metrics_registry.register_stats("presign_cache", presigned_url_cache_stats)
+    metrics_registry.register_stats("mailer", lambda: get_mailer() and get_mailer().stats())
+    metrics_registry.register_stats("log", lambda: {"dropped_records": logger.dropped_records()})
+
+    background = [
+        asyncio.create_task(
+            run_periodic(
+                "Ticket hold sweep",
+                lambda: sweep_expired_holds(conf.ticket_hold_sweep_batch),
+                conf.ticket_hold_sweep_interval_sec,
+            )
+        ),
+        asyncio.create_task(
+            run_periodic(
+                "Inventory shard roll-up", roll_up_shards, conf.inventory_shard_rollup_interval_sec
+            )
+        ),
+        asyncio.create_task(
+            run_periodic(
+                "Outbox relay",
+                lambda: relay_due(conf.outbox_batch),
+                conf.outbox_relay_interval_sec,
+                wake=new_relay_wake(),
+            )
+        ),
+    ]
 
     yield
 
     log.info("Shutting down FastAPI application...")
-    close_db()
+    for task in background:
+        task.cancel()
+    # a cancelled task may still be inside a query, let it unwind before the pool goes
+    await asyncio.gather(*background, return_exceptions=True)
+    await close_mailer()
+    await close_db()
     log.info("Closing database connection")
 
 
@@ -38,6 +98,7 @@ app = FastAPI(
     title=conf.app_name,
     debug=conf.debug,
     lifespan=lifespan,
+    dependencies=[Depends(pretty_json_query)],
     swagger_ui_parameters={"persistAuthorization": True},
 )
 setup_exception_handler(app)
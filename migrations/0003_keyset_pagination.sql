@@ -0,0 +1,18 @@
+-- Indexes backing keyset (cursor) pagination, each list orders by (sort column, id)
+-- so every page is a range scan from the cursor instead of skipping OFFSET rows.
+
+CREATE INDEX idx_event_created_at_id ON event (created_at, id);
+CREATE INDEX idx_event_name_id ON event (name, id);
+
+CREATE INDEX idx_app_user_created_at_id ON app_user (created_at, id);
+CREATE INDEX idx_app_user_email_id ON app_user (email, id);
+CREATE INDEX idx_app_user_full_name_id ON app_user ((COALESCE(full_name, '')), id);
+
+CREATE INDEX idx_file_created_at_id ON file (created_at, id);
+
+-- Query shape
+
+-- SELECT ... FROM event
+-- WHERE (created_at, id) < ($1, $2)
+-- ORDER BY created_at DESC, id DESC
+-- LIMIT 21;
@@ -0,0 +1,16 @@
+-- Full text search for events, replaces the leading wildcard ILIKE (always a seq scan)
+-- Generated column so it is maintained by postgres on every insert/update
+
+ALTER TABLE event ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(venue, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(description, '')), 'C')
+) STORED;
+
+CREATE INDEX idx_event_search_vector ON event USING GIN (search_vector);
+
+-- Index optimized for following query
+
+-- SELECT ... FROM event
+-- WHERE search_vector @@ websearch_to_tsquery('english', $1)
+-- ORDER BY ts_rank(search_vector, websearch_to_tsquery('english', $1)) DESC, id DESC;
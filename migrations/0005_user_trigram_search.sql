@@ -0,0 +1,15 @@
+-- Trigram indexes for the admin user directory search
+-- pg_trgm GIN indexes serve ILIKE '%term%' (no seq scan) and fuzzy word similarity (<%)
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX idx_app_user_full_name_trgm ON app_user USING GIN (full_name gin_trgm_ops);
+CREATE INDEX idx_app_user_email_trgm ON app_user USING GIN (email gin_trgm_ops);
+CREATE INDEX idx_app_user_phone_number_trgm ON app_user USING GIN (phone_number gin_trgm_ops);
+
+-- Index optimized for following query
+
+-- SELECT ... FROM app_user
+-- WHERE full_name ILIKE $1 OR email ILIKE $1 OR phone_number ILIKE $1
+--    OR $2 <% full_name
+-- ORDER BY greatest(word_similarity($2, full_name), similarity($2, email), ...) DESC;
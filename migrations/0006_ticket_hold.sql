@@ -0,0 +1,27 @@
+-- Time limited ticket holds (seats kept while the buyer pays)
+-- event_ticket.total_held is the sum of active holds, so availability is
+-- total_qty - total_booked - total_held without scanning ticket_hold
+
+ALTER TABLE event_ticket ADD COLUMN total_held INTEGER NOT NULL DEFAULT 0;
+
+CREATE TABLE ticket_hold (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    user_id UUID REFERENCES app_user(id) ON DELETE CASCADE,
+    event_id UUID REFERENCES event(id) ON DELETE CASCADE,
+    expires_at TIMESTAMP NOT NULL,
+    created_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE TABLE ticket_hold_item (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    hold_id UUID NOT NULL REFERENCES ticket_hold(id) ON DELETE CASCADE,
+    event_ticket_id UUID NOT NULL REFERENCES event_ticket(id) ON DELETE CASCADE,
+    qty INTEGER NOT NULL CHECK (qty > 0),
+    created_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+-- sweeper: oldest expired holds first
+CREATE INDEX idx_ticket_hold_expires_at ON ticket_hold (expires_at);
+CREATE INDEX idx_ticket_hold_item_hold_id ON ticket_hold_item (hold_id);
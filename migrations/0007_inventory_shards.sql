@@ -0,0 +1,21 @@
+-- Sharded inventory counters for hot ticket types
+-- With event.inventory_shards = K > 0 the unsold capacity of each ticket type is split over
+-- K event_ticket_shard rows, buyers claim from a random shard instead of all queueing on
+-- the single event_ticket row. event_ticket.shard_qty is the capacity handed to the shards,
+-- so the event_ticket row itself only has total_qty - shard_qty - total_booked - total_held left.
+-- Booked shard units are rolled up into event_ticket.total_booked periodically.
+
+ALTER TABLE event ADD COLUMN inventory_shards INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE event_ticket ADD COLUMN shard_qty INTEGER NOT NULL DEFAULT 0;
+
+CREATE TABLE event_ticket_shard (
+    event_ticket_id UUID NOT NULL REFERENCES event_ticket(id) ON DELETE CASCADE,
+    shard INTEGER NOT NULL,
+    total_qty INTEGER NOT NULL DEFAULT 0,
+    total_booked INTEGER NOT NULL DEFAULT 0,
+    total_held INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (event_ticket_id, shard)
+);
+
+-- shard the held units were taken from, NULL when held on the event_ticket row
+ALTER TABLE ticket_hold_item ADD COLUMN shard INTEGER;
@@ -0,0 +1,5 @@
+-- Version lookups for conditional GETs (ETag / If-None-Match)
+-- count(*) and max(updated_at) of an event's tickets come straight from this index,
+-- it also serves the selectinload of Event.tickets and GET /ticket/event/{id}
+
+CREATE INDEX idx_event_ticket_event_id_updated_at ON event_ticket (event_id, updated_at);
@@ -0,0 +1,22 @@
+-- Transactional outbox: side effects (emails, ...) are written in the same
+-- transaction as the business change and delivered afterwards by the relay
+-- (outbox_service.relay_due), at least once, with retries and backoff.
+
+CREATE TABLE outbox (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    kind TEXT NOT NULL,
+    payload JSONB NOT NULL,
+    -- same business event written twice is one message
+    idempotency_key TEXT UNIQUE,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    -- next delivery attempt, pushed forward while a relay works on the row (lease)
+    -- and by the backoff after a failure
+    available_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    sent_at TIMESTAMP,
+    last_error TEXT,
+    created_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+-- relay: pending rows that are due, oldest first
+CREATE INDEX idx_outbox_pending ON outbox (available_at) WHERE sent_at IS NULL;
@@ -0,0 +1,6 @@
+-- One file row per object key: finalizing the same direct upload twice (a client retry,
+-- two requests racing) must not record the object twice.
+-- Existing duplicates have to be merged first, they are listed by
+--   SELECT file_path, count(*) FROM file GROUP BY file_path HAVING count(*) > 1;
+
+CREATE UNIQUE INDEX uq_file_file_path ON file (file_path);
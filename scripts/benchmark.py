@@ -0,0 +1,445 @@
+"""End to end load benchmark of the API against the configured Postgres.
+
+Seeds a throw-away data set (users, events with tickets, files), runs each scenario
+with a fixed number of requests at a fixed concurrency and writes throughput and
+p50/p95/p99 latency per scenario to a JSON file, so two commits can be compared:
+
+    python -m scripts.benchmark --out bench/base.json
+    python -m scripts.benchmark --out bench/head.json --compare bench/base.json
+    python -m scripts.benchmark --scenarios event_detail,auth_me --requests 2000
+    python -m scripts.benchmark --url http://127.0.0.1:8000   # a running uvicorn
+
+Without --url the app is served in process (lifespan included) over httpx's ASGI
+transport, latencies then include the client, but no network. With --url the server
+must use the same DB_URL and ACCESS_TOKEN_SECRET as this script, which seeds the data
+and mints the access tokens, and should run with DEBUG=false. Seeded rows are deleted afterwards unless --keep is given.
+
+Uses DB_URL (and the rest of the app config) from the environment.
+"""
+import argparse
+import asyncio
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from typing import Awaitable, Callable, Optional
+import uuid
+
+import httpx
+from sqlmodel import delete, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core import config, database
+from app.enums.event_status import EventStatus
+from app.enums.role_enum import UserRole
+from app.models.app_user_model import AppUser
+from app.models.event_model import Event
+from app.models.event_ticket_model import EventTicket
+from app.models.file_model import File
+from app.utils.auth_utils import create_access_token
+from app.utils.password_utils import hash_password
+
+PASSWORD = "Bench@1234"
+# event names are built from these, the search scenario looks for them
+_WORDS = (
+    "jazz", "rock", "summit", "festival", "marathon", "comedy", "theatre", "cinema",
+    "workshop", "conference", "expo", "concert", "gala", "tasting", "meetup", "hackathon",
+)
+
+
+@dataclass
+class Dataset:
+    tag: str
+    user_ids: list[uuid.UUID] = field(default_factory=list)
+    tokens: list[str] = field(default_factory=list)
+    login_email: str = ""
+    event_ids: list[uuid.UUID] = field(default_factory=list)
+    rush_event_id: Optional[uuid.UUID] = None
+    rush_ticket_id: Optional[uuid.UUID] = None
+    rush_qty: int = 0
+
+
+async def seed(args, rng: random.Random) -> Dataset:
+    conf = config.get_config()
+    data = Dataset(tag=uuid.uuid4().hex[:8])
+    # one bcrypt hash for every user, hashing is what the login scenario measures
+    password = await asyncio.to_thread(hash_password, PASSWORD)
+    now = datetime.now(timezone.utc)
+    async with AsyncSession(database.async_engine, expire_on_commit=False) as session:
+        users = [
+            AppUser(
+                email=f"bench-{data.tag}-{i}@example.com",
+                full_name=f"Bench User {i}",
+                password=password,
+                roles=UserRole.USER.value,
+                email_verified_at=now,
+            )
+            for i in range(args.users)
+        ]
+        session.add_all(users)
+
+        events, tickets = [], []
+        for i in range(args.events):
+            name = " ".join(rng.sample(_WORDS, 2)).title()
+            event = Event(
+                name=f"{name} {i}",
+                slug=f"bench-{data.tag}-{i}",
+                date=now + timedelta(days=rng.randint(1, 365)),
+                venue=f"Hall {rng.randint(1, 20)}",
+                description=f"Benchmark event {name.lower()} number {i}",
+                status=EventStatus.ACTIVE,
+            )
+            events.append(event)
+            tickets.extend(
+                EventTicket(event_id=event.id, name=kind, price=price, total_qty=1000)
+                for kind, price in (("regular", 10), ("vip", 50))
+            )
+        rush = Event(
+            name="Bench Rush",
+            slug=f"bench-{data.tag}-rush",
+            date=now + timedelta(days=30),
+            status=EventStatus.ACTIVE,
+        )
+        rush_ticket = EventTicket(event_id=rush.id, name="rush", price=10, total_qty=args.rush_qty)
+        session.add_all(events + [rush])
+        await session.flush()
+        session.add_all(tickets + [rush_ticket])
+
+        session.add_all(
+            File(
+                file_path=f"bench/{data.tag}/{i}.png",
+                type="image/png",
+                size=rng.randint(1_000, 5_000_000),
+            )
+            for i in range(args.files)
+        )
+        await session.commit()
+
+    data.user_ids = [u.id for u in users]
+    data.tokens = [
+        create_access_token(
+            user_id=u.id,
+            expires_in_minutes=120,
+            secret_key=conf.access_token_secret,
+            roles=[UserRole.USER.value],
+            email_verified=True,
+        )
+        for u in users
+    ]
+    data.login_email = users[0].email
+    data.event_ids = [e.id for e in events]
+    data.rush_event_id, data.rush_ticket_id, data.rush_qty = rush.id, rush_ticket.id, args.rush_qty
+    return data
+
+
+async def drop(data: Dataset) -> None:
+    # bookings, booking tickets and holds go with their event / user (ON DELETE CASCADE)
+    event_ids = data.event_ids + [data.rush_event_id]
+    async with AsyncSession(database.async_engine) as session:
+        await session.exec(delete(EventTicket).where(EventTicket.event_id.in_(event_ids)))
+        await session.exec(delete(Event).where(Event.id.in_(event_ids)))
+        await session.exec(delete(AppUser).where(AppUser.id.in_(data.user_ids)))
+        await session.exec(delete(File).where(File.file_path.like(f"bench/{data.tag}/%")))
+        await session.commit()
+
+
+# A scenario returns the request to send for the i-th call: (method, url, kwargs)
+Request = tuple[str, str, dict]
+
+
+def _auth(data: Dataset, i: int) -> dict:
+    return {"Authorization": f"Bearer {data.tokens[i % len(data.tokens)]}"}
+
+
+def _event_list(data: Dataset, rng: random.Random, i: int) -> Request:
+    return "GET", "/event/", {"params": {"limit": 20, "page": rng.randint(1, 5)}}
+
+
+def _event_search(data: Dataset, rng: random.Random, i: int) -> Request:
+    return "GET", "/event/", {"params": {"search": rng.choice(_WORDS), "limit": 20}}
+
+
+def _event_detail(data: Dataset, rng: random.Random, i: int) -> Request:
+    return "GET", f"/event/{rng.choice(data.event_ids)}", {}
+
+
+def _login(data: Dataset, rng: random.Random, i: int) -> Request:
+    return "POST", "/auth/login", {"json": {"email": data.login_email, "password": PASSWORD}}
+
+
+def _auth_me(data: Dataset, rng: random.Random, i: int) -> Request:
+    return "GET", "/auth/me", {"headers": _auth(data, i)}
+
+
+def _file_list(data: Dataset, rng: random.Random, i: int) -> Request:
+    return "GET", "/file/", {"params": {"limit": 20}, "headers": _auth(data, i)}
+
+
+def _booking_rush(data: Dataset, rng: random.Random, i: int) -> Request:
+    body = {
+        "eventId": str(data.rush_event_id),
+        "tickets": [{"ticketId": str(data.rush_ticket_id), "qty": 1}],
+    }
+    return "POST", "/booking/", {"json": body, "headers": _auth(data, i)}
+
+
+# name -> (request builder, statuses that count as handled, warm up)
+SCENARIOS: dict[str, tuple[Callable[[Dataset, random.Random, int], Request], set, bool]] = {
+    "event_list": (_event_list, {200}, True),
+    "event_search": (_event_search, {200}, True),
+    "event_detail": (_event_detail, {200}, True),
+    "login": (_login, {200}, True),
+    "auth_me": (_auth_me, {200}, True),
+    "file_list": (_file_list, {200}, True),
+    # many buyers, few tickets: 400 is the sold out answer, warming up would buy tickets
+    "booking_rush": (_booking_rush, {200, 201, 400}, False),
+}
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    """Nearest rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(p / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+async def run_scenario(
+    send: Callable[[Request], Awaitable[int]],
+    build: Callable[[int], Request],
+    expected: set,
+    requests: int,
+    concurrency: int,
+) -> dict:
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index, errors
+        while next_index < requests:
+            i = next_index
+            next_index += 1
+            request = build(i)
+            started = time.perf_counter()
+            try:
+                status = await send(request)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            if status not in expected:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "statuses": statuses,
+        "duration_sec": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "max": round(latencies[-1], 2) if latencies else 0.0,
+        },
+    }
+
+
+async def check_rush(data: Dataset, result: dict) -> None:
+    """The rush must sell out exactly: never more than total_qty, one unit per 2xx"""
+    async with AsyncSession(database.async_engine) as session:
+        ticket = (
+            await session.exec(select(EventTicket).where(EventTicket.id == data.rush_ticket_id))
+        ).one()
+    granted = sum(n for status, n in result["statuses"].items() if status in ("200", "201"))
+    result["sold"] = ticket.total_booked
+    result["oversold"] = ticket.total_booked > ticket.total_qty or ticket.total_booked != granted
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        return f"{commit}-dirty" if dirty else commit
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+    names = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"unknown scenario(s): {', '.join(unknown)}")
+
+    async with AsyncExitStack() as stack:
+        if args.url:
+            transport, base_url = None, args.url
+        else:
+            import main
+
+            # runs the app's startup (db pool, s3, mailer, background tasks) and shutdown
+            await stack.enter_async_context(main.app.router.lifespan_context(main.app))
+            # answer errors with the response a server would send instead of raising them
+            transport = httpx.ASGITransport(app=main.app, raise_app_exceptions=False)
+            base_url = "http://bench"
+        client = await stack.enter_async_context(
+            httpx.AsyncClient(
+                transport=transport,
+                base_url=base_url,
+                timeout=args.timeout,
+                limits=httpx.Limits(max_connections=args.concurrency),
+            )
+        )
+
+        data = await seed(args, rng)
+        results = {}
+        try:
+            async def send(request: Request) -> int:
+                method, url, kwargs = request
+                return (await client.request(method, url, **kwargs)).status_code
+
+            for name in names:
+                builder, expected, warm_up = SCENARIOS[name]
+                if warm_up and args.warmup:
+                    warmup = min(args.warmup, args.login_requests) if name == "login" else args.warmup
+                    await run_scenario(
+                        send, lambda i: builder(data, rng, i), expected, warmup, args.concurrency
+                    )
+                requests = args.login_requests if name == "login" else args.requests
+                result = await run_scenario(
+                    send, lambda i: builder(data, rng, i), expected, requests, args.concurrency
+                )
+                if name == "booking_rush":
+                    await check_rush(data, result)
+                results[name] = result
+                _print_result(name, result)
+        finally:
+            if not args.keep:
+                await drop(data)
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "target": args.url or "in-process",
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "requests": args.requests,
+            "login_requests": args.login_requests,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "dataset": {
+                "users": args.users,
+                "events": args.events,
+                "files": args.files,
+                "rush_qty": args.rush_qty,
+            },
+        },
+        "scenarios": results,
+    }
+
+
+def _print_result(name: str, result: dict) -> None:
+    lat = result["latency_ms"]
+    extra = f" oversold={result['oversold']}" if "oversold" in result else ""
+    print(
+        f"{name:<14} {result['throughput_rps']:>8.1f} req/s  p50={lat['p50']:.1f}ms "
+        f"p95={lat['p95']:.1f}ms p99={lat['p99']:.1f}ms errors={result['errors']}{extra}"
+    )
+
+
+def compare(baseline: dict, current: dict) -> None:
+    """Print throughput and latency changes against an earlier results file"""
+    print(f"\nvs {baseline['meta'].get('commit')}")
+    for name, result in current["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if base is None:
+            continue
+
+        def change(new, old):
+            return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+        line = [f"{name:<14} rps {change(result['throughput_rps'], base['throughput_rps']):>7}"]
+        for p in ("p50", "p95", "p99"):
+            line.append(f"{p} {change(result['latency_ms'][p], base['latency_ms'][p]):>7}")
+        print("  ".join(line))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", default="", help=f"comma separated, of {', '.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=500, help="measured requests per scenario")
+    parser.add_argument(
+        "--login-requests", type=int, default=50, help="login is bcrypt bound, runs fewer"
+    )
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=50, help="unmeasured requests per scenario")
+    parser.add_argument("--url", default="", help="base url of a running server, default in process")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=42, help="data set and request mix")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--files", type=int, default=500)
+    parser.add_argument("--rush-qty", type=int, default=100, help="tickets on sale in the booking rush")
+    parser.add_argument("--out", default="bench-results.json")
+    parser.add_argument("--compare", default="", help="earlier results file to diff against")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded rows")
+    args = parser.parse_args()
+
+    # debug renders unhandled errors as traceback pages, measure what production serves
+    os.environ.setdefault("DEBUG", "false")
+    config.setup_config()
+    conf = config.get_config()
+    if args.url:
+        # in process the app's lifespan sets up the pool
+        database.setup_db(
+            db_url=conf.db_url,
+            pool_size=min(args.concurrency, 10),
+            max_overflow=0,
+            pgbouncer_mode=conf.db_pgbouncer_mode,
+        )
+
+    async def _main():
+        try:
+            return await run(args)
+        finally:
+            await database.close_db()
+
+    results = asyncio.run(_main())
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+    failed = any(r["errors"] for r in results["scenarios"].values())
+    oversold = results["scenarios"].get("booking_rush", {}).get("oversold", False)
+    sys.exit(1 if failed or oversold else 0)
+
+
+if __name__ == "__main__":
+    main()
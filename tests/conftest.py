@@ -0,0 +1,97 @@
+from datetime import datetime, timezone
+import os
+import uuid
+
+import pytest
+from sqlalchemy import text
+from sqlmodel import delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core import config, database
+from app.core.config import AppConfig
+from app.enums.env_enum import Env
+from app.models.event_model import Event
+from app.models.event_ticket_model import EventTicket
+from app.services import inventory_shard_service
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def app_config(monkeypatch):
+    """Factory installing an AppConfig (see config.get_config) for the test, built from
+    the given overrides and placeholders for the required settings, without .env"""
+
+    def configure(**overrides) -> AppConfig:
+        values = {
+            "env": Env.DEV,
+            "app_name": "test",
+            "db_url": None,
+            "access_token_secret": "test-secret",
+            "aws_region": "us-east-1",
+            "aws_access_key_id": "test",
+            "aws_secret_access_key": "test",
+            "aws_s3_bucket_name": "test-bucket",
+            "smtp_sender_email": "noreply@example.com",
+            "smtp_app_password": "test",
+        }
+        values.update(overrides)
+        conf = AppConfig(_env_file=None, **values)
+        monkeypatch.setattr(config, "_settings", conf)
+        return conf
+
+    return configure
+
+
+@pytest.fixture
+async def db(anyio_backend):
+    """The app engine (database.async_engine) on DB_URL, a migrated Postgres. Tests
+    using it are skipped when there is none."""
+    db_url = os.environ.get("DB_URL", "")
+    if not db_url.startswith("postgres"):
+        pytest.skip("DB_URL does not point at Postgres")
+    database.setup_db(db_url=db_url, pool_size=20, max_overflow=0)
+    try:
+        async with database.async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1 FROM event_ticket_shard LIMIT 1"))
+    except Exception as e:
+        await database.close_db()
+        pytest.skip(f"Postgres unavailable: {e}")
+    yield database.async_engine
+    await database.close_db()
+
+
+@pytest.fixture
+async def new_event(db):
+    """Factory for throw-away events with one ticket type per entry of `qtys`, dropped
+    again after the test."""
+    created = []
+
+    async def create(*qtys: int, shards: int = 0) -> tuple[uuid.UUID, list[uuid.UUID]]:
+        async with AsyncSession(db, expire_on_commit=False) as session:
+            event = Event(
+                name="test event",
+                slug=f"test-event-{uuid.uuid4().hex}",
+                date=datetime.now(timezone.utc),
+            )
+            tickets = [
+                EventTicket(event_id=event.id, name=f"type-{i}", price=10, total_qty=qty)
+                for i, qty in enumerate(qtys)
+            ]
+            session.add(event)
+            session.add_all(tickets)
+            await session.commit()
+            created.append(event.id)
+            if shards:
+                await inventory_shard_service.set_inventory_shards(str(event.id), shards, session)
+            return event.id, [t.id for t in tickets]
+
+    yield create
+    async with AsyncSession(db) as session:
+        for event_id in created:
+            await session.exec(delete(EventTicket).where(EventTicket.event_id == event_id))
+            await session.exec(delete(Event).where(Event.id == event_id))
+        await session.commit()
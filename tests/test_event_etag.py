@@ -0,0 +1,38 @@
+import uuid
+
+from fastapi import FastAPI
+import httpx
+import pytest
+
+from app.dependencies.auth_dep import get_current_claims
+from app.routers.event_router import router
+from app.types.auth_claims import AuthClaims
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def client(db):
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_current_claims] = lambda: AuthClaims(
+        user_id=uuid.uuid4(), roles=["admin"]
+    )
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+async def test_delete_changes_event_etag(client, new_event):
+    event_id, _ = await new_event(10)
+    r = await client.get(f"/event/{event_id}")
+    etag = r.headers["etag"]
+    r = await client.get(f"/event/{event_id}", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+
+    assert (await client.delete(f"/event/{event_id}")).status_code == 200
+
+    r = await client.get(f"/event/{event_id}", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+    assert r.json()["data"]["status"] == "inactive"
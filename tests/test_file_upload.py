@@ -0,0 +1,197 @@
+import uuid
+
+from fastapi import Request
+from moto import mock_aws
+import pytest
+from sqlmodel import delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.aws import s3
+from app.core.aws.s3_multipart import MultipartWriter
+from app.dtos.file_dto import FileFinalizeDto, FileUploadUrlCreateDto
+from app.models.file_model import File
+from app.services import file_service
+from app.types.errors import AppError
+
+pytestmark = pytest.mark.anyio
+
+MiB = 1024 * 1024
+BOUNDARY = "test-boundary"
+
+
+@pytest.fixture
+def bucket(app_config, monkeypatch):
+    """In-memory S3 (moto) with an empty bucket, 5 MiB parts and a 12 MiB upload limit"""
+    for name in ("s3_client", "bucket", "presigned_url_cache"):
+        monkeypatch.setattr(s3, name, getattr(s3, name))
+    with mock_aws():
+        conf = app_config(
+            aws_s3_endpoint_url=None,
+            upload_part_size_bytes=5 * MiB,
+            upload_part_concurrency=2,
+            upload_max_size_bytes=12 * MiB,
+        )
+        s3.setup_s3(conf)
+        s3.s3_client.create_bucket(Bucket=conf.aws_s3_bucket_name)
+        yield conf.aws_s3_bucket_name
+
+
+def _objects(bucket: str) -> list[str]:
+    return [o["Key"] for o in s3.s3_client.list_objects_v2(Bucket=bucket).get("Contents", [])]
+
+
+def _pending_uploads(bucket: str) -> list:
+    return s3.s3_client.list_multipart_uploads(Bucket=bucket).get("Uploads", [])
+
+
+def _form(*parts: tuple[str, str | None, str | None, bytes]) -> bytes:
+    body = bytearray()
+    for name, filename, content_type, data in parts:
+        body += f"--{BOUNDARY}\r\n".encode()
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        body += f"Content-Disposition: {disposition}\r\n".encode()
+        if content_type is not None:
+            body += f"Content-Type: {content_type}\r\n".encode()
+        body += b"\r\n" + data + b"\r\n"
+    body += f"--{BOUNDARY}--\r\n".encode()
+    return bytes(body)
+
+
+def _request(body: bytes, chunk_size: int = 256 * 1024) -> Request:
+    """Request receiving `body` in chunks, without a Content-Length like a chunked upload"""
+    chunks = [body[i : i + chunk_size] for i in range(0, len(body), chunk_size)]
+
+    async def receive():
+        if not chunks:
+            return {"type": "http.disconnect"}
+        return {"type": "http.request", "body": chunks.pop(0), "more_body": len(chunks) > 0}
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/file/upload",
+        "headers": [
+            (b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())
+        ],
+    }
+    return Request(scope, receive)
+
+
+async def test_small_object_is_a_single_put(bucket):
+    writer = MultipartWriter("image/png", 5 * MiB, 2, key="photos/small.png")
+    await writer.write(b"x" * 1000)
+    await writer.complete()
+
+    head = s3.head_object("photos/small.png")
+    assert head["ContentLength"] == 1000
+    assert head["ContentType"] == "image/png"
+    # a multipart object's ETag carries the number of parts
+    assert "-" not in head["ETag"]
+    assert _pending_uploads(bucket) == []
+
+
+async def test_large_object_goes_up_in_parts(bucket):
+    data = bytes(range(256)) * (11 * MiB // 256)
+    # the key arrives after the first bytes, like a folder field sent after the file
+    writer = MultipartWriter("application/pdf", 5 * MiB, 2)
+    await writer.write(data[:MiB])
+    writer.key = "docs/large.pdf"
+    for i in range(MiB, len(data), MiB):
+        await writer.write(data[i : i + MiB])
+    await writer.complete()
+
+    head = s3.head_object("docs/large.pdf")
+    assert head["ContentLength"] == len(data)
+    assert head["ETag"].strip('"').endswith("-3")
+    body = s3.s3_client.get_object(Bucket=bucket, Key="docs/large.pdf")["Body"].read()
+    assert body == data
+    assert _pending_uploads(bucket) == []
+
+
+async def test_oversized_upload_is_aborted(bucket):
+    body = _form(
+        ("folder", None, None, b"docs"),
+        ("file", "big.pdf", "application/pdf", b"x" * 13 * MiB),
+    )
+    with pytest.raises(AppError, match="file larger than"):
+        await file_service.stream_upload(_request(body), session=None)
+    assert _pending_uploads(bucket) == []
+    assert _objects(bucket) == []
+
+
+async def test_disallowed_content_type_is_rejected(bucket):
+    body = _form(
+        ("folder", None, None, b"docs"),
+        ("file", "run.sh", "text/x-shellscript", b"echo"),
+    )
+    with pytest.raises(AppError, match="is not allowed"):
+        await file_service.stream_upload(_request(body), session=None)
+    assert _objects(bucket) == []
+
+
+async def test_missing_file_part_is_rejected(bucket):
+    body = _form(("folder", None, None, b"docs"))
+    with pytest.raises(AppError, match="file is required"):
+        await file_service.stream_upload(_request(body), session=None)
+    assert _objects(bucket) == []
+
+
+@pytest.fixture
+async def session(db):
+    async with AsyncSession(db, expire_on_commit=False) as session:
+        yield session
+
+
+async def test_streamed_upload_is_recorded(bucket, session):
+    data = b"%PDF" + b"x" * (6 * MiB)
+    body = _form(
+        ("file", "report.pdf", "application/pdf", data),
+        ("folder", None, None, b"docs"),
+    )
+    file = await file_service.stream_upload(_request(body), session)
+    try:
+        assert file.file_path.startswith("docs/") and file.file_path.endswith(".pdf")
+        assert file.size == len(data)
+        assert _objects(bucket) == [file.file_path]
+    finally:
+        await session.exec(delete(File).where(File.id == file.id))
+        await session.commit()
+
+
+def _upload_grant(user_id: uuid.UUID):
+    return file_service.create_upload_url(
+        FileUploadUrlCreateDto(folder="photos", filename="me.png", content_type="image/png"),
+        user_id,
+    )
+
+
+async def test_finalize_requires_the_uploaded_object(bucket):
+    user_id = uuid.uuid4()
+    grant = _upload_grant(user_id)
+    dto = FileFinalizeDto(upload_token=grant.upload_token)
+
+    with pytest.raises(AppError, match="another user"):
+        await file_service.finalize_upload(dto, uuid.uuid4(), session=None)
+    with pytest.raises(AppError, match="has not been uploaded"):
+        await file_service.finalize_upload(dto, user_id, session=None)
+    s3.put_object(grant.key, b"<svg/>", "image/svg+xml")
+    with pytest.raises(AppError, match="content type does not match"):
+        await file_service.finalize_upload(dto, user_id, session=None)
+
+
+async def test_finalize_twice_returns_the_same_row(bucket, session):
+    user_id = uuid.uuid4()
+    grant = _upload_grant(user_id)
+    dto = FileFinalizeDto(upload_token=grant.upload_token)
+    s3.put_object(grant.key, b"png", "image/png")
+    try:
+        first = await file_service.finalize_upload(dto, user_id, session)
+        assert (first.file_path, first.size, first.type) == (grant.key, 3, "image/png")
+        # the second insert hits uq_file_file_path and returns the existing row
+        again = await file_service.finalize_upload(dto, user_id, session)
+        assert again.id == first.id
+    finally:
+        await session.exec(delete(File).where(File.file_path == grant.key))
+        await session.commit()
@@ -0,0 +1,43 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.exception_handler import setup_exception_handler
+from app.core.metrics import registry
+from app.middleware.http_metrics import HTTPMetricsMiddleware
+from app.types.errors import AppError
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    setup_exception_handler(app)
+    app.add_middleware(HTTPMetricsMiddleware)
+
+    @app.get("/sold-out/{id}")
+    async def sold_out(id: int):
+        raise AppError("sold out")
+
+    @app.get("/broken")
+    async def broken():
+        raise RuntimeError("bug")
+
+    return app
+
+
+def test_app_error_is_recorded_as_400():
+    client = TestClient(_app())
+    before = registry.responses.get(("GET", "/sold-out/{id}", 400), 0)
+
+    response = client.get("/sold-out/1")
+
+    assert response.status_code == 400
+    assert response.json()["message"] == "sold out"
+    assert registry.responses.get(("GET", "/sold-out/{id}", 400), 0) == before + 1
+    assert ("GET", "/sold-out/{id}", 500) not in registry.responses
+
+
+def test_unhandled_error_is_recorded_as_500():
+    client = TestClient(_app(), raise_server_exceptions=False)
+    before = registry.responses.get(("GET", "/broken", 500), 0)
+
+    assert client.get("/broken").status_code == 500
+    assert registry.responses.get(("GET", "/broken", 500), 0) == before + 1
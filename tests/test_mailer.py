@@ -0,0 +1,163 @@
+import asyncio
+from email.message import EmailMessage
+import socket
+
+from aiosmtpd.controller import Controller
+import pytest
+
+from app.core.mailer import Mailer
+
+pytestmark = pytest.mark.anyio
+
+
+class _Inbox:
+    """aiosmtpd handler keeping the accepted mails and the client port of their session"""
+
+    def __init__(self):
+        self.mails: list[tuple[int, str]] = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("reject@"):
+            return "550 no such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.mails.append((session.peer[1], envelope.rcpt_tos[0]))
+        return "250 Message accepted for delivery"
+
+    @property
+    def sessions(self) -> int:
+        return len({port for port, _ in self.mails})
+
+
+@pytest.fixture
+def smtp_server():
+    """Factory for a local SMTP server, `timeout` is how long it keeps idle sessions"""
+    controllers = []
+
+    def start(timeout: float = 300) -> tuple[_Inbox, int]:
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        inbox = _Inbox()
+        controller = Controller(inbox, hostname="127.0.0.1", port=port, timeout=timeout)
+        controller.start()
+        controllers.append(controller)
+        return inbox, port
+
+    yield start
+    for controller in controllers:
+        controller.stop()
+
+
+@pytest.fixture
+def mailer_config(app_config):
+    def configure(port: int, **overrides):
+        values = {
+            "smtp_host": "127.0.0.1",
+            "smtp_port": port,
+            "smtp_use_ssl": False,
+            "smtp_login": False,
+            "smtp_timeout_sec": 5,
+            "smtp_pool_size": 1,
+        }
+        values.update(overrides)
+        return app_config(**values)
+
+    return configure
+
+
+def _mail(to: str) -> tuple[EmailMessage, str, list[str]]:
+    message = EmailMessage()
+    message["Subject"] = "test"
+    message.set_content("hello")
+    return message, "noreply@example.com", [to]
+
+
+async def test_queued_mails_go_out_as_one_batch(smtp_server, mailer_config):
+    inbox, port = smtp_server()
+    mailer = Mailer(mailer_config(port))
+    for i in range(5):
+        assert mailer.enqueue(*_mail(f"user{i}@example.com"))
+    mailer.start()
+    await mailer.stop()
+
+    assert [to for _, to in inbox.mails] == [f"user{i}@example.com" for i in range(5)]
+    assert inbox.sessions == 1
+    stats = mailer.stats()
+    assert (stats["sent"], stats["batches"], stats["connects"]) == (5, 1, 1)
+
+
+async def test_reconnects_when_the_server_dropped_the_connection(smtp_server, mailer_config):
+    # the server ends idle sessions after 0.2s, the pool only probes them after an hour
+    inbox, port = smtp_server(timeout=0.2)
+    mailer = Mailer(mailer_config(port, smtp_health_check_sec=3600))
+    mailer.start()
+    try:
+        await mailer.deliver(*_mail("first@example.com"))
+        await asyncio.sleep(0.5)
+        await mailer.deliver(*_mail("second@example.com"))
+    finally:
+        await mailer.stop()
+
+    assert [to for _, to in inbox.mails] == ["first@example.com", "second@example.com"]
+    assert inbox.sessions == 2
+    stats = mailer.stats()
+    assert (stats["sent"], stats["retried"], stats["connects"], stats["failed"]) == (2, 1, 2, 0)
+
+
+async def test_full_queue_drops_or_waits(smtp_server, mailer_config):
+    inbox, port = smtp_server()
+    mailer = Mailer(mailer_config(port, smtp_queue_size=2))
+    assert mailer.enqueue(*_mail("a@example.com"))
+    assert mailer.enqueue(*_mail("b@example.com"))
+    # enqueue drops the mail, deliver waits for room
+    assert not mailer.enqueue(*_mail("c@example.com"))
+    waiting = asyncio.create_task(mailer.deliver(*_mail("d@example.com")))
+    await asyncio.sleep(0.1)
+    assert not waiting.done()
+    assert mailer.stats()["queued"] == 2
+    assert mailer.stats()["dropped"] == 1
+
+    mailer.start()
+    await asyncio.wait_for(waiting, 5)
+    await mailer.stop()
+    delivered = sorted(to for _, to in inbox.mails)
+    assert delivered == ["a@example.com", "b@example.com", "d@example.com"]
+
+
+async def test_stats(smtp_server, mailer_config):
+    inbox, port = smtp_server()
+    mailer = Mailer(mailer_config(port, smtp_queue_size=10))
+    assert mailer.stats() == {
+        "queued": 0,
+        "queue_size": 10,
+        "sent": 0,
+        "failed": 0,
+        "dropped": 0,
+        "retried": 0,
+        "batches": 0,
+        "connects": 0,
+        "queue_wait_ms_avg": 0.0,
+        "queue_wait_ms_max": 0.0,
+        "send_ms_avg": 0.0,
+        "send_ms_max": 0.0,
+    }
+    for to in ("a@example.com", "reject@example.com", "b@example.com"):
+        mailer.enqueue(*_mail(to))
+    mailer.start()
+    await mailer.stop()
+
+    stats = mailer.stats()
+    assert len(inbox.mails) == 2
+    # the refused recipient fails that mail only, the session goes on
+    assert {k: stats[k] for k in ("queued", "sent", "failed", "batches", "connects")} == {
+        "queued": 0,
+        "sent": 2,
+        "failed": 1,
+        "batches": 1,
+        "connects": 1,
+    }
+    assert 0 < stats["queue_wait_ms_avg"] <= stats["queue_wait_ms_max"]
+    assert 0 < stats["send_ms_avg"] <= stats["send_ms_max"]
@@ -0,0 +1,87 @@
+import contextvars
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.core import query_stats
+from app.core.query_stats import (
+    NPlusOneError,
+    assert_max_queries,
+    capture_queries,
+    normalize_sql,
+    setup_query_stats,
+    start_query_stats,
+)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("create table item (id integer primary key, name text)"))
+        conn.execute(text("insert into item values (1, 'a'), (2, 'b'), (3, 'c')"))
+    yield engine
+    setup_query_stats(engine, enabled=False)
+    engine.dispose()
+
+
+def _select_items(engine, ids):
+    with engine.connect() as conn:
+        for i in ids:
+            conn.execute(text(f"select name from item where id = {i}"))
+
+
+def test_assert_max_queries_within_budget(engine):
+    with assert_max_queries(3, engine) as stats:
+        _select_items(engine, [1, 2, 3])
+    assert stats.queries == 3
+
+
+def test_assert_max_queries_over_budget(engine):
+    with pytest.raises(AssertionError, match="expected at most 2 queries, ran 3"):
+        with assert_max_queries(2, engine):
+            _select_items(engine, [1, 2, 3])
+
+
+def test_normalize_sql_groups_shapes():
+    assert normalize_sql("select name from item where id = 1") == normalize_sql(
+        "select  name from item\n where id = 42"
+    )
+    assert normalize_sql("select * from item where id in (?, ?, ?)") == normalize_sql(
+        "select * from item where id in (?)"
+    )
+    assert normalize_sql("select name from item where name = 'a'") != normalize_sql(
+        "select id from item where name = 'a'"
+    )
+
+
+def test_n_plus_one_raises_past_threshold(engine):
+    setup_query_stats(engine, enabled=True, n_plus_one_threshold=2, n_plus_one_raise=True)
+
+    def request():
+        stats = start_query_stats("GET /items")
+        _select_items(engine, [1, 2])
+        assert stats.shapes == {normalize_sql("select name from item where id = 1"): 2}
+        with pytest.raises(NPlusOneError):
+            _select_items(engine, [3])
+
+    contextvars.copy_context().run(request)
+
+
+def test_failed_statement_leaves_no_start_time(engine):
+    with engine.connect() as conn:
+        with capture_queries(engine) as stats:
+            with pytest.raises(OperationalError):
+                conn.execute(text("select * from missing_table"))
+            conn.execute(text("select 1"))
+        assert not conn.info.get("query_started")
+    assert stats.queries == 1
+
+
+def test_capture_started_mid_statement_is_ignored(engine):
+    with engine.connect() as conn:
+        # the after hook of a statement whose before hook ran without any capture
+        with capture_queries(engine) as stats:
+            query_stats._after_cursor_execute(conn, None, "select 1", None, None, False)
+    assert stats.queries == 0
@@ -0,0 +1,53 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.core import query_stats
+from app.core.exception_handler import setup_exception_handler
+from app.middleware.http_metrics import HTTPMetricsMiddleware
+from app.types.errors import AppError
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    query_stats.setup_query_stats(engine, enabled=True)
+    yield engine
+    query_stats.setup_query_stats(engine, enabled=False)
+    engine.dispose()
+
+
+def _app(engine) -> FastAPI:
+    app = FastAPI()
+    setup_exception_handler(app)
+    app.add_middleware(HTTPMetricsMiddleware)
+
+    @app.get("/ok")
+    async def ok():
+        with engine.connect() as conn:
+            conn.execute(text("select 1"))
+        return {}
+
+    @app.get("/sold-out")
+    async def sold_out():
+        with engine.connect() as conn:
+            conn.execute(text("select 1"))
+            conn.execute(text("select 2"))
+        raise AppError("sold out")
+
+    return app
+
+
+def test_server_timing_header(engine):
+    response = TestClient(_app(engine)).get("/ok")
+
+    assert response.status_code == 200
+    assert 'desc="1 queries"' in response.headers["server-timing"]
+
+
+def test_server_timing_on_app_error(engine):
+    response = TestClient(_app(engine)).get("/sold-out")
+
+    assert response.status_code == 400
+    assert 'desc="2 queries"' in response.headers["server-timing"]
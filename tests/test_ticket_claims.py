@@ -0,0 +1,106 @@
+import asyncio
+import random
+from types import SimpleNamespace
+import uuid
+
+import pytest
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core import database
+from app.models.event_ticket_model import EventTicket
+from app.services import inventory_shard_service, ticket_service
+from app.types.errors import AppError
+
+pytestmark = pytest.mark.anyio
+
+
+async def _reserve(event_id: uuid.UUID, quantities: dict) -> bool:
+    async with AsyncSession(database.async_engine, expire_on_commit=False) as session:
+        try:
+            await ticket_service.reserve_tickets(str(event_id), quantities, session)
+        except AppError:
+            return False
+        return True
+
+
+async def _tickets(ticket_ids: list[uuid.UUID]) -> dict[uuid.UUID, EventTicket]:
+    async with AsyncSession(database.async_engine) as session:
+        while await inventory_shard_service.roll_up(session):
+            pass
+        rows = await session.exec(select(EventTicket).where(EventTicket.id.in_(ticket_ids)))
+        return {t.id: t for t in rows.all()}
+
+
+@pytest.mark.parametrize("shards", [0, 4])
+async def test_concurrent_buyers_never_oversell(new_event, shards):
+    event_id, ticket_ids = await new_event(30, 30, 30, shards=shards)
+    rng = random.Random(shards)
+    requests = []
+    for _ in range(150):
+        picked = rng.sample(ticket_ids, rng.randint(1, len(ticket_ids)))
+        requests.append({tid: rng.randint(1, 4) for tid in picked})
+
+    sem = asyncio.Semaphore(20)
+
+    async def buyer(quantities):
+        async with sem:
+            return await _reserve(event_id, quantities)
+
+    results = await asyncio.gather(*(buyer(q) for q in requests))
+    granted = [q for q, ok in zip(requests, results) if ok]
+
+    tickets = await _tickets(ticket_ids)
+    for tid, t in tickets.items():
+        assert t.total_booked <= t.total_qty
+        assert t.total_booked == sum(q.get(tid, 0) for q in granted)
+    # demand is well above supply, so some buyers were turned away
+    assert len(granted) < len(requests)
+
+
+@pytest.mark.parametrize("shards", [0, 4])
+async def test_multi_type_claim_is_all_or_nothing(new_event, shards):
+    event_id, (plenty, scarce) = await new_event(5, 1, shards=shards)
+
+    assert not await _reserve(event_id, {plenty: 2, scarce: 2})
+    tickets = await _tickets([plenty, scarce])
+    assert tickets[plenty].total_booked == 0
+    assert tickets[scarce].total_booked == 0
+
+    assert await _reserve(event_id, {plenty: 2, scarce: 1})
+    tickets = await _tickets([plenty, scarce])
+    assert tickets[plenty].total_booked == 2
+    assert tickets[scarce].total_booked == 1
+
+
+async def test_top_up_alongside_roll_up(new_event):
+    """Raising total_qty on a sharded event locks shards and rows in the roll-up's order"""
+    event_id, ticket_ids = await new_event(40, 40, shards=4)
+    names = {tid: f"type-{i}" for i, tid in enumerate(ticket_ids)}
+    qty = {tid: 40 for tid in ticket_ids}
+
+    async def buy_and_roll_up():
+        for _ in range(30):
+            await _reserve(event_id, {tid: 1 for tid in ticket_ids})
+            await _tickets(ticket_ids)
+
+    async def raise_capacity():
+        for _ in range(30):
+            for tid in qty:
+                qty[tid] += 1
+            async with AsyncSession(database.async_engine) as session:
+                await ticket_service.upsert_tickets_for_event(
+                    str(event_id),
+                    [
+                        SimpleNamespace(id=str(tid), name=names[tid], price=10, total_qty=q)
+                        for tid, q in qty.items()
+                    ],
+                    session,
+                )
+                await session.commit()
+
+    await asyncio.gather(buy_and_roll_up(), raise_capacity(), buy_and_roll_up())
+    tickets = await _tickets(ticket_ids)
+    for tid, t in tickets.items():
+        assert t.total_qty == qty[tid]
+        assert t.total_booked == 60